@@ -0,0 +1,102 @@
+"""Chunk generated documentation pages and check the chunks.
+
+Pages mix headings, prose and fenced code blocks, some longer than a chunk, so
+every splitting path runs. Everything is generated, so the benchmark runs
+offline:
+
+    python -m benchmarks.chunking --pages 200 --chunk-size 1000
+
+It reports the chunks made and pages per second, then checks that no chunk is
+a code fence without code, including for a code block whose lines fill its
+pieces exactly. A failed check exits non-zero.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from pygent.ingest.chunking import FENCE_PATTERN, chunk_markdown
+
+WORDS = ["agent", "tool", "model", "result", "stream", "retry", "prompt", "graph"]
+
+
+def code_block(rng: random.Random, lines: int) -> str:
+    body = [
+        "    " * rng.randint(0, 2) + " ".join(rng.choices(WORDS, k=rng.randint(2, 8)))
+        if rng.random() > 0.15
+        else ""
+        for _ in range(lines)
+    ]
+    return "\n".join(["```python", *body, "", "```"])
+
+
+def page(rng: random.Random, sections: int, chunk_size: int) -> str:
+    parts = []
+    for section in range(sections):
+        parts.append(f"## Section {section}")
+        for _ in range(rng.randint(1, 4)):
+            parts.append(" ".join(rng.choices(WORDS, k=rng.randint(20, 200))) + ".")
+        if rng.random() < 0.5:
+            # Up to twice the chunk size, so some blocks are split.
+            parts.append(code_block(rng, rng.randint(3, chunk_size // 20)))
+    return "\n\n".join(parts)
+
+
+def exact_fit_block(chunk_size: int, pieces: int) -> str:
+    """Code whose lines fill each piece exactly, then a blank line."""
+    opening, fence = "```python", "```"
+    width = chunk_size - len(opening) - len(fence) - 3
+    body = ["x" * width for _ in range(pieces)]
+    return "\n".join([opening, *body, "", fence])
+
+
+def empty_fences(chunks: list[str]) -> list[str]:
+    empty = []
+    for chunk in chunks:
+        lines = chunk.splitlines()
+        code = [line for line in lines[1:] if not FENCE_PATTERN.match(line.strip())]
+        if FENCE_PATTERN.match(lines[0].strip()) and not any(map(str.strip, code)):
+            empty.append(chunk)
+    return empty
+
+
+def main(args) -> int:
+    rng = random.Random(0)
+    pages = [page(rng, args.sections, args.chunk_size) for _ in range(args.pages)]
+
+    timings, chunks = [], []
+    for markdown in pages:
+        start = time.perf_counter()
+        chunks.extend(chunk_markdown(markdown, args.chunk_size))
+        timings.append(time.perf_counter() - start)
+    total = sum(timings)
+    print(
+        f"  {len(pages)} pages -> {len(chunks)} chunks in {total * 1000:.0f} ms"
+        f"   {len(pages) / total:,.0f} pages/s"
+        f"   page p50 {statistics.median(timings) * 1000:.2f} ms"
+    )
+
+    exact = chunk_markdown(exact_fit_block(args.chunk_size, 4), args.chunk_size)
+    print(f"  code block filling 4 pieces exactly -> {len(exact)} chunks")
+
+    failures = []
+    if empty := empty_fences(chunks + exact):
+        failures.append(f"{len(empty)} chunks are code fences without code")
+    if len(exact) != 4:
+        failures.append(f"the exact-fit code block became {len(exact)} chunks, not 4")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--sections", type=int, default=8)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    sys.exit(main(parser.parse_args()))
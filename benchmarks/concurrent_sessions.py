@@ -0,0 +1,205 @@
+"""Load test: N concurrent chat sessions against stubbed models.
+
+Every agent is replaced by a `TestModel` that waits `--latency` seconds per
+request, after taking a grant from one rate limiter shared by all sessions.
+Every other session asks questions instead of building an agent, so its
+expert looks its answer up in the answer cache. Supabase and the embeddings API are the in-memory fakes from `pygent.testing`,
+so the test runs offline:
+
+    python -m benchmarks.concurrent_sessions --sessions 20 --turns 3 --latency 0.2
+    python -m benchmarks.concurrent_sessions --threads --timeout 60
+
+Each session gets its own run id, so runs keep separate state and artifacts
+under `workbench/<run_id>/` and only messages of the same session are
+serialized. The concurrent wall time should stay close to a single session's.
+
+By default the sessions share one event loop. With `--threads` each runs on
+its own thread with its own `asyncio.run`, the way Streamlit runs sessions, so
+state shared across loops (the embedding batcher, the rate limiter) is
+exercised too. Sessions that have not finished within `--timeout` seconds are
+reported as hung and the test exits non-zero.
+"""
+
+import argparse
+import asyncio
+import contextvars
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+from dataclasses import dataclass
+from pathlib import Path
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "benchmark")
+os.environ.setdefault("EMBEDDING_CACHE_PATH", "")
+os.environ.setdefault("ROUTER_MODE", "llm")
+
+from pydantic_ai.models.test import TestModel
+
+from pygent import agents
+from pygent.core.scheduler import RateLimiter
+from pygent.graph import GraphDeps, nodes, run_graph
+from pygent.testing import FakeDocStore, FakeEmbeddingClient, synthetic_corpus
+
+MESSAGES = [
+    "Build me an agent that searches the web with the Brave API",
+    "Looks good, go ahead",
+    "Add a tool that summarizes the results",
+    "Now add retries to the HTTP calls",
+]
+
+QUESTIONS = [
+    "How do I give an agent a tool?",
+    "And how do I stream its output?",
+    "Which models can it use?",
+]
+
+
+@dataclass
+class SlowTestModel(TestModel):
+    latency: float = 0.0
+    limiter: RateLimiter | None = None
+
+    async def request(self, *args, **kwargs):
+        if self.limiter is not None:
+            await self.limiter.acquire(1)
+        await asyncio.sleep(self.latency)
+        return await super().request(*args, **kwargs)
+
+
+async def list_documentation_pages(*args) -> list[str]:
+    return ["https://ai.pydantic.dev/agents/", "https://ai.pydantic.dev/tools/"]
+
+
+async def session(
+    turns: int, deps_factory, triage_model: TestModel | None = None
+) -> list[float]:
+    """Run one session's turns; with `triage_model`, a session of questions."""
+    run_id = str(uuid.uuid4())
+    messages = MESSAGES if triage_model is None else QUESTIONS
+    timings = []
+    with ExitStack() as stack:
+        if triage_model is not None:
+            stack.enter_context(agents.triage_agent.override(model=triage_model))
+        for turn in range(turns):
+            # Unique messages, so every session's embeddings miss the cache.
+            message = f"{messages[turn % len(messages)]} ({run_id[:8]})"
+            start = time.perf_counter()
+            await run_graph(run_id, message, deps_factory())
+            timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def threaded_sessions(sessions: list, timeout: float) -> tuple[list[list[float]], int]:
+    """Run each session coroutine with its own event loop on its own thread.
+
+    Returns the finished sessions' timings and the number still running after
+    `timeout` seconds.
+    """
+    results: list[list[float]] = []
+
+    def run(context: contextvars.Context, coroutine) -> None:
+        # Each thread needs its own copy of the context holding the overrides.
+        results.append(context.run(asyncio.run, coroutine))
+
+    threads = [
+        threading.Thread(
+            target=run, args=(contextvars.copy_context(), coroutine), daemon=True
+        )
+        for coroutine in sessions
+    ]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + timeout
+    for thread in threads:
+        thread.join(timeout=max(0.0, deadline - time.monotonic()))
+    return results, sum(thread.is_alive() for thread in threads)
+
+
+def report(label: str, elapsed: float, timings: list[float], turns: int):
+    timings = sorted(timings)
+    p95 = timings[max(int(len(timings) * 0.95) - 1, 0)]
+    print(
+        f"  {label:<11} wall {elapsed:7.2f} s   {turns / elapsed:7.1f} turns/s"
+        f"   turn p50 {statistics.median(timings):7.0f} ms   p95 {p95:7.0f} ms"
+    )
+
+
+async def main(args) -> int:
+    nodes.list_documentation_pages_helper = list_documentation_pages
+    os.chdir(tempfile.mkdtemp())
+    store = FakeDocStore(synthetic_corpus())
+    embedding_client = FakeEmbeddingClient(latency=0.01)
+    limiter = RateLimiter(args.rpm, 0, burst_seconds=1)
+
+    def deps_factory() -> GraphDeps:
+        return GraphDeps(supabase=store, embedding_client=embedding_client)
+
+    with ExitStack() as stack:
+        for name in agents.__all__:
+            agent = getattr(agents, name)
+            if hasattr(agent, "override"):
+                model = SlowTestModel(
+                    call_tools=[], latency=args.latency, limiter=limiter
+                )
+                stack.enter_context(agent.override(model=model))
+
+        start = time.perf_counter()
+        timings = await session(args.turns, deps_factory)
+        single = time.perf_counter() - start
+        report("1 session", single, timings, args.turns)
+
+        qa_triage = SlowTestModel(
+            custom_output_args={
+                "intent": "Q&A",
+                "user_request": "A question about Pydantic AI",
+                "reasoning": "The user asks how something works.",
+            },
+            latency=args.latency,
+            limiter=limiter,
+        )
+        sessions = [
+            session(args.turns, deps_factory, qa_triage if i % 2 else None)
+            for i in range(args.sessions)
+        ]
+        start = time.perf_counter()
+        hung = 0
+        if args.threads:
+            results, hung = await asyncio.to_thread(
+                threaded_sessions, sessions, args.timeout
+            )
+        else:
+            results = await asyncio.gather(*sessions)
+        elapsed = time.perf_counter() - start
+        if results:
+            report(
+                f"{len(results)} {'threads' if args.threads else 'sessions'}",
+                elapsed,
+                [timing for timings in results for timing in timings],
+                len(results) * args.turns,
+            )
+        print(f"  sequential estimate {single * args.sessions:7.2f} s")
+
+    runs = [path for path in Path("workbench").iterdir() if path.is_dir()]
+    isolated = all((run / "run.jsonl").exists() for run in runs)
+    print(f"  {len(runs)} run directories, each with its own state: {isolated}")
+    if hung:
+        print(f"FAIL: {hung} of {args.sessions} sessions hung past {args.timeout} s")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--rpm", type=int, default=6000)
+    parser.add_argument("--threads", action="store_true")
+    parser.add_argument("--timeout", type=float, default=60)
+    sys.exit(asyncio.run(main(parser.parse_args())))
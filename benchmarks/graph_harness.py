@@ -0,0 +1,269 @@
+"""Offline, deterministic benchmark of the whole pygent graph.
+
+Scripted conversations run through `run_graph` with every agent backed by a
+`FunctionModel` stub that waits `--latency` seconds per model request, and with
+Supabase and the embeddings API replaced by the in-memory fakes from
+`pygent.testing`:
+
+    python -m benchmarks.graph_harness
+    python -m benchmarks.graph_harness --scenario development --latency 0.05
+    python -m benchmarks.graph_harness --no-memory   # skip tracemalloc overhead
+
+For each scenario it reports wall time, model requests, tool calls, documentation
+store calls, bytes of run persistence written and peak traced memory, then the
+wall time spent in each graph node. Node times come from the durations that the
+run persistence records for every step.
+
+It also checks that every turn answering a scope summary resumed the run at
+its scope review, and exits non-zero otherwise.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from collections import Counter, defaultdict
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from pathlib import Path
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "benchmark")
+os.environ.setdefault("EMBEDDING_CACHE_PATH", "")
+# Keep runs comparable: no LLM-free routing tier learning between scenarios
+# and no answers served from an earlier repetition.
+os.environ.setdefault("ROUTER_MODE", "llm")
+os.environ.setdefault("ANSWER_CACHE_SIZE", "0")
+
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelResponse,
+    TextPart,
+    ToolCallPart,
+    ToolReturnPart,
+    UserPromptPart,
+)
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from pygent import agents
+from pygent.graph import GraphDeps, run_graph
+from pygent.testing import (
+    FakeDocStore,
+    FakeEmbeddingClient,
+    synthetic_corpus,
+)
+
+
+@dataclass
+class Turn:
+    message: str
+    intent: str = "Development"
+    approve: bool = True
+    route: str = "coder_agent"
+    refine: str = "refine_prompt"
+
+
+# How many of each scenario's turns review a scope summary: the graph stops
+# after showing it and must resume at RefineScopeNode with the user's answer.
+SCOPE_REVIEWS = {"qa": 0, "development": 2, "refine": 1}
+
+SCENARIOS = {
+    "qa": [
+        Turn("How do I add a tool to an agent?", intent="Q&A"),
+        Turn("And how do I stream the output?", intent="Q&A"),
+        Turn("Which models are supported?", intent="Q&A"),
+    ],
+    "development": [
+        Turn("Build me an agent that reports the weather for a city"),
+        Turn("Please also cache the forecasts", approve=False),
+        Turn("Looks good, go ahead"),
+        Turn("Add retries to the HTTP calls"),
+        Turn("Add tests for the tools"),
+        Turn("Thanks, we are finished", route="finish_conversation"),
+    ],
+    "refine": [
+        Turn("Build me an agent that triages GitHub issues"),
+        Turn("Approved"),
+        Turn("Refine the prompt please", route="refine", refine="refine_prompt"),
+        Turn("Refine the agent's tools", route="refine", refine="refine_agent"),
+        Turn("That's everything", route="finish_conversation"),
+    ],
+}
+
+
+@dataclass
+class Script:
+    """Decides what each stubbed agent answers for the current turn."""
+
+    output_chars: int
+    turn: Turn = field(default_factory=lambda: Turn(""))
+    model_calls: Counter[str] = field(default_factory=Counter)
+    tool_calls: Counter[str] = field(default_factory=Counter)
+
+    def code(self) -> str:
+        body = "\n".join(
+            f"    result_{i} = await agent.run(prompt_{i})"
+            for i in range(self.output_chars // 40)
+        )
+        return f"```python\nasync def main():\n{body}\n```"
+
+    def structured_output(self, name: str) -> dict:
+        turn = self.turn
+        if name == "triage_agent":
+            return {
+                "intent": turn.intent,
+                "user_request": turn.message,
+                "reasoning": "scripted",
+            }
+        if name == "summarize_scope_agent":
+            return {"scope_summary": "Weather agent with a forecast tool."}
+        return {
+            "scope_summary": "Weather agent with a forecast tool.",
+            "user_message": turn.message,
+            "refinement_feedback": "" if turn.approve else "Add caching.",
+            "approved": turn.approve,
+        }
+
+    def text_output(self, name: str) -> str:
+        if name == "router_agent":
+            return self.turn.route
+        if name == "refine_router_agent":
+            return self.turn.refine
+        if name == "scope_definer_agent":
+            return "# Scope\n\n" + "Component description. " * (self.output_chars // 25)
+        return self.code()
+
+    def expert_step(self, messages: list[ModelMessage]) -> ModelResponse:
+        """Search the docs, read one page for development turns, then answer."""
+        last = messages[-1]
+        returns = [p for p in last.parts if isinstance(p, ToolReturnPart)]
+        if any(isinstance(p, UserPromptPart) for p in last.parts):
+            return self.call_tool(
+                "retrieve_relevant_documentation", {"user_query": self.turn.message}
+            )
+        if (
+            returns
+            and returns[0].tool_name == "retrieve_relevant_documentation"
+            and self.turn.intent == "Development"
+        ):
+            url = "https://ai.pydantic.dev/agents/0/"
+            return self.call_tool(
+                "get_page_content", {"url": url, "query": self.turn.message}
+            )
+        return ModelResponse(parts=[TextPart(self.code())])
+
+    def call_tool(self, tool_name: str, args: dict) -> ModelResponse:
+        self.tool_calls[tool_name] += 1
+        return ModelResponse(parts=[ToolCallPart(tool_name, args)])
+
+    def model(self, name: str, latency: float) -> FunctionModel:
+        async def respond(messages: list[ModelMessage], info: AgentInfo):
+            self.model_calls[name] += 1
+            await asyncio.sleep(latency)
+            if name == "expert_agent":
+                return self.expert_step(messages)
+            if not info.allow_text_output:
+                tool = info.output_tools[0].name
+                return ModelResponse(
+                    parts=[ToolCallPart(tool, self.structured_output(name))]
+                )
+            return ModelResponse(parts=[TextPart(self.text_output(name))])
+
+        return FunctionModel(respond, model_name=f"stub:{name}")
+
+
+def node_durations(run_file: Path) -> dict[str, list[float]]:
+    durations: dict[str, list[float]] = defaultdict(list)
+    with open(run_file, encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if record["op"] == "status" and "duration" in record:
+                durations[record["id"].split(":")[0]].append(record["duration"])
+    return durations
+
+
+async def run_scenario(name: str, script: Script, deps_factory, track_memory: bool):
+    run_id = f"{name}-{uuid.uuid4().hex[:8]}"
+    if track_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    for turn in SCENARIOS[name]:
+        script.turn = turn
+        await run_graph(run_id, turn.message, deps_factory())
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] if track_memory else None
+    if track_memory:
+        tracemalloc.stop()
+
+    run_file = Path("workbench") / run_id / "run.jsonl"
+    return elapsed, peak, run_file.stat().st_size, node_durations(run_file)
+
+
+async def main(args) -> int:
+    script = Script(output_chars=args.output_chars)
+    store = FakeDocStore(synthetic_corpus(), latency=args.store_latency)
+    embedding_client = FakeEmbeddingClient(latency=args.store_latency)
+
+    def deps_factory() -> GraphDeps:
+        return GraphDeps(supabase=store, embedding_client=embedding_client)
+
+    os.chdir(tempfile.mkdtemp())
+    scenarios = [args.scenario] if args.scenario else list(SCENARIOS)
+    print(
+        f"{'scenario':<12} {'turns':>5} {'wall ms':>9} {'model':>6} {'tools':>6}"
+        f" {'store':>6} {'persisted':>10} {'peak MB':>8}"
+    )
+    with ExitStack() as stack:
+        for agent_name in agents.__all__:
+            agent = getattr(agents, agent_name)
+            if hasattr(agent, "override"):
+                stack.enter_context(
+                    agent.override(model=script.model(agent_name, args.latency))
+                )
+
+        all_durations: dict[str, list[float]] = defaultdict(list)
+        failures = []
+        for name in scenarios:
+            script.model_calls.clear()
+            script.tool_calls.clear()
+            store.calls.clear()
+            elapsed, peak, persisted, durations = await run_scenario(
+                name, script, deps_factory, not args.no_memory
+            )
+            for node, values in durations.items():
+                all_durations[node].extend(values)
+            reviews = len(durations.get("RefineScopeNode", []))
+            if reviews != SCOPE_REVIEWS[name]:
+                failures.append(
+                    f"{name}: {reviews} scope reviews, expected {SCOPE_REVIEWS[name]}"
+                )
+            peak_mb = f"{peak / 1e6:8.1f}" if peak is not None else f"{'-':>8}"
+            print(
+                f"{name:<12} {len(SCENARIOS[name]):>5} {elapsed * 1000:>9.0f}"
+                f" {script.model_calls.total():>6} {script.tool_calls.total():>6}"
+                f" {store.calls.total():>6} {persisted:>10} {peak_mb}"
+            )
+
+    print(f"\n{'node':<20} {'runs':>5} {'total ms':>9} {'mean ms':>8}")
+    for node, values in sorted(all_durations.items(), key=lambda item: -sum(item[1])):
+        total = sum(values) * 1000
+        print(f"{node:<20} {len(values):>5} {total:>9.0f} {total / len(values):>8.1f}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scenario", choices=list(SCENARIOS))
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--store-latency", type=float, default=0.01)
+    parser.add_argument("--output-chars", type=int, default=4000)
+    parser.add_argument("--no-memory", action="store_true")
+    sys.exit(asyncio.run(main(parser.parse_args())))
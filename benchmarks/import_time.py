@@ -0,0 +1,102 @@
+"""Import-time budget check for the pygent package.
+
+Imports a module in a fresh interpreter with `python -X importtime`, without
+any API credentials, and fails when the import takes longer than the budget or
+loads a module that should only be imported on first use:
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --module pygent.server.app --budget-ms 1200
+
+The credential variables are set to empty strings rather than removed, since
+`load_dotenv` fills in unset variables from `.env` but never overrides them.
+
+The best of `--repeat` imports is compared against the budget, and the
+packages that contribute the most import time are listed.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+# The SDKs behind the lazily created clients and the models resolved on first run.
+DEFERRED_MODULES = ["openai", "supabase", "pydantic_ai.models.openai"]
+CREDENTIALS = [
+    "OPENAI_API_KEY",
+    "SUPABASE_URL",
+    "SUPABASE_SERVICE_KEY",
+    "LOGFIRE_TOKEN",
+]
+CREDENTIAL_PREFIXES = ("OPENAI_", "SUPABASE_", "LOGFIRE_")
+
+
+def import_once(
+    module: str,
+) -> tuple[dict[str, tuple[int, int]], list[str], list[str]]:
+    """Per-module (self, cumulative) microseconds, the deferred modules loaded and
+    the credentials the config still found."""
+    env = {
+        key: "" if key.startswith(CREDENTIAL_PREFIXES) else value
+        for key, value in os.environ.items()
+    }
+    env.update(dict.fromkeys(CREDENTIALS, ""))
+    code = (
+        f"import {module}, json, os, sys; "
+        "from pygent.core import config; "
+        f"print(json.dumps([m for m in {DEFERRED_MODULES!r} if m in sys.modules])); "
+        f"print(json.dumps([k for k in {CREDENTIALS!r} "
+        "if os.getenv(k) or getattr(config, k, '')]))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    *_, loaded, credentials = result.stdout.splitlines()
+    return timings, json.loads(loaded), json.loads(credentials)
+
+
+def main(args) -> int:
+    runs = [import_once(args.module) for _ in range(args.repeat)]
+    timings, loaded, credentials = min(runs, key=lambda run: run[0][args.module][1])
+    total_ms = timings[args.module][1] / 1000
+
+    packages: dict[str, int] = defaultdict(int)
+    for name, (self_us, _) in timings.items():
+        packages[name.split(".")[0]] += self_us
+    print(f"import {args.module}: {total_ms:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[
+        : args.top
+    ]:
+        print(f"  {package:<24} {self_us / 1000:8.1f} ms")
+
+    failed = False
+    if credentials:
+        print(f"FAIL: credentials were still set: {credentials}")
+        failed = True
+    if loaded:
+        print(f"FAIL: imported modules that should load on first use: {loaded}")
+        failed = True
+    if total_ms > args.budget_ms:
+        print(f"FAIL: import took {total_ms:.0f} ms, over the budget")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--module", default="pygent.graph")
+    parser.add_argument("--budget-ms", type=float, default=1100)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10)
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,354 @@
+"""Rate-limit test: a burst of model and embedding calls against a fake OpenAI API.
+
+Starts a local server speaking the OpenAI chat completions and embeddings API.
+It allows `--server-rpm` requests per minute per model, and answers the excess
+with 429s carrying `retry-after-ms`, like the real API. The same burst of
+interactive (routing) and generation (long code output) agent runs plus
+embedding calls is then sent twice: with the OpenAI SDK's own retries, and
+through the request scheduler:
+
+    python -m benchmarks.rate_limits
+    python -m benchmarks.rate_limits --interactive 40 --generation 40 --server-rpm 1200
+
+Generation runs are submitted first, so with the scheduler interactive runs
+should still finish first, and the server should see far fewer 429s. The fake
+API enforces its limit over `--burst-seconds` windows, and the scheduler is
+given the same burst.
+
+Before the burst, the token buckets are checked on their own: requests after a
+large one must not stall, and a request charged far more tokens than its
+reported usage must get the difference back, and callers on several threads,
+each with its own event loop, must all get through one shared limiter. A failed
+check exits non-zero.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+import uvicorn
+from openai import AsyncOpenAI, OpenAIError
+from pydantic_ai import Agent
+from pydantic_ai.exceptions import AgentRunError
+from pydantic_ai.models.openai import OpenAIModel
+from pydantic_ai.providers.openai import OpenAIProvider
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from pygent.agents.model_tiers import PriorityModel
+from pygent.core.scheduler import (
+    GENERATION,
+    INTERACTIVE,
+    RateLimiter,
+    RequestScheduler,
+    TokenBucket,
+    scheduled_http_client,
+)
+
+
+@dataclass
+class FakeOpenAI:
+    """Per-model request budgets and counters of the fake API."""
+
+    requests_per_minute: int
+    burst_seconds: float
+    latency: float
+    buckets: dict[str, TokenBucket] = field(default_factory=dict)
+    received: int = 0
+    rejected: int = 0
+
+    def reset(self) -> None:
+        self.buckets.clear()
+        self.received = self.rejected = 0
+
+    def admit(self, model: str) -> float | None:
+        """None when the request is within budget, else the seconds to wait."""
+        self.received += 1
+        bucket = self.buckets.setdefault(
+            model, TokenBucket(self.requests_per_minute, self.burst_seconds)
+        )
+        delay = bucket.delay(1, time.monotonic())
+        if delay > 0:
+            self.rejected += 1
+            return delay
+        bucket.take(1)
+        return None
+
+    def app(self) -> Starlette:
+        async def chat_completions(request: Request) -> JSONResponse:
+            body = await request.json()
+            if (wait := self.admit(body["model"])) is not None:
+                return rate_limited(wait)
+            max_tokens = (
+                body.get("max_completion_tokens") or body.get("max_tokens") or 0
+            )
+            # Long generations take longer, like real completions.
+            await asyncio.sleep(self.latency * max(1, max_tokens / 256))
+            return JSONResponse(
+                {
+                    "id": "chatcmpl-benchmark",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body["model"],
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": "coder_agent"},
+                            "finish_reason": "stop",
+                        }
+                    ],
+                    "usage": {
+                        "prompt_tokens": 10,
+                        "completion_tokens": 2,
+                        "total_tokens": 12,
+                    },
+                }
+            )
+
+        async def embeddings(request: Request) -> JSONResponse:
+            body = await request.json()
+            if (wait := self.admit(body["model"])) is not None:
+                return rate_limited(wait)
+            await asyncio.sleep(self.latency / 4)
+            inputs = (
+                body["input"] if isinstance(body["input"], list) else [body["input"]]
+            )
+            return JSONResponse(
+                {
+                    "object": "list",
+                    "model": body["model"],
+                    "data": [
+                        {"object": "embedding", "index": i, "embedding": [0.0] * 8}
+                        for i in range(len(inputs))
+                    ],
+                    "usage": {"prompt_tokens": 1, "total_tokens": 1},
+                }
+            )
+
+        return Starlette(
+            routes=[
+                Route("/v1/chat/completions", chat_completions, methods=["POST"]),
+                Route("/v1/embeddings", embeddings, methods=["POST"]),
+            ]
+        )
+
+
+def rate_limited(wait: float) -> JSONResponse:
+    return JSONResponse(
+        {
+            "error": {
+                "message": "Rate limit reached for requests",
+                "type": "requests",
+                "code": "rate_limit_exceeded",
+            }
+        },
+        status_code=429,
+        headers={"retry-after-ms": str(int(wait * 1000) + 1)},
+    )
+
+
+async def check_buckets() -> bool:
+    """Large requests leave only their own debt, and usage corrects estimates."""
+    ok = True
+    limiter = RateLimiter(500, 200_000)
+    await limiter.acquire(20_000)
+    start = time.perf_counter()
+    for _ in range(5):
+        await limiter.acquire(3_000)
+    waited = time.perf_counter() - start
+    print(f"  5 requests of 3k tokens after one of 20k waited {waited * 1000:.0f} ms")
+    if waited > 0.1:
+        print("FAIL: requests after a large one stalled")
+        ok = False
+
+    limiter = RateLimiter(0, 60_000)
+    await limiter.acquire(50_000)
+    limiter.settle(50_000, 1_000)
+    start = time.perf_counter()
+    await asyncio.wait_for(limiter.acquire(50_000), timeout=5)
+    waited = time.perf_counter() - start
+    print(
+        f"  after usage refunded an overestimate, next request waited {waited * 1000:.0f} ms"
+    )
+    if waited > 0.1:
+        print("FAIL: reported usage did not refund the estimate")
+        ok = False
+    return ok
+
+
+def check_threads(threads: int = 4, acquires: int = 3) -> bool:
+    """Waiters on other threads' event loops are woken once the budget refills."""
+    limiter = RateLimiter(600, 0, burst_seconds=0.1)
+    finished = []
+
+    async def session() -> None:
+        for _ in range(acquires):
+            await limiter.acquire(1)
+        finished.append(threading.get_ident())
+
+    start = time.perf_counter()
+    workers = [
+        threading.Thread(target=asyncio.run, args=(session(),), daemon=True)
+        for _ in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+    deadline = time.monotonic() + 10
+    for worker in workers:
+        worker.join(timeout=max(0.0, deadline - time.monotonic()))
+    elapsed = time.perf_counter() - start
+    print(
+        f"  {len(finished)} of {threads} threads got {acquires} grants each"
+        f" in {elapsed * 1000:.0f} ms"
+    )
+    if len(finished) < threads:
+        print("FAIL: waiters on other event loops were never woken")
+        return False
+    return True
+
+
+async def timed(call) -> float | None:
+    """Latency of `call` in milliseconds, or None when it failed."""
+    start = time.perf_counter()
+    try:
+        await call
+    except (AgentRunError, OpenAIError):
+        return None
+    return (time.perf_counter() - start) * 1000
+
+
+def report(label: str, timings: list[float | None]) -> None:
+    done = sorted(timing for timing in timings if timing is not None)
+    failed = len(timings) - len(done)
+    if not done:
+        print(f"    {label:<12} ok {0:4d}   failed {failed:4d}")
+        return
+    p95 = done[max(int(len(done) * 0.95) - 1, 0)]
+    print(
+        f"    {label:<12} ok {len(done):4d}   failed {failed:4d}"
+        f"   p50 {statistics.median(done):7.0f} ms   p95 {p95:7.0f} ms"
+    )
+
+
+async def burst(client: AsyncOpenAI, args) -> None:
+    model = OpenAIModel(args.model, provider=OpenAIProvider(openai_client=client))
+    router = Agent(PriorityModel(model, INTERACTIVE), name="router_agent")
+    coder = Agent(
+        PriorityModel(model, GENERATION),
+        name="expert_agent",
+        model_settings={"max_tokens": args.generation_tokens},
+    )
+
+    generation = [
+        asyncio.create_task(timed(coder.run(f"Write agent {i}")))
+        for i in range(args.generation)
+    ]
+    await asyncio.sleep(0)
+    interactive = [
+        asyncio.create_task(timed(router.run(f"Route message {i}")))
+        for i in range(args.interactive)
+    ]
+    embeddings = [
+        asyncio.create_task(
+            timed(
+                client.embeddings.create(
+                    model="text-embedding-3-small", input=f"query {i}"
+                )
+            )
+        )
+        for i in range(args.embeddings)
+    ]
+    report("interactive", await asyncio.gather(*interactive))
+    report("generation", await asyncio.gather(*generation))
+    report("embeddings", await asyncio.gather(*embeddings))
+
+
+async def main(args) -> int:
+    print("token buckets")
+    if not await check_buckets() or not check_threads():
+        return 1
+
+    fake = FakeOpenAI(args.server_rpm, args.burst_seconds, args.latency)
+    config = uvicorn.Config(
+        fake.app(), host="127.0.0.1", port=0, log_level="warning", lifespan="off"
+    )
+    server = uvicorn.Server(config)
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    base_url = f"http://127.0.0.1:{port}/v1"
+
+    print(
+        f"{args.interactive} interactive + {args.generation} generation runs"
+        f" + {args.embeddings} embeddings, server {args.server_rpm} requests/min"
+    )
+
+    print("  SDK retries")
+    fake.reset()
+    client = AsyncOpenAI(base_url=base_url, api_key="benchmark", max_retries=2)
+    start = time.perf_counter()
+    await burst(client, args)
+    print(
+        f"    wall {time.perf_counter() - start:6.2f} s   server saw"
+        f" {fake.received} requests, {fake.rejected} rejected with 429"
+    )
+    await client.close()
+
+    print("  scheduler")
+    fake.reset()
+    scheduler = RequestScheduler(
+        requests_per_minute=args.client_rpm or args.server_rpm,
+        tokens_per_minute=0,
+        burst_seconds=args.burst_seconds,
+    )
+    client = AsyncOpenAI(
+        base_url=base_url,
+        api_key="benchmark",
+        max_retries=0,
+        http_client=scheduled_http_client(scheduler),
+    )
+    start = time.perf_counter()
+    await burst(client, args)
+    stats = scheduler.stats
+    print(
+        f"    wall {time.perf_counter() - start:6.2f} s   server saw"
+        f" {fake.received} requests, {fake.rejected} rejected with 429"
+    )
+    print(
+        f"    {stats.retries} retries, mean wait for the rate limit"
+        f" {stats.wait_seconds / max(stats.requests, 1) * 1000:.0f} ms"
+    )
+    await client.close()
+
+    server.should_exit = True
+    await serving
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--interactive", type=int, default=30)
+    parser.add_argument("--generation", type=int, default=30)
+    parser.add_argument("--embeddings", type=int, default=20)
+    parser.add_argument("--model", default="gpt-4o")
+    parser.add_argument("--generation-tokens", type=int, default=1024)
+    parser.add_argument("--server-rpm", type=int, default=600)
+    parser.add_argument(
+        "--client-rpm",
+        type=int,
+        default=0,
+        help="Scheduler budget per model; defaults to the server's.",
+    )
+    parser.add_argument("--burst-seconds", type=float, default=1.0)
+    parser.add_argument("--latency", type=float, default=0.05)
+    sys.exit(asyncio.run(main(parser.parse_args())))
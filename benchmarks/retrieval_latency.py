@@ -0,0 +1,84 @@
+"""Compare match latency of the local retriever against the `match_site_pages` RPC.
+
+    python -m benchmarks.retrieval_latency --rows 5000
+    python -m benchmarks.retrieval_latency --export site_pages.jsonl --rpc
+
+Without `--export` a synthetic corpus of `--rows` random embeddings is used.
+`--rpc` also times the Supabase RPC and needs real credentials in `.env`.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import numpy as np
+
+from pygent.core.config import DOCS_SOURCE
+from pygent.tools.retrievers import LocalRetriever, Retriever, SupabaseRetriever
+
+
+def synthetic_rows(count: int, dimensions: int = 1536) -> list[dict]:
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((count, dimensions), dtype=np.float32)
+    return [
+        {
+            "id": i,
+            "url": f"https://ai.pydantic.dev/page-{i // 20}/",
+            "chunk_number": i % 20,
+            "title": f"Page {i // 20}",
+            "summary": "",
+            "content": "",
+            "metadata": {"source": DOCS_SOURCE},
+            "embedding": embedding.tolist(),
+        }
+        for i, embedding in enumerate(embeddings)
+    ]
+
+
+async def measure(retriever: Retriever, queries: list[list[float]]) -> list[float]:
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        await retriever.match(query, match_count=5, filter={"source": DOCS_SOURCE})
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(name: str, timings: list[float]):
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"  {name:<10} p50 {statistics.median(timings):8.2f} ms   p95 {p95:8.2f} ms")
+
+
+async def main(args):
+    if args.export:
+        local = LocalRetriever.from_export(args.export)
+    else:
+        local = LocalRetriever.from_rows(synthetic_rows(args.rows))
+
+    rng = np.random.default_rng(1)
+    queries = [
+        rng.standard_normal(local.embeddings.shape[1]).tolist()
+        for _ in range(args.queries)
+    ]
+
+    print(f"{len(local.rows)} chunks, {args.queries} queries")
+    report("local", await measure(local, queries))
+
+    if args.rpc:
+        from pygent.core.clients import get_async_supabase_client
+
+        report(
+            "rpc",
+            await measure(SupabaseRetriever(get_async_supabase_client()), queries),
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--export", help="JSON or JSONL export of site_pages")
+    parser.add_argument("--rpc", action="store_true")
+    asyncio.run(main(parser.parse_args()))
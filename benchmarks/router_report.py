@@ -0,0 +1,135 @@
+"""Report accuracy and latency of the local routing tiers against LLM decisions.
+
+    python -m benchmarks.router_report
+    python -m benchmarks.router_report --log workbench/router_decisions.jsonl --openai
+
+Decisions logged by the LLM fallback are the ground truth. They are replayed in
+order: each one is first routed locally by the keyword rules and by a centroid
+classifier trained on the decisions before it, then added to the classifier.
+Without a log, a small built-in sample is used. Embeddings come from a local
+hashing embedder unless `--openai` is given.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from collections import defaultdict
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "benchmark")
+
+from pygent.agents import next_step_router, refine_router
+from pygent.agents.intent_router import (
+    CentroidClassifier,
+    TieredRouter,
+    keyword_route,
+)
+from pygent.core.config import ROUTER_MIN_MARGIN, ROUTER_MIN_SIMILARITY
+from pygent.ingest.enrich import HashEmbedder
+
+SAMPLE = [
+    ("next_step", "Now add a tool that searches the web", "coder_agent"),
+    ("next_step", "Can you also handle errors from the API?", "coder_agent"),
+    ("next_step", "Use Postgres instead of SQLite", "coder_agent"),
+    ("next_step", "Add retries to the HTTP client", "coder_agent"),
+    ("next_step", "Write tests for the agent", "coder_agent"),
+    ("next_step", "Change the model to gpt-4o-mini", "coder_agent"),
+    ("next_step", "Great, that's everything I needed, thanks!", "finish_conversation"),
+    ("next_step", "Looks perfect, we can stop here", "finish_conversation"),
+    ("next_step", "That is all for today", "finish_conversation"),
+    ("next_step", "I'm happy with it, let's wrap up", "finish_conversation"),
+    ("next_step", "Thanks, I have what I need", "finish_conversation"),
+    ("next_step", "Please refine the agent", "refine"),
+    ("next_step", "bye", "finish_conversation"),
+    ("refine", "Make the system prompt more concise", "refine_prompt"),
+    ("refine", "Improve the instructions the agent follows", "refine_prompt"),
+    ("refine", "Add a tool for sending emails", "refine_agent"),
+    ("refine", "Switch the dependencies to use httpx", "refine_agent"),
+]
+
+
+def load_decisions(path: str | None) -> list[dict]:
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+    return [
+        {"router": router, "message": message, "label": label}
+        for router, message, label in SAMPLE
+    ]
+
+
+async def evaluate(router: TieredRouter, decisions: list[dict], embed, args):
+    classifier = CentroidClassifier(
+        min_similarity=args.min_similarity,
+        min_margin=args.min_margin,
+        min_examples=args.min_examples,
+    )
+    tiers = defaultdict(lambda: {"answered": 0, "correct": 0, "latency": []})
+    llm_latency = [d["latency_ms"] for d in decisions if "latency_ms" in d]
+
+    for decision in decisions:
+        start = time.perf_counter()
+        label = keyword_route(router.rules, decision["message"])
+        tier = "rules"
+        embedding = None
+        if label is None:
+            embedding = await embed(decision["message"])
+            prediction = classifier.predict(embedding)
+            label, tier = (prediction[0], "centroid") if prediction else (None, "llm")
+        elapsed = (time.perf_counter() - start) * 1000
+
+        stats = tiers[tier]
+        stats["answered"] += 1
+        stats["latency"].append(elapsed)
+        stats["correct"] += label == decision["label"] if label else 0
+        classifier.add(decision["label"], embedding or await embed(decision["message"]))
+
+    total = len(decisions)
+    print(f"{router.name}: {total} decisions")
+    for tier in ("rules", "centroid"):
+        stats = tiers[tier]
+        if not stats["answered"]:
+            print(f"  {tier:<9} answered 0")
+            continue
+        print(
+            f"  {tier:<9} answered {stats['answered'] / total:6.1%}"
+            f"   accuracy {stats['correct'] / stats['answered']:6.1%}"
+            f"   median {statistics.median(stats['latency']):7.2f} ms"
+        )
+    fallback = tiers["llm"]["answered"]
+    print(f"  {'llm':<9} answered {fallback / total:6.1%}", end="")
+    if llm_latency:
+        print(f"   logged median {statistics.median(llm_latency):7.0f} ms")
+    else:
+        print()
+
+
+async def main(args):
+    if args.openai:
+        from pygent.tools.documentation import get_embedding as embed
+    else:
+        embed = HashEmbedder().embed
+
+        async def embed_one(text: str, _embed=embed) -> list[float]:
+            return (await _embed([text]))[0]
+
+        embed = embed_one
+
+    decisions = load_decisions(args.log)
+    for router in (next_step_router, refine_router):
+        selected = [d for d in decisions if d["router"] == router.name]
+        if selected:
+            await evaluate(router, selected, embed, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--log", default="workbench/router_decisions.jsonl")
+    parser.add_argument("--openai", action="store_true")
+    parser.add_argument("--min-similarity", type=float, default=ROUTER_MIN_SIMILARITY)
+    parser.add_argument("--min-margin", type=float, default=ROUTER_MIN_MARGIN)
+    parser.add_argument("--min-examples", type=int, default=2)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,136 @@
+"""Measure first-turn Q&A latency with and without speculative retrieval.
+
+Every model call sleeps `--llm-latency` seconds and every documentation
+search sleeps `--retrieval-latency` seconds. Supabase and the embeddings API are
+the in-memory fakes from `pygent.testing`, and the answer cache is off since
+every run asks the same question, so the benchmark runs offline:
+
+    python -m benchmarks.speculative_retrieval --llm-latency 0.5 --retrieval-latency 0.3
+
+Without speculation a Q&A turn runs triage, then the expert's search tool, then
+the expert's answer. With speculation the search overlaps triage and the expert
+answers from the prefetched chunks, saving about one retrieval per turn.
+
+Afterwards it checks that a follow-up to an answer served from the answer cache
+still reaches the expert with its system prompt, and exits non-zero otherwise.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from contextlib import ExitStack
+
+os.environ.setdefault("EMBEDDING_CACHE_PATH", "")
+
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelResponse,
+    SystemPromptPart,
+    TextPart,
+    ToolCallPart,
+    ToolReturnPart,
+)
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+import pygent.agents.expert.expert_agent as expert_module
+import pygent.graph.iterator as iterator_module
+from pygent.agents import expert_agent, triage_agent
+from pygent.graph import GraphDeps, run_graph
+from pygent.testing import (
+    FakeDocStore,
+    FakeEmbeddingClient,
+    synthetic_corpus,
+)
+from pygent.tools.answer_cache import answer_cache
+
+
+def build_models(llm_latency: float, system_prompted: list[bool]):
+    async def triage(messages: list[ModelMessage], info: AgentInfo) -> ModelResponse:
+        await asyncio.sleep(llm_latency)
+        return ModelResponse(
+            parts=[
+                ToolCallPart(
+                    info.output_tools[0].name,
+                    {"intent": "Q&A", "user_request": "q", "reasoning": "question"},
+                )
+            ]
+        )
+
+    async def expert(messages: list[ModelMessage], info: AgentInfo) -> ModelResponse:
+        await asyncio.sleep(llm_latency)
+        parts = [part for message in messages for part in message.parts]
+        system_prompted.append(any(isinstance(p, SystemPromptPart) for p in parts))
+        prefetched = any(
+            isinstance(part, SystemPromptPart) and "already retrieved" in part.content
+            for part in parts
+        )
+        searched = any(isinstance(part, ToolReturnPart) for part in parts)
+        if prefetched or searched:
+            return ModelResponse(parts=[TextPart("Here is how agents work.")])
+        return ModelResponse(
+            parts=[ToolCallPart("retrieve_relevant_documentation", {"user_query": "q"})]
+        )
+
+    return FunctionModel(triage), FunctionModel(expert)
+
+
+async def main(args):
+    async def fake_retrieval(user_query: str, *_args, **_kwargs) -> str:
+        await asyncio.sleep(args.retrieval_latency)
+        return "# Agents\n\nAgents are the primary interface."
+
+    iterator_module.prefetch_relevant_documentation = fake_retrieval
+    expert_module.retrieve_relevant_documentation_helper = fake_retrieval
+    system_prompted: list[bool] = []
+    triage_model, expert_model = build_models(args.llm_latency, system_prompted)
+    answer_cache.max_entries = 0
+    store = FakeDocStore(synthetic_corpus())
+    embedding_client = FakeEmbeddingClient()
+
+    os.chdir(tempfile.mkdtemp())
+    with ExitStack() as stack:
+        stack.enter_context(triage_agent.override(model=triage_model))
+        stack.enter_context(expert_agent.override(model=expert_model))
+
+        for speculative in (False, True):
+            iterator_module.SPECULATIVE_RETRIEVAL = speculative
+            timings = []
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                await run_graph(
+                    str(uuid.uuid4()),
+                    "How do agents work?",
+                    GraphDeps(supabase=store, embedding_client=embedding_client),
+                )
+                timings.append((time.perf_counter() - start) * 1000)
+            label = "speculative" if speculative else "sequential"
+            print(f"  {label:<12} median {statistics.median(timings):8.1f} ms")
+
+        # Answer once to fill the cache, then ask again in a new conversation
+        # (a cache hit) and follow up there.
+        answer_cache.max_entries = 10
+        deps = GraphDeps(supabase=store, embedding_client=embedding_client)
+        await run_graph(str(uuid.uuid4()), "How do agents work?", deps)
+        run_id = str(uuid.uuid4())
+        await run_graph(run_id, "How do agents work?", deps)
+        if answer_cache.stats.hits != 1:
+            print(f"FAIL: expected one answer cache hit, got {answer_cache.stats.hits}")
+            sys.exit(1)
+        system_prompted.clear()
+        await run_graph(run_id, "And how do they call tools?", deps)
+        if not system_prompted or not all(system_prompted):
+            print("FAIL: the follow-up to a cached answer had no system prompt")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--retrieval-latency", type=float, default=0.3)
+    asyncio.run(main(parser.parse_args()))
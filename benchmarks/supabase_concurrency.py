@@ -0,0 +1,130 @@
+"""Compare concurrent documentation tool calls on the sync and async Supabase clients.
+
+Both clients talk to an in-process mock PostgREST transport that answers every
+request after `--latency` seconds, so the benchmark runs offline:
+
+    python -m benchmarks.supabase_concurrency --calls 10 --latency 0.1
+
+With the sync client each `.execute()` blocks the event loop and the calls
+queue up (~calls x latency); with the async client they overlap (~latency).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from types import SimpleNamespace
+
+import httpx
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_SERVICE_KEY", "benchmark")
+os.environ.setdefault("EMBEDDING_CACHE_PATH", "")
+
+from supabase import (
+    AsyncClient,
+    AsyncClientOptions,
+    Client,
+    ClientOptions,
+)
+
+from pygent.tools.documentation import (
+    get_page_content_helper,
+    retrieve_relevant_documentation_helper,
+)
+
+ROWS = [
+    {
+        "url": "https://ai.pydantic.dev/agents/",
+        "chunk_number": 0,
+        "title": "Agents - Pydantic AI",
+        "summary": "Agents",
+        "content": "Agents are the primary interface.",
+    }
+]
+
+
+def _response(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, content=json.dumps(ROWS).encode(), request=request)
+
+
+class FakeEmbeddings:
+    def __init__(self):
+        self.embeddings = self
+
+    async def create(self, model, input):
+        return SimpleNamespace(
+            data=[
+                SimpleNamespace(index=i, embedding=[0.0] * 1536)
+                for i in range(len(input))
+            ]
+        )
+
+
+def sync_client(latency: float) -> Client:
+    def handler(request: httpx.Request) -> httpx.Response:
+        time.sleep(latency)
+        return _response(request)
+
+    http_client = httpx.Client(transport=httpx.MockTransport(handler))
+    return Client(
+        os.environ["SUPABASE_URL"],
+        os.environ["SUPABASE_SERVICE_KEY"],
+        ClientOptions(httpx_client=http_client),
+    )
+
+
+def async_client(latency: float) -> AsyncClient:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(latency)
+        return _response(request)
+
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return AsyncClient(
+        os.environ["SUPABASE_URL"],
+        os.environ["SUPABASE_SERVICE_KEY"],
+        AsyncClientOptions(httpx_client=http_client),
+    )
+
+
+async def blocking_tool_call(supabase: Client, query: str) -> str:
+    """The pre-async helpers: an `async def` wrapping a blocking `.execute()`."""
+    result = supabase.rpc("match_site_pages", {"query": query}).execute()
+    return result.data[0]["content"]
+
+
+async def timed(calls) -> float:
+    start = time.perf_counter()
+    await asyncio.gather(*calls)
+    return time.perf_counter() - start
+
+
+async def main(calls: int, latency: float):
+    embeddings = FakeEmbeddings()
+    sync = sync_client(latency)
+    sync_time = await timed(
+        blocking_tool_call(sync, f"query {i}") for i in range(calls)
+    )
+
+    supabase = async_client(latency)
+    async_rag_time = await timed(
+        retrieve_relevant_documentation_helper(f"query {i}", supabase, embeddings)
+        for i in range(calls)
+    )
+    async_page_time = await timed(
+        get_page_content_helper(ROWS[0]["url"], supabase) for _ in range(calls)
+    )
+
+    print(f"{calls} concurrent calls, {latency * 1000:.0f} ms simulated latency")
+    print(f"  sync client (blocking):        {sync_time * 1000:8.1f} ms")
+    print(f"  async retrieve_relevant_docs:  {async_rag_time * 1000:8.1f} ms")
+    print(f"  async get_page_content:        {async_page_time * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.1)
+    args = parser.parse_args()
+    asyncio.run(main(args.calls, args.latency))
@@ -2,7 +2,12 @@ from .expert.expert_agent import expert_agent, PydanticAIDeps
 from .refiners.agent_refiner_agent import agent_refiner_agent, AgentRefinerDeps
 from .refiners.prompt_refiner_agent import prompt_refiner_agent
 from .conversation import end_conversation_agent
-from .routing import refine_router_agent, router_agent
+from .routing import (
+    next_step_router,
+    refine_router,
+    refine_router_agent,
+    router_agent,
+)
 from .triage import triage_agent
 from .scoper_definer import (
     scope_definer_agent,
@@ -18,6 +23,8 @@ __all__ = [
     "end_conversation_agent",
     "router_agent",
     "refine_router_agent",
+    "next_step_router",
+    "refine_router",
     "triage_agent",
     "AgentRefinerDeps",
     "scope_definer_agent",
@@ -0,0 +1,159 @@
+from dataclasses import dataclass, replace
+
+import logfire
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelRequest,
+    ModelResponse,
+    TextPart,
+    ToolCallPart,
+    ToolReturnPart,
+    UserPromptPart,
+)
+
+# Rough average for English prose and code with OpenAI tokenizers; good enough
+# for budgeting without pulling in a tokenizer.
+CHARS_PER_TOKEN = 4
+STUB_PREFIX = "[Omitted from an earlier turn"
+CODE_FENCE = "```"
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def part_tokens(part) -> int:
+    if isinstance(part, ToolReturnPart):
+        return estimate_tokens(part.model_response_str())
+    if isinstance(part, ToolCallPart):
+        return estimate_tokens(part.tool_name + part.args_as_json_str())
+    if isinstance(part, UserPromptPart) and not isinstance(part.content, str):
+        return sum(
+            estimate_tokens(item) for item in part.content if isinstance(item, str)
+        )
+    content = getattr(part, "content", "")
+    return estimate_tokens(content if isinstance(content, str) else str(content))
+
+
+def history_tokens(messages: list[ModelMessage]) -> int:
+    return sum(part_tokens(part) for message in messages for part in message.parts)
+
+
+@dataclass
+class CompactionReport:
+    tokens_before: int
+    tokens_after: int
+    tool_returns_stubbed: int = 0
+    responses_stubbed: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+
+def _is_stub(content) -> bool:
+    return isinstance(content, str) and content.startswith(STUB_PREFIX)
+
+
+def _current_turn_start(messages: list[ModelMessage]) -> int:
+    """Index of the request carrying the latest user prompt."""
+    for index in range(len(messages) - 1, -1, -1):
+        message = messages[index]
+        if isinstance(message, ModelRequest) and any(
+            isinstance(part, UserPromptPart) for part in message.parts
+        ):
+            return index
+    return len(messages)
+
+
+def _latest_code_response(messages: list[ModelMessage]) -> int | None:
+    for index in range(len(messages) - 1, -1, -1):
+        message = messages[index]
+        if isinstance(message, ModelResponse) and any(
+            isinstance(part, TextPart) and CODE_FENCE in part.content
+            for part in message.parts
+        ):
+            return index
+    return None
+
+
+def compact_history(
+    messages: list[ModelMessage], budget: int
+) -> tuple[list[ModelMessage], CompactionReport]:
+    """Shrink a message history to roughly `budget` tokens.
+
+    Only messages before the current turn are touched, oldest first: tool
+    outputs (retrieved chunks, page contents) are replaced by a short stub
+    first, then earlier model text. User prompts, system prompts, tool calls
+    and the latest response containing code are always kept, and the number
+    and order of messages never changes, so tool calls stay paired with their
+    returns. The input list and its messages are not modified.
+    """
+    tokens = history_tokens(messages)
+    report = CompactionReport(tokens_before=tokens, tokens_after=tokens)
+    if tokens <= budget:
+        return messages, report
+
+    boundary = _current_turn_start(messages)
+    keep = _latest_code_response(messages[:boundary])
+    compacted = list(messages)
+
+    def stub_parts(part_type: type, label) -> int:
+        nonlocal tokens
+        stubbed = 0
+        for index in range(boundary):
+            if tokens <= budget:
+                break
+            message = compacted[index]
+            if index == keep or not any(
+                isinstance(part, part_type) and not _is_stub(part.content)
+                for part in message.parts
+            ):
+                continue
+            parts = []
+            for part in message.parts:
+                if isinstance(part, part_type) and not _is_stub(part.content):
+                    size = part_tokens(part)
+                    part = replace(
+                        part, content=f"{STUB_PREFIX}: {label(part)}, ~{size} tokens]"
+                    )
+                    tokens -= size - part_tokens(part)
+                    stubbed += 1
+                parts.append(part)
+            compacted[index] = replace(message, parts=parts)
+        return stubbed
+
+    report.tool_returns_stubbed = stub_parts(
+        ToolReturnPart, lambda part: f"output of {part.tool_name}"
+    )
+    report.responses_stubbed = stub_parts(TextPart, lambda part: "assistant reply")
+    report.tokens_after = tokens
+    return compacted, report
+
+
+class HistoryCompactor:
+    """Agent history processor applying `compact_history` before each model request.
+
+    Keeps the latest report and a running total of tokens saved for inspection.
+    """
+
+    def __init__(self, budget: int, name: str):
+        self.budget = budget
+        self.name = name
+        self.last_report: CompactionReport | None = None
+        self.tokens_saved = 0
+
+    async def __call__(self, messages: list[ModelMessage]) -> list[ModelMessage]:
+        compacted, report = compact_history(messages, self.budget)
+        self.last_report = report
+        if report.tokens_saved:
+            self.tokens_saved += report.tokens_saved
+            logfire.info(
+                "Compacted {agent} history from {tokens_before} to {tokens_after} tokens",
+                agent=self.name,
+                tokens_before=report.tokens_before,
+                tokens_after=report.tokens_after,
+                tool_returns_stubbed=report.tool_returns_stubbed,
+                responses_stubbed=report.responses_stubbed,
+            )
+        return compacted
@@ -1,8 +1,15 @@
 from pydantic_ai import Agent
 
-from pygent.core.config import PRIMARY_LLM_MODEL
+from pygent.agents.compaction import HistoryCompactor
+from pygent.agents.model_tiers import tier_model
+from pygent.core.config import EXPERT_HISTORY_TOKEN_BUDGET
 
 end_conversation_agent = Agent(
-    PRIMARY_LLM_MODEL,
-    system_prompt='''Your job is to end a conversation for creating an AI agent by giving instructions for how to execute the agent and they saying a nice goodbye to the user.''',
+    tier_model("end_conversation_agent", "primary"),
+    name="end_conversation_agent",
+    defer_model_check=True,
+    system_prompt="""Your job is to end a conversation for creating an AI agent by giving instructions for how to execute the agent and they saying a nice goodbye to the user.""",
+    history_processors=[
+        HistoryCompactor(EXPERT_HISTORY_TOKEN_BUDGET, name="end_conversation_agent")
+    ],
 )
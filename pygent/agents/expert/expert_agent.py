@@ -1,13 +1,14 @@
-from dataclasses import dataclass
-from typing import Optional
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
 
-import logfire
-from openai import AsyncOpenAI
 from pydantic_ai import Agent, RunContext
-from supabase import Client
 
-from pygent.core.clients import openai_client, supabase_client
-from pygent.core.config import PRIMARY_LLM_MODEL
+from pygent.agents.compaction import HistoryCompactor
+from pygent.agents.model_tiers import tier_model
+from pygent.core.clients import get_async_supabase_client, get_openai_client
+from pygent.core.config import EXPERT_HISTORY_TOKEN_BUDGET
 from pygent.tools.documentation import (
     get_page_content_helper,
     list_documentation_pages_helper,
@@ -16,18 +17,30 @@ from pygent.tools.documentation import (
 
 from .expert_prompt import coder_expert_prompt, docs_expert_prompt
 
-logfire.configure()
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+    from supabase import AsyncClient
 
 
 @dataclass
 class PydanticAIDeps:
     user_intent: str
-    supabase: Client = supabase_client
-    embedding_client: AsyncOpenAI = openai_client
-    reasoner_output: Optional[str] = None
-
-
-expert_agent = Agent(PRIMARY_LLM_MODEL, deps_type=PydanticAIDeps, retries=2)
+    supabase: AsyncClient = field(default_factory=get_async_supabase_client)
+    embedding_client: AsyncOpenAI = field(default_factory=get_openai_client)
+    reasoner_output: str | None = None
+    prefetched_documentation: str | None = None
+
+
+expert_agent = Agent(
+    tier_model("expert_agent", "primary"),
+    name="expert_agent",
+    defer_model_check=True,
+    deps_type=PydanticAIDeps,
+    retries=2,
+    history_processors=[
+        HistoryCompactor(EXPERT_HISTORY_TOKEN_BUDGET, name="expert_agent")
+    ],
+)
 
 
 @expert_agent.system_prompt
@@ -50,6 +63,19 @@ def add_reasoner_output(ctx: RunContext[PydanticAIDeps]) -> str:
     )
 
 
+@expert_agent.system_prompt(dynamic=True)
+def add_prefetched_documentation(ctx: RunContext[PydanticAIDeps]) -> str:
+    return (
+        f"""
+    \n\nDocumentation already retrieved for the user's latest message.
+    Use it first and only search again if it does not cover the question:
+    {ctx.deps.prefetched_documentation}
+    """
+        if ctx.deps.prefetched_documentation
+        else ""
+    )
+
+
 @expert_agent.tool
 async def retrieve_relevant_documentation(
     ctx: RunContext[PydanticAIDeps],
@@ -81,14 +107,19 @@ async def list_documentation_pages(ctx: RunContext[PydanticAIDeps]) -> list[str]
 
 
 @expert_agent.tool
-async def get_page_content(ctx: RunContext[PydanticAIDeps], url: str) -> str:
+async def get_page_content(
+    ctx: RunContext[PydanticAIDeps], url: str, query: str | None = None
+) -> str:
     """
     Retrieve the full content of a specific documentation page by combining all its chunks.
 
     Args:
         url: The URL of the page to retrieve
+        query: What you are looking for on the page; long pages are trimmed to the most relevant sections
 
     Returns:
         str: The complete page content with all chunks combined in order
     """
-    return await get_page_content_helper(url, ctx.deps.supabase)
+    return await get_page_content_helper(
+        url, ctx.deps.supabase, query, ctx.deps.embedding_client
+    )
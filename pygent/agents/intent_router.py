@@ -0,0 +1,268 @@
+import asyncio
+import json
+import re
+import time
+from collections import defaultdict, deque
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Literal
+
+import numpy as np
+
+from pygent.core.clients import client_errors
+from pygent.core.config import (
+    ROUTER_LOG_PATH,
+    ROUTER_MIN_EXAMPLES,
+    ROUTER_MIN_MARGIN,
+    ROUTER_MIN_SIMILARITY,
+    ROUTER_MODE,
+    ROUTER_TRAIN_EXAMPLES,
+)
+from pygent.core.logs import get_log_sink
+from pygent.core.scheduler import BACKGROUND, request_priority
+from pygent.tools.documentation import get_embedding
+
+RouteSource = Literal["rules", "centroid", "llm"]
+
+
+@dataclass
+class RouteDecision:
+    label: str
+    source: RouteSource
+    confidence: float
+    latency_ms: float
+
+
+@dataclass
+class RouterStats:
+    decisions: dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    latency_ms: dict[str, float] = field(default_factory=lambda: defaultdict(float))
+
+    def record(self, decision: RouteDecision) -> None:
+        self.decisions[decision.source] += 1
+        self.latency_ms[decision.source] += decision.latency_ms
+
+    @property
+    def local_ratio(self) -> float:
+        total = sum(self.decisions.values())
+        return (total - self.decisions["llm"]) / total if total else 0.0
+
+
+@dataclass
+class KeywordRule:
+    pattern: re.Pattern
+    label: str
+
+
+def keyword_route(rules: list[KeywordRule], message: str) -> str | None:
+    """The label of the matching rules, or None when none or several labels match."""
+    labels = {rule.label for rule in rules if rule.pattern.search(message)}
+    return labels.pop() if len(labels) == 1 else None
+
+
+class CentroidClassifier:
+    """Nearest-centroid classifier over message embeddings.
+
+    Each label's centroid is the normalized sum of its examples' embeddings, so
+    examples can be added one at a time. A prediction is confident when the
+    nearest centroid is at least `min_similarity` away and beats the runner-up
+    by `min_margin`.
+    """
+
+    def __init__(
+        self,
+        min_similarity: float = ROUTER_MIN_SIMILARITY,
+        min_margin: float = ROUTER_MIN_MARGIN,
+        min_examples: int = ROUTER_MIN_EXAMPLES,
+    ):
+        self.min_similarity = min_similarity
+        self.min_margin = min_margin
+        self.min_examples = min_examples
+        self._sums: dict[str, np.ndarray] = {}
+        self._counts: dict[str, int] = defaultdict(int)
+
+    def add(self, label: str, embedding: list[float]) -> None:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if not norm:
+            return
+        if label in self._sums:
+            self._sums[label] += vector / norm
+        else:
+            self._sums[label] = vector / norm
+        self._counts[label] += 1
+
+    @property
+    def trained_labels(self) -> list[str]:
+        return [
+            label for label, count in self._counts.items() if count >= self.min_examples
+        ]
+
+    def predict(self, embedding: list[float]) -> tuple[str, float] | None:
+        """The nearest label and its similarity, if the prediction is confident."""
+        labels = self.trained_labels
+        if len(labels) < 2:
+            return None
+        query = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if not norm:
+            return None
+
+        centroids = np.stack([self._sums[label] for label in labels])
+        centroids /= np.linalg.norm(centroids, axis=1, keepdims=True)
+        similarities = centroids @ (query / norm)
+        order = np.argsort(similarities)[::-1]
+        best, runner_up = similarities[order[0]], similarities[order[1]]
+        if best < self.min_similarity or best - runner_up < self.min_margin:
+            return None
+        return labels[order[0]], float(best)
+
+
+class TieredRouter:
+    """Route a message to one of `labels`, asking the LLM only when unsure.
+
+    Keyword rules answer first, then a nearest-centroid classifier trained on
+    earlier LLM decisions, then the `fallback` LLM call. Every LLM decision is
+    appended to `log_path` and immediately added to the classifier, so routing
+    gets cheaper as sessions accumulate.
+
+    The classifier is trained on the last `train_examples` logged decisions in
+    a background task, started by `start_training` or the first `route`. Until
+    it finishes, messages the rules miss go to the LLM.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        labels: tuple[str, ...],
+        fallback: Callable[[str], Awaitable[str]],
+        rules: list[KeywordRule] | None = None,
+        classifier: CentroidClassifier | None = None,
+        embed: Callable[[str], Awaitable[list[float]]] = get_embedding,
+        log_path: str | Path | None = ROUTER_LOG_PATH,
+        mode: str = ROUTER_MODE,
+        train_examples: int = ROUTER_TRAIN_EXAMPLES,
+    ):
+        self.name = name
+        self.labels = labels
+        self.fallback = fallback
+        self.rules = rules or []
+        self.classifier = classifier or CentroidClassifier()
+        self.embed = embed
+        self.log_path = Path(log_path) if log_path else None
+        # Never rotated: the log is the training data for the classifier.
+        self.log_sink = get_log_sink(log_path, max_bytes=0) if log_path else None
+        self.mode = mode
+        self.train_examples = train_examples
+        self.stats = RouterStats()
+        self._training: asyncio.Task | None = None
+        self._learning: set[asyncio.Task] = set()
+
+    def _load_log(self) -> list[dict]:
+        if self.log_path is None or not self.log_path.exists():
+            return []
+        records: deque[dict] = deque(maxlen=self.train_examples)
+        with open(self.log_path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if record["router"] == self.name and record["label"] in self.labels:
+                    records.append(record)
+        return list(records)
+
+    async def _train_from_log(self) -> None:
+        request_priority.set(BACKGROUND)
+        try:
+            records = await asyncio.to_thread(self._load_log)
+            embeddings = await asyncio.gather(
+                *(self.embed(record["message"]) for record in records)
+            )
+        except (*client_errors(), OSError, KeyError, TypeError) as e:
+            print(f"Error training the {self.name} router: {e}")
+            return
+        for record, embedding in zip(records, embeddings):
+            self.classifier.add(record["label"], embedding)
+
+    def start_training(self) -> None:
+        """Train the classifier on the decision log in the background, once.
+
+        The task runs on the caller's event loop. If that loop closes first, as
+        it does at the end of every Streamlit script run, the task is cancelled
+        before it added anything and the next call starts it again.
+        """
+        if self.mode != "tiered" or not self.train_examples:
+            return
+        training = self._training
+        if (
+            training is not None
+            and not training.cancelled()
+            and (training.done() or not training.get_loop().is_closed())
+        ):
+            return
+        self._training = asyncio.create_task(self._train_from_log())
+
+    async def _learn(self, message: str, label: str) -> None:
+        try:
+            embedding = await self.embed(message)
+        except client_errors() as e:
+            print(f"Error learning the {self.name} router's decision: {e}")
+            return
+        self.classifier.add(label, embedding)
+
+    def _log(self, message: str, decision: RouteDecision) -> None:
+        if self.log_sink is None:
+            return
+        self.log_sink.log(
+            {
+                "router": self.name,
+                "message": message,
+                "label": decision.label,
+                "latency_ms": round(decision.latency_ms, 1),
+            }
+        )
+
+    async def route_locally(self, message: str) -> RouteDecision | None:
+        start = time.perf_counter()
+        if label := keyword_route(self.rules, message):
+            return RouteDecision(
+                label, "rules", 1.0, (time.perf_counter() - start) * 1000
+            )
+
+        self.start_training()
+        if not self.classifier.trained_labels:
+            return None
+        try:
+            embedding = await self.embed(message)
+        except client_errors() as e:
+            print(f"Error embedding the message for the {self.name} router: {e}")
+            return None
+        if prediction := self.classifier.predict(embedding):
+            label, similarity = prediction
+            return RouteDecision(
+                label, "centroid", similarity, (time.perf_counter() - start) * 1000
+            )
+        return None
+
+    async def route(self, message: str) -> RouteDecision:
+        decision = None
+        if self.mode == "tiered":
+            decision = await self.route_locally(message)
+
+        if decision is None:
+            start = time.perf_counter()
+            label = await self.fallback(message)
+            decision = RouteDecision(
+                label, "llm", 1.0, (time.perf_counter() - start) * 1000
+            )
+            if label in self.labels:
+                self._log(message, decision)
+                if self.mode == "tiered":
+                    # Embed off the critical path; the next turn benefits.
+                    task = asyncio.create_task(self._learn(message, label))
+                    self._learning.add(task)
+                    task.add_done_callback(self._learning.discard)
+
+        self.stats.record(decision)
+        return decision
@@ -0,0 +1,253 @@
+"""Response cache for agents whose output depends only on their input.
+
+`CachedModel` wraps an agent's model and answers a request from an on-disk
+store when the same model already answered the same messages, settings and
+tools/output schema. Re-running a step after a crash, retrying it or replaying a
+recorded conversation then costs no model call, and a filled cache replays
+without reaching the provider.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import replace
+from datetime import UTC, datetime
+from functools import cache
+from typing import Any
+
+from pydantic_ai import Agent
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelMessagesTypeAdapter,
+    ModelResponse,
+)
+from pydantic_ai.models import Model, ModelRequestParameters
+from pydantic_ai.models.wrapper import WrapperModel
+from pydantic_ai.settings import ModelSettings
+from pydantic_ai.usage import RequestUsage
+from pydantic_core import to_jsonable_python
+
+from pygent.core import config
+from pygent.tools.embedding_cache import CacheStats
+
+from .routing import refine_router_agent, router_agent
+from .scoper_definer import summarize_scope_agent
+from .triage import triage_agent
+
+# Message fields that change between otherwise identical conversations.
+VOLATILE_MESSAGE_FIELDS = {
+    "timestamp",
+    "usage",
+    "model_name",
+    "provider_details",
+    "provider_request_id",
+    "tool_call_id",
+}
+
+# A broken or unreadable cache database, or an entry that no longer validates
+# as a response (ValueError covers pydantic's ValidationError).
+CACHE_ERRORS = (sqlite3.Error, OSError, ValueError)
+
+
+def _canonical(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {
+            key: _canonical(item)
+            for key, item in value.items()
+            if key not in VOLATILE_MESSAGE_FIELDS
+        }
+    if isinstance(value, list):
+        return [_canonical(item) for item in value]
+    return value
+
+
+def model_response_cache_key(
+    model_name: str,
+    messages: list[ModelMessage],
+    model_settings: ModelSettings | None,
+    model_request_parameters: ModelRequestParameters,
+) -> str:
+    """Digest of everything a model request depends on.
+
+    The messages carry the system prompt and instructions; the request
+    parameters carry the tool definitions and the output schema.
+    """
+    payload = {
+        "model": model_name,
+        "messages": _canonical(
+            ModelMessagesTypeAdapter.dump_python(messages, mode="json")
+        ),
+        "settings": to_jsonable_python(model_settings or {}),
+        "parameters": to_jsonable_python(model_request_parameters),
+    }
+    data = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class SqliteResponseCache:
+    """On-disk store of model responses, serialized as pydantic-ai messages JSON.
+
+    Like `SqliteEmbeddingCache`, the connection is opened on first use, entries
+    older than `ttl_seconds` are misses, and the oldest entries are dropped
+    once the table grows past `max_entries`.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = 10_000,
+        ttl_seconds: float | None = None,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stats = CacheStats()
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("pragma journal_mode=wal")
+            conn.execute(
+                """
+                create table if not exists responses (
+                    key text primary key,
+                    response blob not null,
+                    created_at real not null
+                )
+                """
+            )
+            conn.execute(
+                "create index if not exists idx_responses_created_at on responses (created_at)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> ModelResponse | None:
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "select response, created_at from responses where key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.stats.misses += 1
+                return None
+
+            response, created_at = row
+            if self.ttl_seconds and created_at + self.ttl_seconds < time.time():
+                conn.execute("delete from responses where key = ?", (key,))
+                conn.commit()
+                self.stats.evictions += 1
+                self.stats.misses += 1
+                return None
+
+        self.stats.hits += 1
+        [message] = ModelMessagesTypeAdapter.validate_json(response)
+        return message
+
+    def set(self, key: str, response: ModelResponse) -> None:
+        data = ModelMessagesTypeAdapter.dump_json([response])
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "insert or replace into responses (key, response, created_at) values (?, ?, ?)",
+                (key, data, time.time()),
+            )
+            (count,) = conn.execute("select count(*) from responses").fetchone()
+            if count > self.max_entries:
+                overflow = count - self.max_entries
+                conn.execute(
+                    "delete from responses where key in "
+                    "(select key from responses order by created_at limit ?)",
+                    (overflow,),
+                )
+                self.stats.evictions += overflow
+            conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class CachedModel(WrapperModel):
+    """Model answering repeated requests from a `SqliteResponseCache`.
+
+    A cached response is returned with zero usage, since replaying it costs
+    nothing. The store is read and written in a worker thread. Streamed
+    requests are passed through uncached.
+    """
+
+    def __init__(self, wrapped: Model | str, cache: SqliteResponseCache):
+        super().__init__(wrapped)
+        self.cache = cache
+
+    async def request(
+        self,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+    ) -> ModelResponse:
+        key = model_response_cache_key(
+            f"{self.system}:{self.model_name}",
+            messages,
+            model_settings,
+            model_request_parameters,
+        )
+        try:
+            cached = await asyncio.to_thread(self.cache.get, key)
+        except CACHE_ERRORS as e:
+            print(f"Error reading the model response cache: {e}")
+            cached = None
+        if cached is not None:
+            return replace(cached, usage=RequestUsage(), timestamp=datetime.now(UTC))
+
+        response = await self.wrapped.request(
+            messages, model_settings, model_request_parameters
+        )
+        try:
+            await asyncio.to_thread(self.cache.set, key, response)
+        except CACHE_ERRORS as e:
+            print(f"Error writing the model response cache: {e}")
+        return response
+
+
+model_cache = SqliteResponseCache(
+    config.MODEL_CACHE_PATH,
+    max_entries=config.MODEL_CACHE_SIZE,
+    ttl_seconds=config.MODEL_CACHE_TTL or None,
+)
+
+
+def cache_agent_model(agent: Agent, cache: SqliteResponseCache = model_cache) -> None:
+    """Put `agent`'s model behind `cache`.
+
+    Resolving the model needs the provider's credentials, so this runs when the
+    graph first runs rather than when the agents are defined.
+    """
+    if not isinstance(agent.model, CachedModel):
+        agent.model = CachedModel(agent.model, cache)
+
+
+@cache
+def configure_model_cache() -> None:
+    """Cache the agents whose output depends only on their input, once per process,
+    when `MODEL_CACHE` is enabled."""
+    if not config.MODEL_CACHE:
+        return
+    for agent in (
+        router_agent,
+        refine_router_agent,
+        triage_agent,
+        summarize_scope_agent,
+    ):
+        cache_agent_model(agent)
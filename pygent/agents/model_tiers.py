@@ -0,0 +1,234 @@
+"""Latency tiers for agent models.
+
+Each agent declares a tier with `tier_model`. A tier is a chain of models and a
+deadline: when a request to one model errors or misses the deadline, the next
+model in the chain is asked instead. Chains and deadlines come from the
+`*_MODELS` and `*_MODEL_TIMEOUT` settings, and can be overridden per agent with
+`AGENT_MODELS` and `AGENT_MODEL_TIMEOUTS`.
+
+A tier also sets the scheduling priority of its requests, so interactive
+routing is sent ahead of long generations when the rate limits are reached.
+"""
+
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import AsyncExitStack, asynccontextmanager
+from dataclasses import dataclass
+from functools import cache
+from typing import Any, Literal
+
+from pydantic_ai import Agent
+from pydantic_ai.messages import ModelMessage, ModelResponse
+from pydantic_ai.models import (
+    Model,
+    ModelRequestParameters,
+    StreamedResponse,
+    infer_model,
+)
+from pydantic_ai.models.fallback import FallbackModel
+from pydantic_ai.models.wrapper import WrapperModel
+from pydantic_ai.settings import ModelSettings
+from pydantic_ai.tools import RunContext
+
+from pygent.core import config
+from pygent.core.clients import get_openai_client
+from pygent.core.logs import log_event
+from pygent.core.metrics import record_model_fallback
+from pygent.core.scheduler import GENERATION, INTERACTIVE, request_priority
+
+Tier = Literal["fast", "primary", "reasoning"]
+
+
+@dataclass
+class ModelTier:
+    models: list[str]
+    timeout: float
+    priority: int = GENERATION
+
+
+def _parse_models(value: str) -> list[str]:
+    return [model.strip() for model in value.split(",") if model.strip()]
+
+
+def _parse_overrides(value: str) -> dict[str, str]:
+    overrides = {}
+    for item in value.split(";"):
+        agent, _, setting = item.partition("=")
+        if agent.strip() and setting.strip():
+            overrides[agent.strip()] = setting.strip()
+    return overrides
+
+
+MODEL_TIERS: dict[str, ModelTier] = {
+    "fast": ModelTier(
+        _parse_models(config.FAST_MODELS), config.FAST_MODEL_TIMEOUT, INTERACTIVE
+    ),
+    "primary": ModelTier(
+        _parse_models(config.PRIMARY_MODELS), config.PRIMARY_MODEL_TIMEOUT
+    ),
+    "reasoning": ModelTier(
+        _parse_models(config.REASONING_MODELS), config.REASONING_MODEL_TIMEOUT
+    ),
+}
+
+# The tier declared by each agent, by agent name.
+AGENT_TIERS: dict[str, Tier] = {}
+
+
+def agent_model_tier(name: str) -> ModelTier:
+    """The model chain and deadline of agent `name`, with its overrides applied."""
+    tier = MODEL_TIERS[AGENT_TIERS[name]]
+    models = _parse_overrides(config.AGENT_MODELS).get(name)
+    timeout = _parse_overrides(config.AGENT_MODEL_TIMEOUTS).get(name)
+    return ModelTier(
+        _parse_models(models) if models else tier.models,
+        float(timeout) if timeout else tier.timeout,
+        tier.priority,
+    )
+
+
+def tier_model(name: str, tier: Tier) -> str:
+    """Declare the tier of agent `name` and return the first model of its chain.
+
+    The agent runs on that model alone until `configure_model_tiers` installs
+    the whole chain, which needs the providers' credentials.
+    """
+    AGENT_TIERS[name] = tier
+    return agent_model_tier(name).models[0]
+
+
+class DeadlineModel(WrapperModel):
+    """Model whose requests fail with `TimeoutError` after `timeout` seconds.
+
+    A streamed request only has to start within the deadline, so a fallback
+    never replaces text the user has already seen.
+    """
+
+    def __init__(self, wrapped: Model | str, timeout: float):
+        super().__init__(wrapped)
+        self.timeout = timeout
+
+    async def request(
+        self,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+    ) -> ModelResponse:
+        async with asyncio.timeout(self.timeout):
+            return await self.wrapped.request(
+                messages, model_settings, model_request_parameters
+            )
+
+    @asynccontextmanager
+    async def request_stream(
+        self,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+        run_context: RunContext[Any] | None = None,
+    ) -> AsyncIterator[StreamedResponse]:
+        async with AsyncExitStack() as stack:
+            async with asyncio.timeout(self.timeout):
+                response_stream = await stack.enter_async_context(
+                    self.wrapped.request_stream(
+                        messages, model_settings, model_request_parameters, run_context
+                    )
+                )
+            yield response_stream
+
+
+class PriorityModel(WrapperModel):
+    """Model sending its requests at the scheduler priority `priority`."""
+
+    def __init__(self, wrapped: Model | str, priority: int):
+        super().__init__(wrapped)
+        self.priority = priority
+
+    async def request(
+        self,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+    ) -> ModelResponse:
+        token = request_priority.set(self.priority)
+        try:
+            return await self.wrapped.request(
+                messages, model_settings, model_request_parameters
+            )
+        finally:
+            request_priority.reset(token)
+
+    @asynccontextmanager
+    async def request_stream(
+        self,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+        run_context: RunContext[Any] | None = None,
+    ) -> AsyncIterator[StreamedResponse]:
+        token = request_priority.set(self.priority)
+        try:
+            async with self.wrapped.request_stream(
+                messages, model_settings, model_request_parameters, run_context
+            ) as response_stream:
+                yield response_stream
+        finally:
+            request_priority.reset(token)
+
+
+def resolve_model(model: Model | str) -> Model:
+    """`model` as a pydantic-ai model; OpenAI models share the scheduled client."""
+    if isinstance(model, Model):
+        return model
+    provider, _, model_name = model.rpartition(":")
+    if provider == "openai" or (
+        not provider and model_name.startswith(("gpt", "o1", "o3", "o4"))
+    ):
+        from pydantic_ai.models.openai import OpenAIModel
+        from pydantic_ai.providers.openai import OpenAIProvider
+
+        return OpenAIModel(
+            model_name, provider=OpenAIProvider(openai_client=get_openai_client())
+        )
+    return infer_model(model)
+
+
+def _fallback_on(agent: str):
+    def should_fall_back(exc: Exception) -> bool:
+        error = str(exc) or type(exc).__name__
+        log_event("model_fallback", agent=agent, error=error)
+        record_model_fallback(agent)
+        return True
+
+    return should_fall_back
+
+
+def build_tier_model(name: str, tier: ModelTier) -> Model:
+    """Agent `name`'s model chain, each model bounded by the tier's deadline."""
+    models = [
+        DeadlineModel(PriorityModel(resolve_model(model), tier.priority), tier.timeout)
+        for model in tier.models
+    ]
+    if len(models) == 1:
+        return models[0]
+    return FallbackModel(*models, fallback_on=_fallback_on(name))
+
+
+def use_model_tier(agent: Agent) -> None:
+    """Replace `agent`'s model with the chain of its declared tier.
+
+    Agents whose model was already replaced, e.g. by test models, are left as is.
+    """
+    if agent.name in AGENT_TIERS and isinstance(agent.model, str):
+        agent.model = build_tier_model(agent.name, agent_model_tier(agent.name))
+
+
+@cache
+def configure_model_tiers() -> None:
+    """Install the model chains of every agent, once per process."""
+    from pygent import agents
+
+    for name in agents.__all__:
+        agent = getattr(agents, name)
+        if isinstance(agent, Agent):
+            use_model_tier(agent)
@@ -1,14 +1,14 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
 
-import logfire
-from openai import AsyncOpenAI
 from pydantic_ai import Agent, RunContext
-from supabase import Client
 
-from pygent.core.clients import openai_client, supabase_client
-from pygent.core.config import PRIMARY_LLM_MODEL
+from pygent.agents.compaction import HistoryCompactor
+from pygent.agents.model_tiers import tier_model
+from pygent.core.clients import get_async_supabase_client, get_openai_client
+from pygent.core.config import REFINER_HISTORY_TOKEN_BUDGET
 from pygent.tools.documentation import (
     get_page_content_helper,
     list_documentation_pages_helper,
@@ -17,21 +17,28 @@ from pygent.tools.documentation import (
 
 from .agent_refiner_prompt import agent_refiner_prompt
 
-logfire.configure()
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+    from supabase import AsyncClient
 
 
 @dataclass
 class AgentRefinerDeps:
     refinement_request: str
-    supabase: Client = supabase_client
-    embedding_client: AsyncOpenAI = openai_client
+    supabase: AsyncClient = field(default_factory=get_async_supabase_client)
+    embedding_client: AsyncOpenAI = field(default_factory=get_openai_client)
 
 
 agent_refiner_agent = Agent(
-    PRIMARY_LLM_MODEL,
+    tier_model("agent_refiner_agent", "primary"),
+    name="agent_refiner_agent",
+    defer_model_check=True,
     system_prompt=agent_refiner_prompt,
     deps_type=AgentRefinerDeps,
     retries=2,
+    history_processors=[
+        HistoryCompactor(REFINER_HISTORY_TOKEN_BUDGET, name="agent_refiner_agent")
+    ],
 )
 
 
@@ -72,15 +79,20 @@ async def list_documentation_pages(ctx: RunContext[AgentRefinerDeps]) -> list[st
 
 
 @agent_refiner_agent.tool
-async def get_page_content(ctx: RunContext[AgentRefinerDeps], url: str) -> str:
+async def get_page_content(
+    ctx: RunContext[AgentRefinerDeps], url: str, query: str | None = None
+) -> str:
     """
     Retrieve the full content of a specific documentation page by combining all its chunks.
     Only use this tool to get pages related to setting up agents with Pydantic AI.
 
     Args:
         url: The URL of the page to retrieve
+        query: What you are looking for on the page; long pages are trimmed to the most relevant sections
 
     Returns:
         str: The complete page content with all chunks combined in order
     """
-    return await get_page_content_helper(url, ctx.deps.supabase)
+    return await get_page_content_helper(
+        url, ctx.deps.supabase, query, ctx.deps.embedding_client
+    )
@@ -1,12 +1,19 @@
 from __future__ import annotations
 
-import logfire
 from pydantic_ai import Agent
 
-from pygent.core.config import PRIMARY_LLM_MODEL
+from pygent.agents.compaction import HistoryCompactor
+from pygent.agents.model_tiers import tier_model
+from pygent.core.config import REFINER_HISTORY_TOKEN_BUDGET
 
 from .prompt_refiner_prompt import prompt_refiner_prompt
 
-logfire.configure()
-
-prompt_refiner_agent = Agent(PRIMARY_LLM_MODEL, system_prompt=prompt_refiner_prompt)
+prompt_refiner_agent = Agent(
+    tier_model("prompt_refiner_agent", "primary"),
+    name="prompt_refiner_agent",
+    defer_model_check=True,
+    system_prompt=prompt_refiner_prompt,
+    history_processors=[
+        HistoryCompactor(REFINER_HISTORY_TOKEN_BUDGET, name="prompt_refiner_agent")
+    ],
+)
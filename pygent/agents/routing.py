@@ -1,17 +1,83 @@
+import re
+import time
+
 from pydantic_ai import Agent
 
-from pygent.core.config import PRIMARY_LLM_MODEL, SMALL_LLM_MODEL
+from pygent.core.metrics import record_agent_run
+
+from .intent_router import KeywordRule, TieredRouter
+from .model_tiers import tier_model
 
 router_agent = Agent(
-    PRIMARY_LLM_MODEL,
+    tier_model("router_agent", "fast"),
+    name="router_agent",
+    defer_model_check=True,
     system_prompt="""Your job is to route the user message either to the end of the conversation or to continue coding the AI agent.""",
 )
 
 refine_router_agent = Agent(
-    SMALL_LLM_MODEL,
+    tier_model("refine_router_agent", "fast"),
+    name="refine_router_agent",
+    defer_model_check=True,
     instructions="""Your job is to decide which of the following categories the user's request falls into:
         1. `refine_prompt`: for request about refining the prompt for the agent.
         2. `refine_agent`: for request about refining the agent definition.
 
     Respond only with the category name.""",
 )
+
+
+async def route_next_step_with_llm(user_message: str) -> str:
+    prompt = f"""
+        The user has sent a message: 
+        
+        {user_message}
+
+        If the user wants to end the conversation, respond with just the text "finish_conversation".
+        If the user wants to continue coding the AI agent, respond with just the text "coder_agent".
+        If the user asks specifically to "refine" the agent, respond with just the text "refine".
+        """
+    start = time.perf_counter()
+    result = await router_agent.run(prompt)
+    record_agent_run(router_agent.name, result, time.perf_counter() - start)
+    return result.output
+
+
+async def route_refinement_with_llm(user_message: str) -> str:
+    start = time.perf_counter()
+    result = await refine_router_agent.run(user_message)
+    record_agent_run(refine_router_agent.name, result, time.perf_counter() - start)
+    return result.output
+
+
+next_step_router = TieredRouter(
+    "next_step",
+    labels=("finish_conversation", "coder_agent", "refine"),
+    fallback=route_next_step_with_llm,
+    rules=[
+        KeywordRule(re.compile(r"\brefine\b", re.IGNORECASE), "refine"),
+        KeywordRule(
+            re.compile(
+                r"^\W*(bye|goodbye|finish|end (the )?conversation|that'?s all"
+                r"|(i'?m|we'?re) done|(thanks|thank you),? (bye|that'?s all))\W*$",
+                re.IGNORECASE,
+            ),
+            "finish_conversation",
+        ),
+    ],
+)
+
+refine_router = TieredRouter(
+    "refine",
+    labels=("refine_prompt", "refine_agent"),
+    fallback=route_refinement_with_llm,
+    rules=[
+        KeywordRule(
+            re.compile(r"\b(system )?prompt\b", re.IGNORECASE), "refine_prompt"
+        ),
+        KeywordRule(
+            re.compile(r"\b(tools?|dependenc(y|ies)|deps|model)\b", re.IGNORECASE),
+            "refine_agent",
+        ),
+    ],
+)
@@ -1,10 +1,12 @@
 from pydantic import BaseModel, Field
 from pydantic_ai import Agent
 
-from pygent.core.config import PRIMARY_LLM_MODEL, REASONER_LLM_MODEL
+from .model_tiers import tier_model
 
 scope_definer_agent = Agent(
-    REASONER_LLM_MODEL,
+    tier_model("scope_definer_agent", "reasoning"),
+    name="scope_definer_agent",
+    defer_model_check=True,
     system_prompt="You are an expert at coding AI agents with Pydantic AI and defining the scope for doing so.",
 )
 
@@ -17,7 +19,9 @@ class ScopeSummary(BaseModel):
 
 
 summarize_scope_agent = Agent(
-    PRIMARY_LLM_MODEL,
+    tier_model("summarize_scope_agent", "primary"),
+    name="summarize_scope_agent",
+    defer_model_check=True,
     instructions="""Your goal is to priovide a summary of the scope of the project you will receive.
         Ensure to don't miss any important information as the summary it's intended for the scope review.""",
     output_type=ScopeSummary,
@@ -43,7 +47,9 @@ class ScopeRefinement(BaseModel):
 
 
 refine_scope_agent = Agent(
-    PRIMARY_LLM_MODEL,
+    tier_model("refine_scope_agent", "primary"),
+    name="refine_scope_agent",
+    defer_model_check=True,
     system_prompt="Your goal is to understand if the user has approved the scope and if not, provide feedback on how to improve it.",
     output_type=ScopeRefinement,
 )
@@ -3,7 +3,7 @@ from typing import Literal, Optional
 from pydantic import BaseModel, Field
 from pydantic_ai import Agent
 
-from pygent.core.config import PRIMARY_LLM_MODEL
+from .model_tiers import tier_model
 
 
 class TriageResult(BaseModel):
@@ -25,7 +25,9 @@ class TriageResult(BaseModel):
 
 
 triage_agent = Agent[None, TriageResult](
-    PRIMARY_LLM_MODEL,
+    tier_model("triage_agent", "fast"),
+    name="triage_agent",
+    defer_model_check=True,
     output_type=TriageResult,
     system_prompt="""Your goal is to identify the user request intent among the following options:
     1. 'Q&A': when the user is requesting specific information or brainstorming ideas.
@@ -1,21 +1,102 @@
-import logging
+"""API clients shared by the whole process.
+
+Each client is created on first use, so importing pygent neither needs the
+credentials nor pays for importing the Supabase and OpenAI SDKs.
+"""
 
-from openai import AsyncOpenAI
-from supabase import Client, create_client
+import logging
+from functools import cache
+from typing import TYPE_CHECKING
 
 from . import config
 
+if TYPE_CHECKING:
+    import httpx
+    from openai import AsyncOpenAI
+    from supabase import AsyncClient, Client
+
+
+def _check_supabase_settings() -> None:
+    if not config.SUPABASE_URL or not config.SUPABASE_SERVICE_KEY:
+        logging.error(
+            "SUPABASE_URL and SUPABASE_KEY must be set in the environment variables."
+        )
+        raise ValueError(
+            "SUPABASE_URL and SUPABASE_KEY must be set in the environment variables."
+        )
+
+
 # Supabase
-if not config.SUPABASE_URL or not config.SUPABASE_SERVICE_KEY:
-    logging.error(
-        "SUPABASE_URL and SUPABASE_KEY must be set in the environment variables."
+@cache
+def get_supabase_client() -> "Client":
+    from supabase import create_client
+
+    _check_supabase_settings()
+    return create_client(config.SUPABASE_URL, config.SUPABASE_SERVICE_KEY)
+
+
+@cache
+def get_supabase_http_client() -> "httpx.AsyncClient":
+    # Pooled HTTP connection shared by every async PostgREST request, so concurrent
+    # tool calls reuse keep-alive connections instead of opening one per query.
+    import httpx
+
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=config.SUPABASE_MAX_CONNECTIONS,
+            max_keepalive_connections=config.SUPABASE_MAX_CONNECTIONS,
+        ),
+        timeout=config.SUPABASE_TIMEOUT,
+        follow_redirects=True,
+        http2=True,
     )
-    raise ValueError(
-        "SUPABASE_URL and SUPABASE_KEY must be set in the environment variables."
+
+
+@cache
+def get_async_supabase_client() -> "AsyncClient":
+    from supabase import AsyncClient, AsyncClientOptions
+
+    _check_supabase_settings()
+    return AsyncClient(
+        config.SUPABASE_URL,
+        config.SUPABASE_SERVICE_KEY,
+        AsyncClientOptions(httpx_client=get_supabase_http_client()),
     )
-supabase_client: Client = create_client(
-    config.SUPABASE_URL, config.SUPABASE_SERVICE_KEY
-)
+
 
 # OpenAI
-openai_client = AsyncOpenAI(api_key=config.OPENAI_API_KEY)
+@cache
+def get_openai_client() -> "AsyncOpenAI":
+    from openai import AsyncOpenAI
+
+    from .scheduler import scheduled_http_client
+
+    # Retries happen in the scheduler, which paces them across every caller.
+    return AsyncOpenAI(
+        api_key=config.OPENAI_API_KEY,
+        max_retries=0,
+        http_client=scheduled_http_client(),
+    )
+
+
+@cache
+def client_errors() -> tuple[type[Exception], ...]:
+    """The errors a failed Supabase or OpenAI call raises.
+
+    `ValueError` covers missing settings and malformed responses. Meant for
+    `except client_errors():`, which only runs once a call has failed, so
+    importing pygent still does not import the SDKs.
+    """
+    import httpx
+    from openai import OpenAIError
+    from postgrest.exceptions import APIError
+
+    return (OpenAIError, APIError, httpx.HTTPError, ValueError)
+
+
+async def close_clients() -> None:
+    """Close the async clients that have been created."""
+    if get_supabase_http_client.cache_info().currsize:
+        await get_supabase_http_client().aclose()
+    if get_openai_client.cache_info().currsize:
+        await get_openai_client().close()
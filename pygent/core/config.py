@@ -8,10 +8,117 @@ REASONER_LLM_MODEL = os.getenv("REASONER_MODEL", "o3-mini")
 PRIMARY_LLM_MODEL = os.getenv("PRIMARY_MODEL", "gpt-4o")
 SMALL_LLM_MODEL = os.getenv("SMALL_MODEL", "gpt-4.1-mini")
 
+# Model Tiers: comma-separated model chains, each model tried in turn when the one
+# before it errors or misses the tier's deadline (seconds per model request)
+FAST_MODELS = os.getenv("FAST_MODELS", f"{SMALL_LLM_MODEL},gpt-4.1-nano")
+PRIMARY_MODELS = os.getenv("PRIMARY_MODELS", f"{PRIMARY_LLM_MODEL},{SMALL_LLM_MODEL}")
+REASONING_MODELS = os.getenv(
+    "REASONING_MODELS", f"{REASONER_LLM_MODEL},{PRIMARY_LLM_MODEL}"
+)
+FAST_MODEL_TIMEOUT = float(os.getenv("FAST_MODEL_TIMEOUT", "10"))
+PRIMARY_MODEL_TIMEOUT = float(os.getenv("PRIMARY_MODEL_TIMEOUT", "120"))
+REASONING_MODEL_TIMEOUT = float(os.getenv("REASONING_MODEL_TIMEOUT", "300"))
+# Per-agent overrides, e.g. `triage_agent=gpt-4o,gpt-4.1-mini;expert_agent=o3-mini`
+# and `triage_agent=5;expert_agent=180`
+AGENT_MODELS = os.getenv("AGENT_MODELS", "")
+AGENT_MODEL_TIMEOUTS = os.getenv("AGENT_MODEL_TIMEOUTS", "")
+
 # API Keys
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 SUPABASE_URL = os.getenv("SUPABASE_URL", "")
 SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY", "")
 
+# OpenAI Rate Limits: token buckets per model for every request sent with the shared
+# client (0 disables), with per-model overrides, e.g. `gpt-4o=500/30000;o3-mini=100/0`
+OPENAI_RPM = int(os.getenv("OPENAI_RPM", "500"))
+OPENAI_TPM = int(os.getenv("OPENAI_TPM", "200000"))
+OPENAI_RATE_LIMITS = os.getenv("OPENAI_RATE_LIMITS", "")
+# Seconds of the limits a model's buckets hold, the largest burst sent at once
+OPENAI_RATE_BURST_SECONDS = float(os.getenv("OPENAI_RATE_BURST_SECONDS", "60"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "4"))
+OPENAI_BACKOFF_BASE = float(os.getenv("OPENAI_BACKOFF_BASE", "0.5"))
+OPENAI_BACKOFF_MAX = float(os.getenv("OPENAI_BACKOFF_MAX", "30"))
+
 # Embedding Model
 EMBEDDING_MODEL = "text-embedding-3-small"
+
+# Embedding Cache
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "1024"))
+EMBEDDING_CACHE_DISK_SIZE = int(os.getenv("EMBEDDING_CACHE_DISK_SIZE", "100000"))
+EMBEDDING_CACHE_TTL = float(os.getenv("EMBEDDING_CACHE_TTL", str(30 * 24 * 3600)))
+EMBEDDING_CACHE_PATH = os.getenv(
+    "EMBEDDING_CACHE_PATH", "workbench/embedding_cache.sqlite"
+)
+
+# Embedding Batching
+EMBEDDING_BATCH_WINDOW_MS = float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "10"))
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "16"))
+
+# Supabase Connection Pool
+SUPABASE_MAX_CONNECTIONS = int(os.getenv("SUPABASE_MAX_CONNECTIONS", "20"))
+SUPABASE_TIMEOUT = float(os.getenv("SUPABASE_TIMEOUT", "30"))
+
+# Documentation Corpus
+DOCS_SOURCE = os.getenv("DOCS_SOURCE", "pydantic_ai_docs")
+DOCS_INDEX_REFRESH_SECONDS = float(os.getenv("DOCS_INDEX_REFRESH_SECONDS", "60"))
+
+# Page Content
+PAGE_CONTENT_MAX_CHARS = int(os.getenv("PAGE_CONTENT_MAX_CHARS", "20000"))
+PAGE_CACHE_MAX_BYTES = int(os.getenv("PAGE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+# Retrieval Backend
+RETRIEVER_BACKEND = os.getenv("RETRIEVER_BACKEND", "supabase")
+LOCAL_INDEX_PATH = os.getenv("LOCAL_INDEX_PATH", "workbench/index")
+
+# Retrieval Mode: `vector`, or `hybrid` to fuse vector and full-text rankings
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "vector")
+RRF_K = int(os.getenv("RRF_K", "60"))
+HYBRID_CANDIDATE_MULTIPLIER = int(os.getenv("HYBRID_CANDIDATE_MULTIPLIER", "4"))
+
+# Graph Message History
+HISTORY_CACHE_SIZE = int(os.getenv("HISTORY_CACHE_SIZE", "256"))
+
+# Run State: persisted graph state of this many recent runs is kept indexed in memory
+RUN_STATE_CACHE_SIZE = int(os.getenv("RUN_STATE_CACHE_SIZE", "256"))
+
+# Conversation Compaction: approximate token budgets for the history sent to a model
+EXPERT_HISTORY_TOKEN_BUDGET = int(os.getenv("EXPERT_HISTORY_TOKEN_BUDGET", "24000"))
+REFINER_HISTORY_TOKEN_BUDGET = int(os.getenv("REFINER_HISTORY_TOKEN_BUDGET", "16000"))
+
+# Speculative Retrieval: search the docs for the user's message while triage runs
+SPECULATIVE_RETRIEVAL = os.getenv("SPECULATIVE_RETRIEVAL", "false").lower() == "true"
+
+# Intent Routing: `tiered` answers locally when confident, `llm` always asks the model
+ROUTER_MODE = os.getenv("ROUTER_MODE", "tiered")
+ROUTER_MIN_SIMILARITY = float(os.getenv("ROUTER_MIN_SIMILARITY", "0.5"))
+ROUTER_MIN_MARGIN = float(os.getenv("ROUTER_MIN_MARGIN", "0.05"))
+ROUTER_MIN_EXAMPLES = int(os.getenv("ROUTER_MIN_EXAMPLES", "5"))
+ROUTER_LOG_PATH = os.getenv("ROUTER_LOG_PATH", "workbench/router_decisions.jsonl")
+# Most recent logged decisions embedded to train the classifier at startup
+ROUTER_TRAIN_EXAMPLES = int(os.getenv("ROUTER_TRAIN_EXAMPLES", "2000"))
+
+# Q&A Answer Cache: reuse answers to near-identical questions (size 0 disables)
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "512"))
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.92"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", str(7 * 24 * 3600)))
+
+# Model Response Cache: replay responses of the routing, triage and scope summary agents
+MODEL_CACHE = os.getenv("MODEL_CACHE", "false").lower() == "true"
+MODEL_CACHE_PATH = os.getenv("MODEL_CACHE_PATH", "workbench/model_cache.sqlite")
+MODEL_CACHE_SIZE = int(os.getenv("MODEL_CACHE_SIZE", "10000"))
+MODEL_CACHE_TTL = float(os.getenv("MODEL_CACHE_TTL", str(30 * 24 * 3600)))
+
+# Structured Logs: JSONL written by a background thread, rotated past LOG_MAX_BYTES
+LOG_PATH = os.getenv("LOG_PATH", "workbench/logs.jsonl")
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "256"))
+
+# API Server
+SERVER_HOST = os.getenv("SERVER_HOST", "127.0.0.1")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+SERVER_MAX_CONCURRENT_RUNS = int(os.getenv("SERVER_MAX_CONCURRENT_RUNS", "32"))
+SERVER_QUEUE_TIMEOUT = float(os.getenv("SERVER_QUEUE_TIMEOUT", "10"))
+# Replace every model with a TestModel and skip external lookups, for local tests
+SERVER_STUB_MODELS = os.getenv("SERVER_STUB_MODELS", "false").lower() == "true"
@@ -0,0 +1,198 @@
+"""Structured JSONL logs written off the event loop.
+
+`log_event` only puts a record on a queue; a background thread per log file
+drains it in batches, so async code never blocks on file I/O.
+"""
+
+import atexit
+import json
+import queue
+import threading
+import time
+from contextvars import ContextVar
+from datetime import UTC, datetime
+from functools import wraps
+from pathlib import Path
+from typing import Any
+
+from . import config
+
+# Fields added to every record logged from the current task, e.g. the run id.
+log_context: ContextVar[dict[str, Any] | None] = ContextVar("log_context", default=None)
+
+
+class JsonlLogSink:
+    """Appends JSON records to `path` from a background writer thread.
+
+    The writer drains up to `batch_size` queued records per write and rotates
+    the file once it would grow past `max_bytes`, keeping `backup_count` old
+    files (`max_bytes=0` never rotates). When `max_queue` records are already
+    pending, new records are dropped and counted instead of blocking the caller.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        max_bytes: int = config.LOG_MAX_BYTES,
+        backup_count: int = config.LOG_BACKUP_COUNT,
+        max_queue: int = config.LOG_QUEUE_SIZE,
+        batch_size: int = config.LOG_BATCH_SIZE,
+    ):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.batch_size = batch_size
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self._queue: queue.Queue[dict | None] = queue.Queue(max_queue)
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def log(self, record: dict) -> None:
+        self._start()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self) -> None:
+        """Block until every record logged so far is written."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self) -> None:
+        """Write the pending records and stop the writer thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    def _start(self) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name=f"log-{self.path.name}", daemon=True
+                    )
+                    self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            records = [record for record in batch if record is not None]
+            try:
+                if records:
+                    self._write(records)
+            except (OSError, TypeError, ValueError) as e:
+                # The file can't be written or a record can't be serialized;
+                # drop the batch and keep the thread serving later records.
+                print(f"Error writing logs to {self.path}: {e}")
+            finally:
+                # Even when a bug ends the thread, `flush` must not wait forever.
+                for _ in batch:
+                    self._queue.task_done()
+            if len(records) < len(batch):
+                return
+
+    def _write(self, records: list[dict]) -> None:
+        data = "".join(json.dumps(record, default=str) + "\n" for record in records)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if (
+            self.max_bytes
+            and self.path.exists()
+            and self.path.stat().st_size + len(data.encode()) > self.max_bytes
+        ):
+            self._rotate()
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(data)
+        self.written += len(records)
+        self.batches += 1
+
+    def _rotate(self) -> None:
+        if self.backup_count == 0:
+            self.path.unlink()
+            return
+        for i in range(self.backup_count - 1, 0, -1):
+            backup = self.path.with_name(f"{self.path.name}.{i}")
+            if backup.exists():
+                backup.replace(self.path.with_name(f"{self.path.name}.{i + 1}"))
+        self.path.replace(self.path.with_name(f"{self.path.name}.1"))
+
+
+_sinks: dict[Path, JsonlLogSink] = {}
+
+
+def get_log_sink(path: str | Path, **options) -> JsonlLogSink:
+    """The shared sink for `path`, so every file has a single writer."""
+    path = Path(path)
+    if path not in _sinks:
+        _sinks[path] = JsonlLogSink(path, **options)
+    return _sinks[path]
+
+
+def flush_logs() -> None:
+    for sink in list(_sinks.values()):
+        sink.flush()
+
+
+def close_logs() -> None:
+    for sink in list(_sinks.values()):
+        sink.close()
+
+
+atexit.register(close_logs)
+
+log_sink = get_log_sink(config.LOG_PATH)
+
+
+def log_event(event: str, **fields: Any) -> None:
+    log_sink.log(
+        {
+            "time": datetime.now(UTC).isoformat(),
+            "event": event,
+            **(log_context.get() or {}),
+            **fields,
+        }
+    )
+
+
+def log_node_execution(func):
+    """Decorator logging the duration and outcome of a graph node's `run`.
+
+    Args:
+        func: The async `run` method to wrap
+    """
+    node = func.__qualname__.split(".")[0]
+
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = await func(*args, **kwargs)
+        except Exception as e:
+            log_event(
+                "node",
+                node=node,
+                status="error",
+                duration=time.perf_counter() - start,
+                error=str(e),
+            )
+            raise
+        log_event(
+            "node",
+            node=node,
+            status="ok",
+            duration=time.perf_counter() - start,
+            next=type(result).__name__,
+        )
+        return result
+
+    return wrapper
@@ -0,0 +1,312 @@
+"""Latency, token and cost accounting for graph nodes, agents and retrieval.
+
+Every observation goes to the process-wide `metrics` registry, which renders in
+the Prometheus text format, and to the `RunMetrics` of the graph step in
+progress (see `current_run`), which is summarized once the step completes.
+"""
+
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+
+from pydantic_ai.agent import AgentRunResult
+from pydantic_ai.messages import ModelResponse, ToolCallPart
+
+# USD per million input and output tokens, matched by model name prefix.
+MODEL_PRICES: dict[str, tuple[float, float]] = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "o1": (15.00, 60.00),
+    "o3": (2.00, 8.00),
+    "o3-mini": (1.10, 4.40),
+    "o4-mini": (1.10, 4.40),
+}
+
+# pydantic-ai's name for the tool that returns structured output.
+OUTPUT_TOOL_NAME = "final_result"
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def estimate_cost(
+    model_name: str | None, input_tokens: int, output_tokens: int
+) -> float:
+    """Cost of a model request in USD, or 0 for models without a known price."""
+    name = (model_name or "").split(":")[-1]
+    prefixes = [prefix for prefix in MODEL_PRICES if name.startswith(prefix)]
+    if not prefixes:
+        return 0.0
+    input_price, output_price = MODEL_PRICES[max(prefixes, key=len)]
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+
+@dataclass
+class AgentUsage:
+    runs: int = 0
+    requests: int = 0
+    tool_calls: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cost: float = 0.0
+    model_seconds: float = 0.0
+    tool_seconds: float = 0.0
+
+    @classmethod
+    def from_result(
+        cls, result: AgentRunResult, model_seconds: float, tool_seconds: float = 0.0
+    ) -> "AgentUsage":
+        """Usage of the model requests made during one agent run."""
+        usage = cls(runs=1, model_seconds=model_seconds, tool_seconds=tool_seconds)
+        for message in result.new_messages():
+            if not isinstance(message, ModelResponse):
+                continue
+            usage.requests += 1
+            # Structured output arrives as a call to the output tool; not a tool use.
+            usage.tool_calls += sum(
+                isinstance(part, ToolCallPart)
+                and not part.tool_name.startswith(OUTPUT_TOOL_NAME)
+                for part in message.parts
+            )
+            usage.input_tokens += message.usage.input_tokens
+            usage.output_tokens += message.usage.output_tokens
+            usage.cost += estimate_cost(
+                message.model_name,
+                message.usage.input_tokens,
+                message.usage.output_tokens,
+            )
+        return usage
+
+    def add(self, other: "AgentUsage") -> None:
+        for name, value in asdict(other).items():
+            setattr(self, name, getattr(self, name) + value)
+
+
+@dataclass
+class RetrievalStats:
+    queries: int = 0
+    chunks: int = 0
+    empty: int = 0
+
+
+@dataclass
+class RunMetrics:
+    """Everything observed during one graph step, for its summary record."""
+
+    node_seconds: dict[str, float] = field(default_factory=dict)
+    agents: dict[str, AgentUsage] = field(default_factory=dict)
+    retrieval: RetrievalStats = field(default_factory=RetrievalStats)
+
+    def observe_node(self, node: str, seconds: float) -> None:
+        self.node_seconds[node] = self.node_seconds.get(node, 0.0) + seconds
+
+    def observe_agent(self, agent: str, usage: AgentUsage) -> None:
+        self.agents.setdefault(agent, AgentUsage()).add(usage)
+
+    def observe_retrieval(self, chunks: int) -> None:
+        self.retrieval.queries += 1
+        self.retrieval.chunks += chunks
+        self.retrieval.empty += chunks == 0
+
+    def summary(self) -> dict:
+        total = AgentUsage()
+        for usage in self.agents.values():
+            total.add(usage)
+        return {
+            "nodes": self.node_seconds,
+            "agents": {name: asdict(usage) for name, usage in self.agents.items()},
+            "retrieval": asdict(self.retrieval),
+            "requests": total.requests,
+            "input_tokens": total.input_tokens,
+            "output_tokens": total.output_tokens,
+            "cost": total.cost,
+        }
+
+
+def _labels(label: str | None, value: str, extra: str = "") -> str:
+    pairs = [f'{label}="{_escape(value)}"'] if label else []
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class LabeledCounter:
+    def __init__(self, name: str, help: str, label: str | None = None):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.values: dict[str, float] = {}
+
+    def inc(self, value: str = "", amount: float = 1.0) -> None:
+        self.values[value] = self.values.get(value, 0.0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for value, total in sorted(self.values.items()):
+            lines.append(f"{self.name}{_labels(self.label, value)} {total:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        label: str,
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.buckets = buckets
+        # Per label value: the count in each bucket, then the sum and the count.
+        self.series: dict[str, list[float]] = {}
+
+    def observe(self, value: str, amount: float) -> None:
+        series = self.series.setdefault(value, [0.0] * (len(self.buckets) + 2))
+        for i, bound in enumerate(self.buckets):
+            if amount <= bound:
+                series[i] += 1
+        series[-2] += amount
+        series[-1] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for value, series in sorted(self.series.items()):
+            for bound, count in zip(self.buckets, series):
+                labels = _labels(self.label, value, f'le="{bound:g}"')
+                lines.append(f"{self.name}_bucket{labels} {count:g}")
+            labels = _labels(self.label, value, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {series[-1]:g}")
+            labels = _labels(self.label, value)
+            lines.append(f"{self.name}_sum{labels} {series[-2]:g}")
+            lines.append(f"{self.name}_count{labels} {series[-1]:g}")
+        return lines
+
+
+class MetricsRegistry:
+    """Process-wide totals, rendered for a Prometheus scrape."""
+
+    def __init__(self):
+        self.step_seconds = Histogram(
+            "pygent_graph_step_duration_seconds",
+            "Wall time of graph steps, from a user message to the reply.",
+            "status",
+        )
+        self.node_seconds = Histogram(
+            "pygent_node_duration_seconds", "Wall time of graph nodes.", "node"
+        )
+        self.agent_seconds = Histogram(
+            "pygent_agent_duration_seconds", "Wall time of agent runs.", "agent"
+        )
+        self.agent_counters = {
+            name: LabeledCounter(f"pygent_agent_{metric}", help, "agent")
+            for name, metric, help in [
+                ("runs", "runs_total", "Agent runs."),
+                ("requests", "model_requests_total", "Model requests made by agents."),
+                ("tool_calls", "tool_calls_total", "Tool calls made by agents."),
+                ("input_tokens", "input_tokens_total", "Input tokens sent to models."),
+                ("output_tokens", "output_tokens_total", "Output tokens generated."),
+                ("cost", "cost_usd_total", "Estimated model cost in USD."),
+                ("model_seconds", "model_seconds_total", "Time spent in model calls."),
+                ("tool_seconds", "tool_seconds_total", "Time spent running tools."),
+            ]
+        }
+        self.model_fallbacks = LabeledCounter(
+            "pygent_model_fallbacks_total",
+            "Model requests that failed or missed their deadline, by agent.",
+            "agent",
+        )
+        self.scheduler_wait = Histogram(
+            "pygent_scheduler_wait_seconds",
+            "Time OpenAI requests waited for their rate limit, by priority.",
+            "priority",
+        )
+        self.scheduler_retries = LabeledCounter(
+            "pygent_scheduler_retries_total",
+            "OpenAI requests retried, by the status that caused the retry.",
+            "status",
+        )
+        self.retrieval_queries = LabeledCounter(
+            "pygent_retrieval_queries_total",
+            "Documentation searches, by whether they found any chunk.",
+            "result",
+        )
+        self.retrieval_chunks = LabeledCounter(
+            "pygent_retrieval_chunks_total", "Documentation chunks retrieved."
+        )
+
+    def observe_step(self, status: str, seconds: float) -> None:
+        self.step_seconds.observe(status, seconds)
+
+    def observe_node(self, node: str, seconds: float) -> None:
+        self.node_seconds.observe(node, seconds)
+
+    def observe_agent(self, agent: str, usage: AgentUsage) -> None:
+        self.agent_seconds.observe(agent, usage.model_seconds + usage.tool_seconds)
+        for name, value in asdict(usage).items():
+            self.agent_counters[name].inc(agent, value)
+
+    def observe_retrieval(self, chunks: int) -> None:
+        self.retrieval_queries.inc("hit" if chunks else "empty")
+        self.retrieval_chunks.inc(amount=chunks)
+
+    def render(self) -> str:
+        metrics = [
+            self.step_seconds,
+            self.node_seconds,
+            self.agent_seconds,
+            *self.agent_counters.values(),
+            self.model_fallbacks,
+            self.scheduler_wait,
+            self.scheduler_retries,
+            self.retrieval_queries,
+            self.retrieval_chunks,
+        ]
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+metrics = MetricsRegistry()
+
+# The metrics of the graph step running in the current task, if any.
+current_run: ContextVar[RunMetrics | None] = ContextVar("current_run", default=None)
+
+
+def _observers() -> list[MetricsRegistry | RunMetrics]:
+    run = current_run.get()
+    return [metrics] if run is None else [metrics, run]
+
+
+def record_node(node: str, seconds: float) -> None:
+    for observer in _observers():
+        observer.observe_node(node, seconds)
+
+
+def record_agent_run(
+    agent: str, result: AgentRunResult, model_seconds: float, tool_seconds: float = 0.0
+) -> None:
+    usage = AgentUsage.from_result(result, model_seconds, tool_seconds)
+    for observer in _observers():
+        observer.observe_agent(agent, usage)
+
+
+def record_model_fallback(agent: str) -> None:
+    metrics.model_fallbacks.inc(agent)
+
+
+def record_scheduler_wait(priority: str, seconds: float) -> None:
+    metrics.scheduler_wait.observe(priority, seconds)
+
+
+def record_scheduler_retry(status: str) -> None:
+    metrics.scheduler_retries.inc(status)
+
+
+def record_retrieval(chunks: int) -> None:
+    for observer in _observers():
+        observer.observe_retrieval(chunks)
@@ -0,0 +1,390 @@
+"""Rate-limited scheduling of outbound OpenAI requests.
+
+Every request sent with the shared OpenAI client goes through `scheduler`. A
+request waits for its model's requests-per-minute and tokens-per-minute
+buckets, and higher priority requests are served first. 429s and server errors
+are retried with jittered backoff that honors `Retry-After`. A 429 also pauses
+and drains the model's buckets, so concurrent callers slow down together
+instead of each running into the limit again.
+"""
+
+import asyncio
+import heapq
+import itertools
+import json
+import random
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from contextvars import ContextVar
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+
+import httpx
+
+from . import config
+from .metrics import record_scheduler_retry, record_scheduler_wait
+
+# Priority classes, served lowest first.
+INTERACTIVE = 0
+GENERATION = 1
+BACKGROUND = 2
+PRIORITY_NAMES = {
+    INTERACTIVE: "interactive",
+    GENERATION: "generation",
+    BACKGROUND: "background",
+}
+
+# The priority of requests sent from the current task.
+request_priority: ContextVar[int] = ContextVar("request_priority", default=INTERACTIVE)
+
+RETRY_STATUSES = {408, 409, 429}
+
+
+class TokenBucket:
+    """Refills `per_minute` units a minute, holding `burst_seconds` worth.
+
+    With the default burst the bucket holds the whole per-minute limit, like
+    the provider's own accounting. A request larger than the bucket is let
+    through once the bucket is full and leaves it in debt, so the following
+    requests wait until it is repaid.
+    """
+
+    def __init__(
+        self, per_minute: float, burst_seconds: float = config.OPENAI_RATE_BURST_SECONDS
+    ):
+        self.rate = per_minute / 60
+        self.capacity = max(self.rate * burst_seconds, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def delay(self, amount: float, now: float) -> float:
+        """Seconds until `amount` units can be taken."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        missing = min(amount, self.capacity) - self.tokens
+        return max(0.0, missing / self.rate)
+
+    def take(self, amount: float) -> None:
+        self.tokens -= amount
+
+    def give_back(self, amount: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    def drain(self) -> None:
+        self.tokens = min(self.tokens, 0.0)
+
+
+class RateLimiter:
+    """Grants requests to one model in priority order, within its budgets.
+
+    `requests_per_minute` or `tokens_per_minute` of 0 leaves that budget
+    unlimited. The budgets are shared by every thread and event loop in the
+    process (Streamlit runs each session on its own): each waiter is woken on
+    its own loop, and waits for the budget to refill on a timer thread.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        burst_seconds: float = config.OPENAI_RATE_BURST_SECONDS,
+    ):
+        self.requests = (
+            TokenBucket(requests_per_minute, burst_seconds)
+            if requests_per_minute
+            else None
+        )
+        self.tokens = (
+            TokenBucket(tokens_per_minute, burst_seconds) if tokens_per_minute else None
+        )
+        self.paused_until = 0.0
+        self._waiters: list[tuple[int, int, int, asyncio.Future[None]]] = []
+        self._order = itertools.count()
+        self._timer: threading.Timer | None = None
+        self._lock = threading.RLock()
+
+    @property
+    def waiting(self) -> int:
+        with self._lock:
+            return sum(not future.done() for *_, future in self._waiters)
+
+    async def acquire(self, tokens: int, priority: int = INTERACTIVE) -> None:
+        future = asyncio.get_running_loop().create_future()
+        with self._lock:
+            heapq.heappush(self._waiters, (priority, next(self._order), tokens, future))
+        self._dispatch()
+        await future
+
+    def settle(self, estimated: int, used: int) -> None:
+        """Correct the tokens charged for a request once its usage is known."""
+        if self.tokens is None or used == estimated:
+            return
+        with self._lock:
+            if used > estimated:
+                self.tokens.take(used - estimated)
+                return
+            self.tokens.give_back(estimated - used)
+        self._dispatch()
+
+    def pause(self, seconds: float) -> None:
+        """Grant nothing for `seconds`, then restart from empty buckets."""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            for bucket in (self.requests, self.tokens):
+                if bucket is not None:
+                    bucket.drain()
+        self._dispatch()
+
+    def _refund(self, tokens: int) -> None:
+        if self.requests is not None:
+            self.requests.give_back(1)
+        if self.tokens is not None:
+            self.tokens.give_back(tokens)
+
+    def _grant(self, future: asyncio.Future[None], tokens: int) -> None:
+        """Runs on the waiter's loop; a waiter cancelled meanwhile gives its share back."""
+        if not future.done():
+            future.set_result(None)
+            return
+        with self._lock:
+            self._refund(tokens)
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+            while self._waiters:
+                _, _, tokens, future = self._waiters[0]
+                if future.done():
+                    heapq.heappop(self._waiters)
+                    continue
+
+                now = time.monotonic()
+                delay = max(
+                    self.paused_until - now,
+                    self.requests.delay(1, now) if self.requests else 0.0,
+                    self.tokens.delay(tokens, now) if self.tokens else 0.0,
+                )
+                if delay > 0:
+                    self._timer = threading.Timer(delay, self._dispatch)
+                    self._timer.daemon = True
+                    self._timer.start()
+                    return
+
+                heapq.heappop(self._waiters)
+                if self.requests is not None:
+                    self.requests.take(1)
+                if self.tokens is not None:
+                    self.tokens.take(tokens)
+                try:
+                    future.get_loop().call_soon_threadsafe(self._grant, future, tokens)
+                except RuntimeError:
+                    # The waiter's event loop has closed.
+                    self._refund(tokens)
+
+
+@dataclass
+class SchedulerStats:
+    requests: int = 0
+    retries: int = 0
+    rate_limited: int = 0
+    wait_seconds: float = 0.0
+
+
+def _parse_rate_limits(value: str) -> dict[str, tuple[int, int]]:
+    limits = {}
+    for item in value.split(";"):
+        model, _, limit = item.partition("=")
+        if model.strip() and limit.strip():
+            rpm, _, tpm = limit.partition("/")
+            limits[model.strip()] = (int(rpm or 0), int(tpm or 0))
+    return limits
+
+
+def estimate_tokens(request: httpx.Request) -> tuple[str, int]:
+    """The model a request is for and roughly how many tokens it will use.
+
+    Prompt tokens are estimated at four bytes each, plus the completion tokens
+    the request allows for.
+    """
+    try:
+        body = json.loads(request.content)
+    except (httpx.RequestNotRead, ValueError):
+        return "", 0
+    if not isinstance(body, dict):
+        return "", len(request.content) // 4
+    completion = body.get("max_completion_tokens") or body.get("max_tokens") or 0
+    return str(body.get("model", "")), len(request.content) // 4 + int(completion)
+
+
+async def reported_usage(
+    request: httpx.Request, response: httpx.Response
+) -> tuple[httpx.Response, int | None]:
+    """The response with its body read, and the total tokens it reports.
+
+    Streamed responses are returned untouched, without usage, so their text
+    still reaches the caller as it arrives.
+    """
+    if not response.headers.get("content-type", "").startswith("application/json"):
+        return response, None
+    raw = b"".join([chunk async for chunk in response.aiter_raw()])
+    await response.aclose()
+    response = httpx.Response(
+        response.status_code,
+        headers=response.headers,
+        content=raw,
+        request=request,
+        extensions=response.extensions,
+    )
+    try:
+        usage = response.json().get("usage") or {}
+        return response, int(usage["total_tokens"])
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return response, None
+
+
+def retry_after(headers: httpx.Headers) -> float | None:
+    """Seconds the server asked us to wait, from `retry-after-ms` or `retry-after`."""
+    if value := headers.get("retry-after-ms"):
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    if value := headers.get("retry-after"):
+        try:
+            return float(value)
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    return None
+
+
+class RequestScheduler:
+    """Per-model rate limiters and retries for outbound requests.
+
+    Models without an entry in `limits` get `requests_per_minute` and
+    `tokens_per_minute`. Requests are charged their estimated tokens up front,
+    then corrected with the usage the response reports.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int = config.OPENAI_RPM,
+        tokens_per_minute: int = config.OPENAI_TPM,
+        limits: dict[str, tuple[int, int]] | None = None,
+        max_retries: int = config.OPENAI_MAX_RETRIES,
+        backoff_base: float = config.OPENAI_BACKOFF_BASE,
+        backoff_max: float = config.OPENAI_BACKOFF_MAX,
+        burst_seconds: float = config.OPENAI_RATE_BURST_SECONDS,
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.limits = limits or {}
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.burst_seconds = burst_seconds
+        self.stats = SchedulerStats()
+        self.limiters: dict[str, RateLimiter] = {}
+
+    def limiter(self, model: str) -> RateLimiter:
+        if model not in self.limiters:
+            rpm, tpm = self.limits.get(
+                model, (self.requests_per_minute, self.tokens_per_minute)
+            )
+            # Another thread may have added it meanwhile; keep the first.
+            self.limiters.setdefault(model, RateLimiter(rpm, tpm, self.burst_seconds))
+        return self.limiters[model]
+
+    def backoff(self, attempt: int, wait: float | None) -> float:
+        """Seconds to wait before retry `attempt`, jittered so retries spread out."""
+        jitter = random.uniform(
+            0, min(self.backoff_max, self.backoff_base * 2**attempt)
+        )
+        if wait is None:
+            return jitter
+        return min(wait, self.backoff_max) + jitter
+
+    async def send(
+        self,
+        request: httpx.Request,
+        send: Callable[[httpx.Request], Awaitable[httpx.Response]],
+    ) -> httpx.Response:
+        model, tokens = estimate_tokens(request)
+        limiter = self.limiter(model)
+        priority = request_priority.get()
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            await limiter.acquire(tokens, priority)
+            waited = time.perf_counter() - start
+            self.stats.requests += 1
+            self.stats.wait_seconds += waited
+            record_scheduler_wait(PRIORITY_NAMES.get(priority, str(priority)), waited)
+
+            try:
+                response = await send(request)
+            except httpx.TransportError:
+                if attempt == self.max_retries:
+                    raise
+                status, wait = "connection_error", None
+            else:
+                status, wait = str(response.status_code), retry_after(response.headers)
+                if response.status_code == 429:
+                    self.stats.rate_limited += 1
+                    pause = wait if wait is not None else self.backoff_base
+                    limiter.pause(min(pause, self.backoff_max))
+                retryable = (
+                    response.status_code in RETRY_STATUSES
+                    or response.status_code >= 500
+                )
+                if not retryable or attempt == self.max_retries:
+                    response, used = await reported_usage(request, response)
+                    if used is not None:
+                        limiter.settle(tokens, used)
+                    return response
+                await response.aclose()
+
+            self.stats.retries += 1
+            record_scheduler_retry(status)
+            await asyncio.sleep(self.backoff(attempt, wait))
+            attempt += 1
+
+
+class ScheduledTransport(httpx.AsyncBaseTransport):
+    """httpx transport sending every request through a `RequestScheduler`."""
+
+    def __init__(
+        self, transport: httpx.AsyncBaseTransport, scheduler: RequestScheduler
+    ):
+        self.transport = transport
+        self.scheduler = scheduler
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self.scheduler.send(request, self.transport.handle_async_request)
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+scheduler = RequestScheduler(limits=_parse_rate_limits(config.OPENAI_RATE_LIMITS))
+
+
+def scheduled_http_client(
+    request_scheduler: RequestScheduler = scheduler,
+) -> httpx.AsyncClient:
+    """HTTP client for the OpenAI SDK, with the SDK's default timeout and pool."""
+    transport = httpx.AsyncHTTPTransport(
+        limits=httpx.Limits(max_connections=1000, max_keepalive_connections=100)
+    )
+    return httpx.AsyncClient(
+        transport=ScheduledTransport(transport, request_scheduler),
+        timeout=httpx.Timeout(600, connect=5.0),
+        follow_redirects=True,
+    )
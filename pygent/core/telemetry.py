@@ -0,0 +1,13 @@
+from functools import cache
+
+import logfire
+
+
+@cache
+def configure_telemetry() -> None:
+    """Configure logfire and instrument every pydantic-ai agent, once per process.
+
+    Spans are only sent to Logfire when a token is configured.
+    """
+    logfire.configure(send_to_logfire="if-token-present", scrubbing=False)
+    logfire.instrument_pydantic_ai()
@@ -1,5 +1,16 @@
 from .graph import graph
 from .state import GraphState
-from .iterator import run_graph
+from .iterator import run_graph, stream_graph
+from .events import GraphDeps, GraphEvent, GraphOutput, NodeEvent, TextDelta
 
-__all__ = ["graph", "GraphState", "run_graph"]
+__all__ = [
+    "graph",
+    "GraphState",
+    "run_graph",
+    "stream_graph",
+    "GraphDeps",
+    "GraphEvent",
+    "GraphOutput",
+    "NodeEvent",
+    "TextDelta",
+]
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from pygent.core.clients import get_async_supabase_client, get_openai_client
+from pygent.core.metrics import RunMetrics
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+    from supabase import AsyncClient
+
+
+@dataclass
+class NodeEvent:
+    """The graph is about to run `node`, or stopped at it."""
+
+    node: str
+
+
+@dataclass
+class TextDelta:
+    """A chunk of model text, in the order it was generated."""
+
+    text: str
+
+
+@dataclass
+class GraphOutput:
+    """The message to show the user once the graph step is complete."""
+
+    text: str | None
+
+
+GraphEvent = NodeEvent | TextDelta | GraphOutput
+
+
+@dataclass
+class GraphDeps:
+    """Dependencies shared by every node in a graph run.
+
+    `supabase` and `embedding_client` are handed to every agent and tool.
+    `run_dir` is where the run keeps its persisted state and artifacts.
+    `metrics` collects the latency and usage of the graph step.
+    When `events` is set, nodes publish progress to it as they run; otherwise
+    emitting is a no-op and agents run without streaming.
+
+    `prefetch` is a documentation search for the user's message started
+    alongside triage, None when it failed or found nothing. The first node
+    that needs it takes it, and it is cancelled when triage decides no
+    documentation is needed.
+    """
+
+    supabase: AsyncClient = field(default_factory=get_async_supabase_client)
+    embedding_client: AsyncOpenAI = field(default_factory=get_openai_client)
+    events: asyncio.Queue[GraphEvent | None] | None = None
+    run_dir: Path = Path("workbench")
+    prefetch: asyncio.Task[str | None] | None = None
+    metrics: RunMetrics = field(default_factory=RunMetrics)
+
+    @property
+    def streaming(self) -> bool:
+        return self.events is not None
+
+    def emit(self, event: GraphEvent) -> None:
+        if self.events is not None:
+            self.events.put_nowait(event)
+
+    async def take_prefetched_documentation(self) -> str | None:
+        if self.prefetch is None:
+            return None
+        prefetch, self.prefetch = self.prefetch, None
+        return await prefetch
+
+    def discard_prefetch(self) -> None:
+        if self.prefetch is not None:
+            self.prefetch.cancel()
+            self.prefetch = None
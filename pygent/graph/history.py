@@ -0,0 +1,84 @@
+from collections import OrderedDict
+from dataclasses import replace
+
+from pydantic_ai.agent import AgentRunResult
+from pydantic_ai.messages import ModelMessage, ModelMessagesTypeAdapter, ModelRequest
+
+from pygent.core.config import HISTORY_CACHE_SIZE
+
+
+class MessageHistoryCache:
+    """Decoded message histories keyed by conversation name and blob.
+
+    `GraphState` keeps every conversation as serialized `bytes` so it can be
+    persisted, and each node used to re-validate those blobs on every step.
+    Blobs are immutable and identical bytes always decode to the same messages,
+    so the decoded lists are kept in an LRU and shared between nodes, turns and
+    runs. `store` primes the cache with the messages an agent just produced,
+    which means a blob is normally never decoded at all within a process.
+
+    Cached messages are shared: treat them as read-only.
+    """
+
+    def __init__(self, maxsize: int = HISTORY_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[str, bytes], list[ModelMessage]] = (
+            OrderedDict()
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _put(self, key: tuple[str, bytes], messages: list[ModelMessage]) -> None:
+        self._entries[key] = messages
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def decode(self, conversation: str, blob: bytes) -> list[ModelMessage]:
+        key = (conversation, blob)
+        messages = self._entries.get(key)
+        if messages is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return messages
+
+        self.misses += 1
+        messages = ModelMessagesTypeAdapter.validate_json(blob)
+        self._put(key, messages)
+        return messages
+
+    def load(self, conversation: str, blobs: list[bytes]) -> list[ModelMessage]:
+        """Concatenate the decoded messages of every blob in a conversation."""
+        message_history: list[ModelMessage] = []
+        for blob in blobs:
+            message_history.extend(self.decode(conversation, blob))
+        # Agents re-evaluate dynamic system prompts by assigning into
+        # `request.parts`, so hand out requests with their own parts list.
+        return [
+            replace(message, parts=list(message.parts))
+            if isinstance(message, ModelRequest)
+            else message
+            for message in message_history
+        ]
+
+    def store(self, conversation: str, result: AgentRunResult) -> bytes:
+        """Serialize a run's new messages and remember their decoded form."""
+        blob = result.new_messages_json()
+        self._put((conversation, blob), result.new_messages())
+        return blob
+
+    def store_messages(self, conversation: str, messages: list[ModelMessage]) -> bytes:
+        """Serialize messages built outside an agent run, e.g. a cached answer."""
+        blob = ModelMessagesTypeAdapter.dump_json(messages)
+        self._put((conversation, blob), messages)
+        return blob
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.hits = self.misses = 0
+
+
+history_cache = MessageHistoryCache()
@@ -1,27 +1,123 @@
+import asyncio
+import json
+import re
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator
 from pathlib import Path
+from weakref import WeakValueDictionary
 
 import logfire
 from pydantic_graph import End
-from pydantic_graph.persistence.file import FileStatePersistence
 
+from pygent.agents.model_cache import configure_model_cache
+from pygent.agents.model_tiers import configure_model_tiers
+from pygent.core.config import RUN_STATE_CACHE_SIZE, SPECULATIVE_RETRIEVAL
+from pygent.core.logs import log_context
+from pygent.core.metrics import current_run, metrics, record_node
+from pygent.core.telemetry import configure_telemetry
 from pygent.graph.nodes import GetUserMessageNode, TriageNode, RefineScopeNode
+from pygent.tools.documentation import prefetch_relevant_documentation
 
+from .events import GraphDeps, GraphEvent, GraphOutput, NodeEvent
 from .graph import graph
+from .persistence import JsonlStatePersistence
 from .state import GraphState
 
-logfire.configure(scrubbing=False)
-logfire.instrument_pydantic_ai()
 
+RUN_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]+")
 
-async def run_graph(run_id: str, user_input: str):
-    persistence = FileStatePersistence(Path(f"workbench/{run_id}.json"))
-    persistence.set_graph_types(graph)
+# One lock per run that is currently in use, so messages for the same run are
+# processed one at a time while different runs proceed in parallel.
+_run_locks: WeakValueDictionary[str, asyncio.Lock] = WeakValueDictionary()
+
+# Persistence of recently active runs, so a turn only appends to the run's
+# in-memory index instead of replaying its whole `run.jsonl`. The index is
+# replayed when another worker process has written to the file since.
+_run_persistence: OrderedDict[Path, JsonlStatePersistence] = OrderedDict()
+
+
+def run_directory(run_id: str) -> Path:
+    """The directory holding a run's persisted state and artifacts."""
+    if not RUN_ID_PATTERN.fullmatch(run_id):
+        raise ValueError(f"Invalid run id: {run_id!r}")
+    return Path("workbench") / run_id
+
+
+def run_lock(run_id: str) -> asyncio.Lock:
+    lock = _run_locks.get(run_id)
+    if lock is None:
+        lock = _run_locks[run_id] = asyncio.Lock()
+    return lock
+
+
+def run_persistence(run_dir: Path) -> JsonlStatePersistence:
+    """The run's persistence, replayed from disk when uncached or changed elsewhere.
+
+    Call with the run's lock held, so one turn at a time uses the instance.
+    """
+    path = run_dir / "run.jsonl"
+    persistence = _run_persistence.get(path)
+    if persistence is None:
+        persistence = JsonlStatePersistence(path)
+        persistence.set_graph_types(graph)
+        _run_persistence[path] = persistence
+    _run_persistence.move_to_end(path)
+    while len(_run_persistence) > RUN_STATE_CACHE_SIZE:
+        _run_persistence.popitem(last=False)
+    return persistence
+
+
+async def run_graph(run_id: str, user_input: str, deps: GraphDeps | None = None):
+    configure_telemetry()
+    configure_model_tiers()
+    configure_model_cache()
+    deps = deps or GraphDeps()
+    deps.run_dir = run_directory(run_id)
+    async with run_lock(run_id):
+        token = current_run.set(deps.metrics)
+        log_token = log_context.set({"run_id": run_id})
+        start = time.perf_counter()
+        status = "error"
+        try:
+            output = await _run_graph(user_input, deps)
+            status = "ok"
+            return output
+        finally:
+            current_run.reset(token)
+            log_context.reset(log_token)
+            await record_step(deps, status, time.perf_counter() - start)
+
+
+def append_record(path: Path, record: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+async def record_step(deps: GraphDeps, status: str, seconds: float) -> None:
+    """Publish the step's metrics and add its summary to the run's `metrics.jsonl`."""
+    metrics.observe_step(status, seconds)
+    summary = {"status": status, "seconds": seconds, **deps.metrics.summary()}
+    logfire.info("Graph step {status} in {seconds:.2f} s", **summary)
+    try:
+        await asyncio.to_thread(append_record, deps.run_dir / "metrics.jsonl", summary)
+    except OSError as e:
+        print(f"Error writing metrics: {e}")
+
+
+async def _run_graph(user_input: str, deps: GraphDeps):
+    persistence = run_persistence(deps.run_dir)
 
     if snapshot := await persistence.load_next():
         state = snapshot.state
         assert user_input != ""
         state.latest_user_message = user_input
-        if state.user_intent == "Development":
+        if isinstance(snapshot.node, RefineScopeNode):
+            # The graph stopped to show the scope summary, so this message is
+            # the user's review of it: approve, or revise the scope.
+            node = snapshot.node
+        elif state.user_intent == "Development":
             node = GetUserMessageNode(user_message=user_input)
         elif state.user_intent == "Q&A":
             node = TriageNode()
@@ -42,23 +138,65 @@ async def run_graph(run_id: str, user_input: str):
         )
         node = TriageNode()
 
-    async with graph.iter(node, state=state, persistence=persistence) as run:
-        while True:
-            node = await run.next()
-            print(node)
+    if SPECULATIVE_RETRIEVAL and isinstance(node, TriageNode):
+        # Most turns that start at triage end up searching the docs for this
+        # message, so search while the triage call is in flight.
+        deps.prefetch = asyncio.create_task(
+            prefetch_relevant_documentation(
+                user_input, deps.supabase, deps.embedding_client
+            )
+        )
+
+    deps.emit(NodeEvent(type(node).__name__))
+    try:
+        async with graph.iter(
+            node, state=state, deps=deps, persistence=persistence
+        ) as run:
+            while True:
+                current = run.next_node
+                start = time.perf_counter()
+                node = await run.next()
+                record_node(type(current).__name__, time.perf_counter() - start)
+                print(node)
+                deps.emit(NodeEvent(type(node).__name__))
+
+                if isinstance(node, End):
+                    history = await persistence.load_all()
+                    print([e.node for e in history])
+                    return node.data
+
+                elif isinstance(node, GetUserMessageNode):
+                    print(node.code_output)
+                    return node.code_output
+
+                elif isinstance(node, TriageNode):
+                    print(state.user_intent)
+                    return state.latest_model_message
+
+                elif isinstance(node, RefineScopeNode):
+                    return node.scope_summary
 
-            if isinstance(node, End):
-                history = await persistence.load_all()
-                print([e.node for e in history])
-                return node.data
+    finally:
+        deps.discard_prefetch()
 
-            elif isinstance(node, GetUserMessageNode):
-                print(node.code_output)
-                return node.code_output
 
-            elif isinstance(node, TriageNode):
-                print(state.user_intent)
-                return state.latest_model_message
+async def stream_graph(
+    run_id: str, user_input: str, deps: GraphDeps | None = None
+) -> AsyncIterator[GraphEvent]:
+    """Run one graph step like `run_graph`, yielding events as they happen.
 
-            elif isinstance(node, RefineScopeNode):
-                return node.scope_summary
+    Yields a `NodeEvent` for every node transition and `TextDelta`s while the
+    expert writes its answer, then a final `GraphOutput` with the same value
+    `run_graph` would have returned.
+    """
+    events: asyncio.Queue[GraphEvent | None] = asyncio.Queue()
+    deps = deps or GraphDeps()
+    deps.events = events
+    task = asyncio.create_task(run_graph(run_id, user_input, deps))
+    task.add_done_callback(lambda _: events.put_nowait(None))
+    try:
+        while (event := await events.get()) is not None:
+            yield event
+        yield GraphOutput(await task)
+    finally:
+        task.cancel()
@@ -1,10 +1,23 @@
 from __future__ import annotations
 
-import os
+import asyncio
+import time
 from dataclasses import dataclass
+from pathlib import Path
 
 import logfire
-from pydantic_ai.messages import ModelMessage, ModelMessagesTypeAdapter
+from pydantic_ai import Agent
+from pydantic_ai.agent import AgentRunResult, ModelRequestNode
+from pydantic_ai.messages import (
+    ModelRequest,
+    ModelResponse,
+    PartDeltaEvent,
+    PartStartEvent,
+    SystemPromptPart,
+    TextPart,
+    TextPartDelta,
+    UserPromptPart,
+)
 from pydantic_graph import BaseNode, End, GraphRunContext
 
 from pygent.agents import (
@@ -13,33 +26,110 @@ from pygent.agents import (
     agent_refiner_agent,
     end_conversation_agent,
     expert_agent,
+    next_step_router,
     prompt_refiner_agent,
-    refine_router_agent,
+    refine_router,
     refine_scope_agent,
-    router_agent,
     scope_definer_agent,
     summarize_scope_agent,
     triage_agent,
 )
-from pygent.tools.documentation import list_documentation_pages_helper
-
+from pygent.core.clients import client_errors
+from pygent.core.logs import log_node_execution
+from pygent.core.metrics import record_agent_run
+from pygent.tools.answer_cache import answer_cache
+from pygent.tools.documentation import get_embedding, list_documentation_pages_helper
+from pygent.tools.page_index import page_index
+
+from .events import GraphDeps, TextDelta
+from .history import history_cache
 from .state import GraphState
 
 
+async def run_agent(
+    agent: Agent,
+    user_prompt: str,
+    graph_deps: GraphDeps,
+    stream: bool = False,
+    **kwargs,
+) -> AgentRunResult:
+    """Run `agent` and record its latency and usage.
+
+    With `stream`, the agent's text is published as it is generated when the
+    graph streams.
+    """
+    start = time.perf_counter()
+    tool_seconds = 0.0
+    async with agent.iter(user_prompt, **kwargs) as run:
+        # Each node runs between the iteration that yields it and the next one.
+        previous, mark = None, start
+        async for node in run:
+            now = time.perf_counter()
+            if previous is not None and Agent.is_call_tools_node(previous):
+                tool_seconds += now - mark
+            previous, mark = node, now
+            if stream and graph_deps.streaming and Agent.is_model_request_node(node):
+                await stream_text(node, run.ctx, graph_deps)
+
+    elapsed = time.perf_counter() - start
+    record_agent_run(agent.name, run.result, elapsed - tool_seconds, tool_seconds)
+    return run.result
+
+
+async def stream_text(node: ModelRequestNode, ctx, graph_deps: GraphDeps) -> None:
+    async with node.stream(ctx) as request_stream:
+        async for event in request_stream:
+            if isinstance(event, PartStartEvent) and isinstance(event.part, TextPart):
+                text = event.part.content
+            elif isinstance(event, PartDeltaEvent) and isinstance(
+                event.delta, TextPartDelta
+            ):
+                text = event.delta.content_delta
+            else:
+                continue
+            if text:
+                graph_deps.emit(TextDelta(text))
+
+
+def write_artifact(path: Path, content: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content, encoding="utf-8")
+
+
+async def answer_cache_key(
+    question: str, graph_deps: GraphDeps
+) -> tuple[list[float], str] | None:
+    """The question's embedding and the current corpus version, fetched together."""
+    try:
+        embedding, version = await asyncio.gather(
+            get_embedding(question, graph_deps.embedding_client),
+            page_index.current_version(graph_deps.supabase),
+        )
+    except client_errors() as e:
+        print(f"Error checking the answer cache: {e}")
+        return None
+    return embedding, version
+
+
 @dataclass
-class TriageNode(BaseNode[GraphState, None]):
+class TriageNode(BaseNode[GraphState, GraphDeps]):
+    @log_node_execution
     async def run(
-        self, ctx: GraphRunContext[GraphState]
+        self, ctx: GraphRunContext[GraphState, GraphDeps]
     ) -> DefineScopeNode | ExpertNode | TriageNode:
-        message_history: list[ModelMessage] = []
-        for message_row in ctx.state.triage_conversation:
-            message_history.extend(ModelMessagesTypeAdapter.validate_json(message_row))
+        message_history = history_cache.load("triage", ctx.state.triage_conversation)
 
-        result = await triage_agent.run(
-            ctx.state.latest_user_message, message_history=message_history
+        result = await run_agent(
+            triage_agent,
+            ctx.state.latest_user_message,
+            ctx.deps,
+            message_history=message_history,
         )
         logfire.info(f"Triage result: {result.output.intent}")
-        ctx.state.triage_conversation = [result.new_messages_json()]
+        ctx.state.triage_conversation = [history_cache.store("triage", result)]
+
+        if result.output.intent not in ("Q&A", "Development"):
+            ctx.deps.discard_prefetch()
 
         if result.output.intent == "Q&A":
             ctx.state.user_intent = result.output.intent
@@ -55,9 +145,10 @@ class TriageNode(BaseNode[GraphState, None]):
 
 
 @dataclass
-class DefineScopeNode(BaseNode[GraphState, None]):
-    async def run(self, ctx: GraphRunContext[GraphState]) -> RefineScopeNode:
-        documentation_pages = await list_documentation_pages_helper()
+class DefineScopeNode(BaseNode[GraphState, GraphDeps]):
+    @log_node_execution
+    async def run(self, ctx: GraphRunContext[GraphState, GraphDeps]) -> RefineScopeNode:
+        documentation_pages = await list_documentation_pages_helper(ctx.deps.supabase)
         documentation_pages_str = "\n".join(documentation_pages)
         prompt = f"""
         User AI Agent Request: {ctx.state.latest_user_message}
@@ -74,39 +165,37 @@ class DefineScopeNode(BaseNode[GraphState, None]):
 
         Include a list of documentation pages that are relevant to creating this agent for the user in the scope document.
         """
-        message_history: list[ModelMessage] = []
-        for message_row in ctx.state.scope_conversation:
-            message_history.extend(ModelMessagesTypeAdapter.validate_json(message_row))
+        if documentation := await ctx.deps.take_prefetched_documentation():
+            prompt += f"""
+        Documentation retrieved for the user's request:
 
-        result = await scope_definer_agent.run(prompt)
+        {documentation}
+        """
+        result = await run_agent(scope_definer_agent, prompt, ctx.deps)
         scope = result.output
         ctx.state.scope = scope
-        ctx.state.scope_conversation = [result.new_messages_json()]
+        ctx.state.scope_conversation = [history_cache.store("scope", result)]
 
-        scope_path = os.path.join("workbench", "scope.md")
-        os.makedirs("workbench", exist_ok=True)
-        with open(scope_path, "w", encoding="utf-8") as f:
-            f.write(scope)
+        await asyncio.to_thread(write_artifact, ctx.deps.run_dir / "scope.md", scope)
 
-        result = await summarize_scope_agent.run(scope)
+        result = await run_agent(summarize_scope_agent, scope, ctx.deps)
 
         return RefineScopeNode(scope_summary=result.output.scope_summary)
 
 
 @dataclass
-class RefineScopeNode(BaseNode[GraphState, None]):
+class RefineScopeNode(BaseNode[GraphState, GraphDeps]):
     scope_summary: str | None = None
 
+    @log_node_execution
     async def run(
-        self, ctx: GraphRunContext[GraphState]
+        self, ctx: GraphRunContext[GraphState, GraphDeps]
     ) -> DefineScopeNode | ExpertNode:
-        message_history: list[ModelMessage] = []
-        for message_row in ctx.state.scope_conversation:
-            message_history.extend(ModelMessagesTypeAdapter.validate_json(message_row))
-
-        result = await refine_scope_agent.run(ctx.state.latest_user_message)
+        result = await run_agent(
+            refine_scope_agent, ctx.state.latest_user_message, ctx.deps
+        )
         approved = result.output.approved
-        ctx.state.scope_conversation = [result.new_messages_json()]
+        ctx.state.scope_conversation = [history_cache.store("scope", result)]
 
         if approved:
             return ExpertNode()
@@ -115,48 +204,94 @@ class RefineScopeNode(BaseNode[GraphState, None]):
 
 
 @dataclass
-class ExpertNode(BaseNode[GraphState, None]):
-    async def run(self, ctx: GraphRunContext[GraphState]) -> GetUserMessageNode:
+class ExpertNode(BaseNode[GraphState, GraphDeps]):
+    @log_node_execution
+    async def run(
+        self, ctx: GraphRunContext[GraphState, GraphDeps]
+    ) -> GetUserMessageNode:
+        question = ctx.state.latest_user_message
+        # Only standalone questions are cacheable: a follow-up's answer depends
+        # on the conversation before it.
+        cache_key = None
+        if (
+            answer_cache.enabled
+            and ctx.state.user_intent == "Q&A"
+            and not ctx.state.expert_conversation
+        ):
+            cache_key = await answer_cache_key(question, ctx.deps)
+        if cache_key is not None:
+            embedding, version = cache_key
+            if cached := answer_cache.lookup(embedding, version):
+                logfire.info(
+                    f"Answer cache hit ({answer_cache.stats.hit_rate:.0%} hit rate)"
+                )
+                ctx.deps.discard_prefetch()
+                ctx.deps.emit(TextDelta(cached.answer))
+                # pydantic-ai only adds system prompts to an empty history, so
+                # the follow-ups need the ones the cached answer was made with.
+                ctx.state.expert_conversation = [
+                    history_cache.store_messages(
+                        "expert",
+                        [
+                            ModelRequest(
+                                parts=[*cached.system_prompts, UserPromptPart(question)]
+                            ),
+                            ModelResponse(parts=[TextPart(cached.answer)]),
+                        ],
+                    )
+                ]
+                return GetUserMessageNode(cached.answer)
+
         deps = PydanticAIDeps(
             user_intent=ctx.state.user_intent,
+            supabase=ctx.deps.supabase,
+            embedding_client=ctx.deps.embedding_client,
             reasoner_output=ctx.state.scope,
+            prefetched_documentation=await ctx.deps.take_prefetched_documentation(),
         )
 
-        message_history: list[ModelMessage] = []
-        for message_row in ctx.state.expert_conversation:
-            message_history.extend(ModelMessagesTypeAdapter.validate_json(message_row))
+        message_history = history_cache.load("expert", ctx.state.expert_conversation)
 
-        result = await expert_agent.run(
-            ctx.state.latest_user_message,
+        result = await run_agent(
+            expert_agent,
+            question,
+            ctx.deps,
+            stream=True,
             deps=deps,
             message_history=message_history,
         )
-        ctx.state.expert_conversation = [result.new_messages_json()]
+        ctx.state.expert_conversation = [history_cache.store("expert", result)]
+        if cache_key is not None and result.output:
+            embedding, version = cache_key
+            first_request = result.all_messages()[0]
+            system_prompts = [
+                part
+                for part in first_request.parts
+                if isinstance(part, SystemPromptPart)
+            ]
+            answer_cache.store(
+                question, embedding, result.output, version, system_prompts
+            )
         return GetUserMessageNode(result.output)
 
 
 @dataclass
-class GetUserMessageNode(BaseNode[GraphState, None]):
+class GetUserMessageNode(BaseNode[GraphState, GraphDeps]):
     code_output: str | None = None
     user_message: str | None = None
 
+    @log_node_execution
     async def run(
-        self, ctx: GraphRunContext[GraphState]
+        self, ctx: GraphRunContext[GraphState, GraphDeps]
     ) -> FinishNode | ExpertNode | RefineRouterNode:
-        prompt = f"""
-        The user has sent a message: 
-        
-        {self.user_message}
-
-        If the user wants to end the conversation, respond with just the text "finish_conversation".
-        If the user wants to continue coding the AI agent, respond with just the text "coder_agent".
-        If the user asks specifically to "refine" the agent, respond with just the text "refine".
-        """
         if self.user_message is not None:
             ctx.state.latest_user_message = self.user_message
 
-        result = await router_agent.run(prompt)
-        next_node = result.output
+        decision = await next_step_router.route(ctx.state.latest_user_message)
+        logfire.info(
+            f"Routed to {decision.label} by {decision.source} in {decision.latency_ms:.0f} ms"
+        )
+        next_node = decision.label
 
         if next_node == "finish_conversation":
             return FinishNode()
@@ -167,60 +302,69 @@ class GetUserMessageNode(BaseNode[GraphState, None]):
 
 
 @dataclass
-class RefineRouterNode(BaseNode[GraphState, None]):
+class RefineRouterNode(BaseNode[GraphState, GraphDeps]):
+    @log_node_execution
     async def run(
-        self, ctx: GraphRunContext[GraphState]
+        self, ctx: GraphRunContext[GraphState, GraphDeps]
     ) -> RefinePromptNode | RefineAgentNode:
-        result = await refine_router_agent.run(ctx.state.latest_user_message)
-        if result.output == "refine_prompt":
+        decision = await refine_router.route(ctx.state.latest_user_message)
+        if decision.label == "refine_prompt":
             return RefinePromptNode()
-        if result.output == "refine_agent":
+        if decision.label == "refine_agent":
             return RefineAgentNode()
         else:
-            raise ValueError(f"Invalid refine request: {result.output}")
+            raise ValueError(f"Invalid refine request: {decision.label}")
 
 
 @dataclass
-class RefinePromptNode(BaseNode[GraphState, None]):
-    async def run(self, ctx: GraphRunContext[GraphState]) -> ExpertNode:
-        message_history: list[ModelMessage] = []
-        for message_row in ctx.state.expert_conversation:
-            message_history.extend(ModelMessagesTypeAdapter.validate_json(message_row))
+class RefinePromptNode(BaseNode[GraphState, GraphDeps]):
+    @log_node_execution
+    async def run(self, ctx: GraphRunContext[GraphState, GraphDeps]) -> ExpertNode:
+        message_history = history_cache.load("expert", ctx.state.expert_conversation)
 
         prompt = "Based on the current conversation, refine the prompt for the agent."
-        result = await prompt_refiner_agent.run(prompt, message_history=message_history)
+        result = await run_agent(
+            prompt_refiner_agent, prompt, ctx.deps, message_history=message_history
+        )
         ctx.state.refined_prompt = result.output
         return ExpertNode()
 
 
 @dataclass
-class RefineAgentNode(BaseNode[GraphState, None]):
-    async def run(self, ctx: GraphRunContext[GraphState]) -> ExpertNode:
+class RefineAgentNode(BaseNode[GraphState, GraphDeps]):
+    @log_node_execution
+    async def run(self, ctx: GraphRunContext[GraphState, GraphDeps]) -> ExpertNode:
         deps = AgentRefinerDeps(
             refinement_request=ctx.state.latest_user_message,
+            supabase=ctx.deps.supabase,
+            embedding_client=ctx.deps.embedding_client,
         )
-        message_history: list[ModelMessage] = []
-        for message_row in ctx.state.expert_conversation:
-            message_history.extend(ModelMessagesTypeAdapter.validate_json(message_row))
+        message_history = history_cache.load("expert", ctx.state.expert_conversation)
 
         prompt = "Based on the current conversation, refine the agent definition."
-        result = await agent_refiner_agent.run(
-            prompt, message_history=message_history, deps=deps
+        result = await run_agent(
+            agent_refiner_agent,
+            prompt,
+            ctx.deps,
+            message_history=message_history,
+            deps=deps,
         )
         ctx.state.refined_agent = result.output
         return ExpertNode()
 
 
 @dataclass
-class FinishNode(BaseNode[GraphState, None, str]):
-    async def run(self, ctx: GraphRunContext[GraphState]) -> End[str]:
-        message_history: list[ModelMessage] = []
-        for message_row in ctx.state.expert_conversation:
-            message_history.extend(ModelMessagesTypeAdapter.validate_json(message_row))
+class FinishNode(BaseNode[GraphState, GraphDeps, str]):
+    @log_node_execution
+    async def run(self, ctx: GraphRunContext[GraphState, GraphDeps]) -> End[str]:
+        message_history = history_cache.load("expert", ctx.state.expert_conversation)
 
-        result = await end_conversation_agent.run(
+        result = await run_agent(
+            end_conversation_agent,
             ctx.state.latest_user_message,
+            ctx.deps,
+            stream=True,
             message_history=message_history,
         )
-        ctx.state.expert_conversation = [result.new_messages_json()]
+        ctx.state.expert_conversation = [history_cache.store("expert", result)]
         return End(result.output)
@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from datetime import UTC, datetime
+from pathlib import Path
+from time import perf_counter
+from typing import Any
+
+import pydantic
+from pydantic_graph import BaseNode, End
+from pydantic_graph.exceptions import GraphNodeStatusError
+from pydantic_graph.persistence import (
+    BaseStatePersistence,
+    EndSnapshot,
+    NodeSnapshot,
+    RunEndT,
+    Snapshot,
+    SnapshotStatus,
+    StateT,
+    build_snapshot_list_type_adapter,
+)
+
+
+def state_delta(previous: dict[str, Any] | None, current: dict[str, Any]) -> dict:
+    """Describe `current` relative to `previous`.
+
+    Fields whose list value only grew are stored as the appended tail; any other
+    changed field is stored whole. Unchanged fields are omitted.
+    """
+    if previous is None:
+        return {"set": current}
+
+    changed: dict[str, Any] = {}
+    appended: dict[str, Any] = {}
+    for key, value in current.items():
+        old = previous.get(key)
+        if key in previous and old == value:
+            continue
+        if (
+            isinstance(value, list)
+            and isinstance(old, list)
+            and len(value) > len(old)
+            and value[: len(old)] == old
+        ):
+            appended[key] = value[len(old) :]
+        else:
+            changed[key] = value
+
+    delta = {}
+    if changed:
+        delta["set"] = changed
+    if appended:
+        delta["append"] = appended
+    return delta
+
+
+def apply_delta(state: dict[str, Any] | None, delta: dict) -> dict[str, Any]:
+    state = dict(state or {})
+    state.update(delta.get("set", {}))
+    for key, tail in delta.get("append", {}).items():
+        state[key] = [*state.get(key, []), *tail]
+    return state
+
+
+class JsonlStatePersistence(BaseStatePersistence[StateT, RunEndT]):
+    """Append-only graph persistence with one JSON record per line.
+
+    Each snapshot record stores only the state fields that changed since the
+    previous snapshot, and status changes are separate small records, so the
+    bytes written per step do not grow with the conversation. The file is
+    replayed when first accessed; after that `load_next`, `record_run` and
+    `snapshot_node_if_new` are served from an in-memory index. If the file's
+    size or modification time no longer match the last replay or write, another
+    process has written to it and it is replayed again.
+
+    Writes from several processes are not coordinated, so a run should only be
+    handled by one process at a time.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.bytes_written = 0
+        self._adapter: pydantic.TypeAdapter[list[Snapshot[StateT, RunEndT]]] | None = (
+            None
+        )
+        self._lock = asyncio.Lock()
+        self._loaded: tuple[int, int] | None = None
+        self._records: dict[str, dict[str, Any]] = {}
+        self._created_states: dict[str, dict[str, Any]] = {}
+        self._created: deque[str] = deque()
+        self._state: dict[str, Any] | None = None
+
+    def should_set_types(self) -> bool:
+        return self._adapter is None
+
+    def set_types(self, state_type: type[StateT], run_end_type: type[RunEndT]) -> None:
+        self._adapter = build_snapshot_list_type_adapter(state_type, run_end_type)
+
+    async def snapshot_node(
+        self, state: StateT, next_node: BaseNode[StateT, Any, RunEndT]
+    ) -> None:
+        async with self._lock:
+            await self._ensure_loaded()
+            await self._append_snapshot(NodeSnapshot(state=state, node=next_node))
+
+    async def snapshot_node_if_new(
+        self, snapshot_id: str, state: StateT, next_node: BaseNode[StateT, Any, RunEndT]
+    ) -> None:
+        async with self._lock:
+            await self._ensure_loaded()
+            if snapshot_id not in self._records:
+                await self._append_snapshot(NodeSnapshot(state=state, node=next_node))
+
+    async def snapshot_end(self, state: StateT, end: End[RunEndT]) -> None:
+        async with self._lock:
+            await self._ensure_loaded()
+            await self._append_snapshot(EndSnapshot(state=state, result=end))
+
+    @asynccontextmanager
+    async def record_run(self, snapshot_id: str) -> AsyncIterator[None]:
+        async with self._lock:
+            await self._ensure_loaded()
+            record = self._records.get(snapshot_id)
+            if record is None:
+                raise LookupError(f"No snapshot found with id={snapshot_id!r}")
+            assert record["kind"] == "node", "Only NodeSnapshot can be recorded"
+            GraphNodeStatusError.check(record["status"])
+            await self._append_status(
+                snapshot_id, "running", start_ts=datetime.now(UTC).isoformat()
+            )
+
+        start = perf_counter()
+        try:
+            yield
+        except Exception:
+            async with self._lock:
+                await self._append_status(
+                    snapshot_id, "error", duration=perf_counter() - start
+                )
+            raise
+        else:
+            async with self._lock:
+                await self._append_status(
+                    snapshot_id, "success", duration=perf_counter() - start
+                )
+
+    async def load_next(self) -> NodeSnapshot[StateT, RunEndT] | None:
+        async with self._lock:
+            await self._ensure_loaded()
+            while self._created:
+                snapshot_id = self._created.popleft()
+                if self._records[snapshot_id]["status"] != "created":
+                    continue
+                state = self._created_states[snapshot_id]
+                await self._append_status(snapshot_id, "pending")
+                return self._validate({**self._records[snapshot_id], "state": state})
+            return None
+
+    async def load_all(self) -> list[Snapshot[StateT, RunEndT]]:
+        assert self._adapter is not None, "snapshots type adapter must be set"
+        snapshots: dict[str, dict[str, Any]] = {}
+        state = None
+        for record in await asyncio.to_thread(self._read_records):
+            if record["op"] == "snapshot":
+                state = apply_delta(state, record["delta"])
+                snapshots[record["snapshot"]["id"]] = {
+                    **record["snapshot"],
+                    "state": state,
+                }
+            else:
+                snapshots[record["id"]].update(_status_fields(record))
+        return self._adapter.validate_python(list(snapshots.values()))
+
+    def _validate(self, data: dict[str, Any]) -> Any:
+        assert self._adapter is not None, "snapshots type adapter must be set"
+        return self._adapter.validate_python([data])[0]
+
+    def _read_records(self) -> list[dict[str, Any]]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    def _file_signature(self) -> tuple[int, int]:
+        """The file's size and modification time, (0, 0) if it does not exist."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return 0, 0
+        return stat.st_size, stat.st_mtime_ns
+
+    def _read_with_signature(self) -> tuple[list[dict[str, Any]], tuple[int, int]]:
+        return self._read_records(), self._file_signature()
+
+    async def _ensure_loaded(self) -> None:
+        if self._loaded is not None and self._loaded == self._file_signature():
+            return
+        self._records.clear()
+        self._created_states.clear()
+        self._created.clear()
+        self._state = None
+        records, self._loaded = await asyncio.to_thread(self._read_with_signature)
+        for record in records:
+            self._index(record)
+
+    def _index(self, record: dict[str, Any]) -> None:
+        if record["op"] == "snapshot":
+            self._state = apply_delta(self._state, record["delta"])
+            snapshot = record["snapshot"]
+            self._records[snapshot["id"]] = snapshot
+            if snapshot["kind"] == "node" and snapshot["status"] == "created":
+                self._created.append(snapshot["id"])
+                self._created_states[snapshot["id"]] = self._state
+        else:
+            self._records[record["id"]].update(_status_fields(record))
+            if record["status"] != "created":
+                self._created_states.pop(record["id"], None)
+
+    async def _append_snapshot(self, snapshot: Snapshot[StateT, RunEndT]) -> None:
+        assert self._adapter is not None, "snapshots type adapter must be set"
+        data = self._adapter.dump_python([snapshot], mode="json")[0]
+        state = data.pop("state")
+        record = {
+            "op": "snapshot",
+            "snapshot": data,
+            "delta": state_delta(self._state, state),
+        }
+        await self._write(record)
+
+    async def _append_status(
+        self, snapshot_id: str, status: SnapshotStatus, **fields: Any
+    ) -> None:
+        await self._write(
+            {"op": "status", "id": snapshot_id, "status": status, **fields}
+        )
+
+    async def _write(self, record: dict[str, Any]) -> None:
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        self._loaded = await asyncio.to_thread(self._append_line, line)
+        self.bytes_written += len(line)
+        self._index(record)
+
+    def _append_line(self, line: str) -> tuple[int, int]:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+        return self._file_signature()
+
+
+def _status_fields(record: dict[str, Any]) -> dict[str, Any]:
+    return {key: value for key, value in record.items() if key not in ("op", "id")}
@@ -0,0 +1,27 @@
+from .chunking import chunk_markdown
+from .enrich import (
+    AgentSummarizer,
+    HashEmbedder,
+    HeuristicSummarizer,
+    OpenAIEmbedder,
+    TitleSummary,
+)
+from .pipeline import IngestPipeline, IngestReport
+from .sources import DirectorySource, Page, SitemapSource
+from .store import JsonlChunkStore, SupabaseChunkStore
+
+__all__ = [
+    "AgentSummarizer",
+    "DirectorySource",
+    "HashEmbedder",
+    "HeuristicSummarizer",
+    "IngestPipeline",
+    "IngestReport",
+    "JsonlChunkStore",
+    "OpenAIEmbedder",
+    "Page",
+    "SitemapSource",
+    "SupabaseChunkStore",
+    "TitleSummary",
+    "chunk_markdown",
+]
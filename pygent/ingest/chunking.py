@@ -0,0 +1,138 @@
+import re
+from dataclasses import dataclass
+
+FENCE_PATTERN = re.compile(r"^(```|~~~)")
+HEADING_PATTERN = re.compile(r"^#{1,6}\s")
+
+
+@dataclass
+class Block:
+    text: str
+    is_code: bool = False
+    is_heading: bool = False
+
+
+def split_blocks(markdown: str) -> list[Block]:
+    """Split markdown into paragraphs, headings and whole fenced code blocks."""
+    blocks: list[Block] = []
+    paragraph: list[str] = []
+    code: list[str] | None = None
+    fence = ""
+
+    def flush_paragraph():
+        if paragraph:
+            blocks.append(Block("\n".join(paragraph)))
+            paragraph.clear()
+
+    for line in markdown.splitlines():
+        if code is not None:
+            code.append(line)
+            if line.strip().startswith(fence):
+                blocks.append(Block("\n".join(code), is_code=True))
+                code = None
+            continue
+
+        match = FENCE_PATTERN.match(line.strip())
+        if match:
+            flush_paragraph()
+            fence = match.group(1)
+            code = [line]
+        elif HEADING_PATTERN.match(line):
+            flush_paragraph()
+            blocks.append(Block(line, is_heading=True))
+        elif not line.strip():
+            flush_paragraph()
+        else:
+            paragraph.append(line)
+
+    flush_paragraph()
+    if code is not None:
+        blocks.append(Block("\n".join(code), is_code=True))
+    return blocks
+
+
+def _split_code_block(block: Block, chunk_size: int) -> list[str]:
+    """Split an oversized code block on line boundaries, re-fencing each piece."""
+    lines = block.text.splitlines()
+    opening = lines[0]
+    fence = FENCE_PATTERN.match(opening.strip()).group(1)
+    body = lines[1:-1] if lines[-1].strip().startswith(fence) else lines[1:]
+
+    groups: list[list[str]] = []
+    current: list[str] = []
+    size = 0
+    overhead = len(opening) + len(fence) + 2
+    for line in body:
+        if current and size + len(line) + 1 + overhead > chunk_size:
+            groups.append(current)
+            current, size = [], 0
+        current.append(line)
+        size += len(line) + 1
+    groups.append(current)
+    # A split can leave only blank lines for a piece, e.g. the one before the
+    # closing fence; a fenced block without code would be indexed as noise.
+    return [
+        "\n".join([opening, *group, fence])
+        for group in groups
+        if any(line.strip() for line in group)
+    ]
+
+
+def _split_text(text: str, chunk_size: int) -> list[str]:
+    """Split an oversized paragraph at sentence ends, falling back to spaces."""
+    pieces: list[str] = []
+    while len(text) > chunk_size:
+        window = text[:chunk_size]
+        cut = max(window.rfind(". "), window.rfind("\n"))
+        if cut < chunk_size * 0.3:
+            cut = window.rfind(" ")
+        if cut < chunk_size * 0.3:
+            cut = chunk_size - 1
+        pieces.append(text[: cut + 1].strip())
+        text = text[cut + 1 :].strip()
+    if text:
+        pieces.append(text)
+    return pieces
+
+
+def chunk_markdown(markdown: str, chunk_size: int = 5000) -> list[str]:
+    """Pack markdown blocks into chunks of at most `chunk_size` characters.
+
+    Fenced code blocks are never cut mid-block unless they alone exceed the
+    chunk size. Headings stay with the block that follows them, and a chunk is
+    closed before a heading once it is at least half full so sections tend to
+    start their own chunk.
+    """
+    chunks: list[str] = []
+    current: list[Block] = []
+
+    def size() -> int:
+        return sum(len(block.text) + 2 for block in current)
+
+    def flush(carry_heading: bool = False):
+        carried = current.pop() if carry_heading and current[-1].is_heading else None
+        if current:
+            chunks.append("\n\n".join(block.text for block in current))
+        current.clear()
+        if carried is not None:
+            current.append(carried)
+
+    for block in split_blocks(markdown):
+        if len(block.text) > chunk_size:
+            if current:
+                flush()
+            if block.is_code:
+                chunks.extend(_split_code_block(block, chunk_size))
+            else:
+                chunks.extend(_split_text(block.text, chunk_size))
+            continue
+
+        if current and block.is_heading and size() >= chunk_size / 2:
+            flush()
+        if current and size() + len(block.text) + 2 > chunk_size:
+            flush(carry_heading=len(current) > 1)
+        current.append(block)
+
+    if current:
+        flush()
+    return chunks
@@ -0,0 +1,156 @@
+import asyncio
+from enum import Enum
+from pathlib import Path
+from typing import Annotated
+
+import typer
+
+from pygent.core import config
+
+from .enrich import AgentSummarizer, HashEmbedder, HeuristicSummarizer, OpenAIEmbedder
+from .pipeline import IngestPipeline
+from .sources import DirectorySource, PageSource, SitemapSource
+from .store import JsonlChunkStore, SupabaseChunkStore
+
+app = typer.Typer(help="Ingest documentation into the site_pages table.")
+
+
+class EmbedderChoice(str, Enum):
+    openai = "openai"
+    hash = "hash"
+
+
+class SummarizerChoice(str, Enum):
+    llm = "llm"
+    heuristic = "heuristic"
+
+
+def _run(
+    source: PageSource,
+    output: Path | None,
+    embedder: EmbedderChoice,
+    summarizer: SummarizerChoice,
+    chunk_size: int,
+    concurrency: int,
+    force: bool,
+):
+    if embedder is EmbedderChoice.openai:
+        from pygent.core.clients import get_openai_client
+        from pygent.core.scheduler import BACKGROUND, request_priority
+
+        # Ingestion yields the rate limits to interactive requests.
+        request_priority.set(BACKGROUND)
+        chosen_embedder = OpenAIEmbedder(get_openai_client())
+    else:
+        chosen_embedder = HashEmbedder()
+
+    if output is not None:
+        store = JsonlChunkStore(output)
+    else:
+        from pygent.core.clients import get_async_supabase_client
+
+        store = SupabaseChunkStore(get_async_supabase_client())
+
+    pipeline = IngestPipeline(
+        source,
+        chosen_embedder,
+        AgentSummarizer()
+        if summarizer is SummarizerChoice.llm
+        else HeuristicSummarizer(),
+        store,
+        chunk_size=chunk_size,
+        concurrency=concurrency,
+        force=force,
+    )
+    report = asyncio.run(pipeline.run())
+    typer.echo(str(report))
+
+
+OutputOption = Annotated[
+    Path | None,
+    typer.Option(help="Write a JSONL export instead of upserting into Supabase."),
+]
+EmbedderOption = Annotated[EmbedderChoice, typer.Option()]
+SummarizerOption = Annotated[SummarizerChoice, typer.Option()]
+ChunkSizeOption = Annotated[int, typer.Option(help="Maximum characters per chunk.")]
+ConcurrencyOption = Annotated[int, typer.Option(help="Pages processed at once.")]
+ForceOption = Annotated[
+    bool, typer.Option(help="Re-embed every chunk, even if its content is unchanged.")
+]
+
+
+@app.command()
+def sitemap(
+    url: str,
+    output: OutputOption = None,
+    embedder: EmbedderOption = EmbedderChoice.openai,
+    summarizer: SummarizerOption = SummarizerChoice.llm,
+    chunk_size: ChunkSizeOption = 5000,
+    concurrency: ConcurrencyOption = 5,
+    force: ForceOption = False,
+):
+    """Crawl every page listed in a sitemap."""
+    _run(
+        SitemapSource(url, concurrency),
+        output,
+        embedder,
+        summarizer,
+        chunk_size,
+        concurrency,
+        force,
+    )
+
+
+@app.command()
+def directory(
+    path: Path,
+    base_url: Annotated[str, typer.Option(help="URL the directory is served at.")],
+    output: OutputOption = None,
+    embedder: EmbedderOption = EmbedderChoice.openai,
+    summarizer: SummarizerOption = SummarizerChoice.llm,
+    chunk_size: ChunkSizeOption = 5000,
+    concurrency: ConcurrencyOption = 5,
+    force: ForceOption = False,
+):
+    """Ingest a local directory of HTML files."""
+    _run(
+        DirectorySource(path, base_url),
+        output,
+        embedder,
+        summarizer,
+        chunk_size,
+        concurrency,
+        force,
+    )
+
+
+async def _export_local_index(export: Path | None, index: Path) -> int:
+    from pygent.tools.retrievers import LocalRetriever, export_site_pages
+
+    if export is None:
+        from pygent.core.clients import get_async_supabase_client
+
+        index.mkdir(parents=True, exist_ok=True)
+        export = index / "site_pages.jsonl"
+        await export_site_pages(get_async_supabase_client(), export)
+    retriever = await asyncio.to_thread(LocalRetriever.from_export, export)
+    await asyncio.to_thread(retriever.save, index)
+    return len(retriever.rows)
+
+
+@app.command()
+def local_index(
+    export: Annotated[
+        Path | None,
+        typer.Option(
+            help="Build from this JSON or JSONL export, e.g. an ingest --output "
+            "file, instead of exporting site_pages from Supabase."
+        ),
+    ] = None,
+    index: Annotated[
+        Path, typer.Option(help="Directory to write the index to.")
+    ] = Path(config.LOCAL_INDEX_PATH),
+):
+    """Build the index that RETRIEVER_BACKEND=local searches."""
+    rows = asyncio.run(_export_local_index(export, index))
+    typer.echo(f"Indexed {rows} chunks in {index}")
@@ -0,0 +1,115 @@
+import hashlib
+import math
+import re
+from typing import Protocol
+
+from openai import AsyncOpenAI
+from pydantic import BaseModel, Field
+from pydantic_ai import Agent
+
+from pygent.core.config import EMBEDDING_MODEL, SMALL_LLM_MODEL
+
+EMBEDDING_DIMENSIONS = 1536
+
+
+class Embedder(Protocol):
+    async def embed(self, texts: list[str]) -> list[list[float]]: ...
+
+
+class OpenAIEmbedder:
+    """Embeds texts with list-input requests of at most `batch_size` items."""
+
+    def __init__(
+        self,
+        client: AsyncOpenAI,
+        model: str = EMBEDDING_MODEL,
+        batch_size: int = 100,
+    ):
+        self.client = client
+        self.model = model
+        self.batch_size = batch_size
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        embeddings: list[list[float]] = []
+        for start in range(0, len(texts), self.batch_size):
+            response = await self.client.embeddings.create(
+                model=self.model, input=texts[start : start + self.batch_size]
+            )
+            ordered = sorted(response.data, key=lambda item: item.index)
+            embeddings.extend(item.embedding for item in ordered)
+        return embeddings
+
+
+class HashEmbedder:
+    """Deterministic hashing-trick embeddings for offline runs and tests.
+
+    Similar texts share tokens and therefore dimensions, so local retrieval
+    over these vectors still behaves sensibly.
+    """
+
+    def __init__(self, dimensions: int = EMBEDDING_DIMENSIONS):
+        self.dimensions = dimensions
+        self.calls = 0
+
+    def _embed(self, text: str) -> list[float]:
+        vector = [0.0] * self.dimensions
+        for token in re.findall(r"\w+", text.lower()):
+            digest = hashlib.blake2b(token.encode(), digest_size=8).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dimensions
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        self.calls += 1
+        return [self._embed(text) for text in texts]
+
+
+class TitleSummary(BaseModel):
+    title: str = Field(..., description="A short, descriptive title for the chunk.")
+    summary: str = Field(
+        ..., description="A concise summary of the main points of the chunk."
+    )
+
+
+class Summarizer(Protocol):
+    async def summarize(self, url: str, chunk: str) -> TitleSummary: ...
+
+
+title_summary_agent = Agent(
+    SMALL_LLM_MODEL,
+    output_type=TitleSummary,
+    instructions="""You are extracting a title and a summary from a chunk of documentation.
+    If the chunk starts a page, derive the title from the page; otherwise, derive a descriptive title for the chunk itself.
+    Keep the summary to one or two sentences focused on the main points.""",
+)
+
+
+class AgentSummarizer:
+    def __init__(self, agent: Agent[None, TitleSummary] = title_summary_agent):
+        self.agent = agent
+
+    async def summarize(self, url: str, chunk: str) -> TitleSummary:
+        result = await self.agent.run(f"URL: {url}\n\nContent:\n{chunk[:1000]}...")
+        return result.output
+
+
+class HeuristicSummarizer:
+    """Title from the first heading, summary from the first prose sentence."""
+
+    async def summarize(self, url: str, chunk: str) -> TitleSummary:
+        lines = [line.strip() for line in chunk.splitlines() if line.strip()]
+        heading = next(
+            (line.lstrip("#").strip() for line in lines if line.startswith("#")), None
+        )
+        summary = next(
+            (
+                line.split(". ")[0][:200]
+                for line in lines
+                if not line.startswith(("#", "```", "~~~"))
+            ),
+            "",
+        )
+        return TitleSummary(
+            title=heading or url.rstrip("/").rsplit("/", 1)[-1], summary=summary
+        )
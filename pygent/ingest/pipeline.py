@@ -0,0 +1,168 @@
+import asyncio
+import hashlib
+import time
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from urllib.parse import urlparse
+
+from pydantic_ai.exceptions import AgentRunError
+
+from pygent.core.clients import client_errors
+from pygent.core.config import DOCS_SOURCE
+
+from .chunking import chunk_markdown
+from .enrich import Embedder, Summarizer
+from .sources import Page, PageSource
+from .store import ChunkStore
+
+
+def content_hash(chunk: str) -> str:
+    return hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class PageSync:
+    chunks: int
+    written: int
+    deleted: int
+
+
+@dataclass
+class IngestReport:
+    pages: int = 0
+    chunks: int = 0
+    written_chunks: int = 0
+    deleted_chunks: int = 0
+    failed_pages: int = 0
+    seconds: float = 0.0
+
+    @property
+    def unchanged_chunks(self) -> int:
+        return self.chunks - self.written_chunks
+
+    @property
+    def pages_per_second(self) -> float:
+        return self.pages / self.seconds if self.seconds else 0.0
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.chunks / self.seconds if self.seconds else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.pages} pages, {self.chunks} chunks ({self.written_chunks} written, "
+            f"{self.unchanged_chunks} unchanged, {self.deleted_chunks} deleted), "
+            f"{self.failed_pages} failed in {self.seconds:.1f}s ({self.pages_per_second:.2f} pages/s, "
+            f"{self.chunks_per_second:.2f} chunks/s)"
+        )
+
+
+class IngestPipeline:
+    """Crawl, chunk, enrich, embed and store documentation pages.
+
+    Pages are processed as soon as the source yields them, with at most
+    `concurrency` pages being enriched at once. Only chunks whose content hash
+    changed are re-embedded, in one batched call per page, and written with a
+    single bulk upsert; `force` re-embeds everything.
+    """
+
+    def __init__(
+        self,
+        source: PageSource,
+        embedder: Embedder,
+        summarizer: Summarizer,
+        store: ChunkStore,
+        chunk_size: int = 5000,
+        concurrency: int = 5,
+        source_name: str = DOCS_SOURCE,
+        force: bool = False,
+    ):
+        self.source = source
+        self.embedder = embedder
+        self.summarizer = summarizer
+        self.store = store
+        self.chunk_size = chunk_size
+        self.concurrency = concurrency
+        self.source_name = source_name
+        self.force = force
+
+    async def sync_page(self, page: Page) -> PageSync:
+        """Write the chunks of `page` whose content changed since the last run.
+
+        Unchanged chunks (same content hash at the same chunk number) are not
+        summarized, embedded or rewritten, and chunk numbers past the new end
+        of the page are deleted.
+        """
+        chunks = chunk_markdown(page.markdown, self.chunk_size)
+        hashes = [content_hash(chunk) for chunk in chunks]
+        stored = {} if self.force else await self.store.content_hashes(page.url)
+        changed = [
+            number
+            for number, digest in enumerate(hashes)
+            if stored.get(number) != digest
+        ]
+
+        rows = []
+        if changed:
+            summaries = await asyncio.gather(
+                *(
+                    self.summarizer.summarize(page.url, chunks[number])
+                    for number in changed
+                )
+            )
+            embeddings = await self.embedder.embed(
+                [chunks[number] for number in changed]
+            )
+            now = datetime.now(UTC).isoformat()
+            rows = [
+                {
+                    "url": page.url,
+                    "chunk_number": number,
+                    "title": summary.title,
+                    "summary": summary.summary,
+                    "content": chunks[number],
+                    "metadata": {
+                        "source": self.source_name,
+                        "chunk_size": len(chunks[number]),
+                        "content_hash": hashes[number],
+                        "crawled_at": now,
+                        "url_path": urlparse(page.url).path,
+                    },
+                    "embedding": embedding,
+                    "created_at": now,
+                }
+                for number, summary, embedding in zip(changed, summaries, embeddings)
+            ]
+            await self.store.upsert(rows)
+
+        deleted = 0
+        if self.force or any(number >= len(chunks) for number in stored):
+            deleted = await self.store.delete_from(page.url, len(chunks))
+        return PageSync(chunks=len(chunks), written=len(rows), deleted=deleted)
+
+    async def run(self) -> IngestReport:
+        report = IngestReport()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        start = time.perf_counter()
+
+        async def process(page: Page):
+            async with semaphore:
+                try:
+                    sync = await self.sync_page(page)
+                except (AgentRunError, OSError, *client_errors()) as e:
+                    print(f"Error processing {page.url}: {e}")
+                    report.failed_pages += 1
+                    return
+            report.pages += 1
+            report.chunks += sync.chunks
+            report.written_chunks += sync.written
+            report.deleted_chunks += sync.deleted
+
+        async with asyncio.TaskGroup() as tasks:
+            async for page in self.source.pages():
+                tasks.create_task(process(page))
+        await self.store.flush()
+
+        report.failed_pages += len(getattr(self.source, "failed", []))
+        report.seconds = time.perf_counter() - start
+        return report
@@ -0,0 +1,107 @@
+import asyncio
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Protocol
+from xml.etree import ElementTree
+
+import html2text
+import httpx
+
+SITEMAP_NAMESPACE = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+
+
+@dataclass
+class Page:
+    url: str
+    markdown: str
+
+
+class PageSource(Protocol):
+    """Yields crawled pages as markdown, in completion order."""
+
+    def pages(self) -> AsyncIterator[Page]: ...
+
+
+def html_to_markdown(html: str) -> str:
+    converter = html2text.HTML2Text()
+    converter.ignore_images = True
+    converter.body_width = 0
+    converter.mark_code = True
+    markdown = converter.handle(html)
+    # html2text marks <pre> blocks as [code]...[/code]; turn them into fences
+    # so the chunker can keep code blocks whole.
+    return markdown.replace("[code]", "```").replace("[/code]", "```")
+
+
+async def fetch_sitemap_urls(sitemap_url: str) -> list[str]:
+    async with httpx.AsyncClient(follow_redirects=True) as client:
+        response = await client.get(sitemap_url)
+        response.raise_for_status()
+
+    root = ElementTree.fromstring(response.content)
+    return [
+        loc.text.strip() for loc in root.iter(f"{SITEMAP_NAMESPACE}loc") if loc.text
+    ]
+
+
+class SitemapSource:
+    """Crawl every URL of a sitemap with crawl4ai, at most `concurrency` at a time."""
+
+    def __init__(self, sitemap_url: str, concurrency: int = 5):
+        self.sitemap_url = sitemap_url
+        self.concurrency = concurrency
+        self.failed: list[str] = []
+
+    async def pages(self) -> AsyncIterator[Page]:
+        # crawl4ai pulls in playwright, so only import it when actually crawling
+        from crawl4ai import (
+            AsyncWebCrawler,
+            BrowserConfig,
+            CacheMode,
+            CrawlerRunConfig,
+        )
+
+        urls = await fetch_sitemap_urls(self.sitemap_url)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        run_config = CrawlerRunConfig(cache_mode=CacheMode.BYPASS)
+
+        async with AsyncWebCrawler(config=BrowserConfig(headless=True)) as crawler:
+
+            async def crawl(url: str) -> Page | None:
+                async with semaphore:
+                    result = await crawler.arun(url=url, config=run_config)
+                if not result.success:
+                    print(f"Failed to crawl {url}: {result.error_message}")
+                    self.failed.append(url)
+                    return None
+                return Page(url, str(result.markdown))
+
+            for task in asyncio.as_completed([crawl(url) for url in urls]):
+                page = await task
+                if page is not None:
+                    yield page
+
+
+class DirectorySource:
+    """Read `*.html` files from a directory, mapping paths onto `base_url`.
+
+    `docs/agents/index.html` becomes `<base_url>/agents/`, mirroring how the
+    documentation site is served.
+    """
+
+    def __init__(self, directory: str | Path, base_url: str):
+        self.directory = Path(directory)
+        self.base_url = base_url.rstrip("/")
+
+    def url_for(self, path: Path) -> str:
+        relative = path.relative_to(self.directory).with_suffix("")
+        parts = list(relative.parts)
+        if parts[-1] == "index":
+            parts.pop()
+        return "/".join([self.base_url, *parts]) + "/"
+
+    async def pages(self) -> AsyncIterator[Page]:
+        for path in sorted(self.directory.rglob("*.html")):
+            html = await asyncio.to_thread(path.read_text, encoding="utf-8")
+            yield Page(self.url_for(path), html_to_markdown(html))
@@ -0,0 +1,123 @@
+import asyncio
+import json
+import os
+from pathlib import Path
+from typing import Any, Protocol
+
+from supabase import AsyncClient
+
+
+class ChunkStore(Protocol):
+    async def content_hashes(self, url: str) -> dict[int, str]:
+        """Stored `metadata.content_hash` of each chunk of `url`, by chunk number."""
+        ...
+
+    async def upsert(self, rows: list[dict[str, Any]]) -> None: ...
+
+    async def delete_from(self, url: str, chunk_number: int) -> int:
+        """Delete the chunks of `url` numbered `chunk_number` and above."""
+        ...
+
+    async def flush(self) -> None: ...
+
+
+class SupabaseChunkStore:
+    """Bulk upserts into `site_pages`, replacing rows on `(url, chunk_number)`."""
+
+    def __init__(self, supabase: AsyncClient, batch_size: int = 100):
+        self.supabase = supabase
+        self.batch_size = batch_size
+
+    async def content_hashes(self, url: str) -> dict[int, str]:
+        result = await (
+            self.supabase.from_("site_pages")
+            .select("chunk_number, content_hash:metadata->>content_hash")
+            .eq("url", url)
+            .execute()
+        )
+        return {
+            row["chunk_number"]: row["content_hash"]
+            for row in result.data
+            if row["content_hash"]
+        }
+
+    async def upsert(self, rows: list[dict[str, Any]]) -> None:
+        for start in range(0, len(rows), self.batch_size):
+            await (
+                self.supabase.from_("site_pages")
+                .upsert(
+                    rows[start : start + self.batch_size],
+                    on_conflict="url,chunk_number",
+                )
+                .execute()
+            )
+
+    async def delete_from(self, url: str, chunk_number: int) -> int:
+        result = await (
+            self.supabase.from_("site_pages")
+            .delete()
+            .eq("url", url)
+            .gte("chunk_number", chunk_number)
+            .execute()
+        )
+        return len(result.data)
+
+    async def flush(self) -> None:
+        pass
+
+
+class JsonlChunkStore:
+    """Keeps a JSONL export that `LocalRetriever.from_export` can load.
+
+    Existing rows are loaded on first use and changes are applied in memory;
+    `flush` rewrites the file once, atomically, at the end of a run.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._rows: dict[tuple[str, int], dict[str, Any]] | None = None
+
+    def _load(self) -> dict[tuple[str, int], dict[str, Any]]:
+        if self._rows is None:
+            self._rows = {}
+            if self.path.exists():
+                with open(self.path, encoding="utf-8") as f:
+                    for line in f:
+                        row = json.loads(line)
+                        self._rows[(row["url"], row["chunk_number"])] = row
+        return self._rows
+
+    async def content_hashes(self, url: str) -> dict[int, str]:
+        return {
+            number: row["metadata"]["content_hash"]
+            for (row_url, number), row in self._load().items()
+            if row_url == url and "content_hash" in row["metadata"]
+        }
+
+    async def upsert(self, rows: list[dict[str, Any]]) -> None:
+        stored = self._load()
+        for row in rows:
+            stored[(row["url"], row["chunk_number"])] = row
+
+    async def delete_from(self, url: str, chunk_number: int) -> int:
+        stored = self._load()
+        orphans = [key for key in stored if key[0] == url and key[1] >= chunk_number]
+        for key in orphans:
+            del stored[key]
+        return len(orphans)
+
+    def _write(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(temporary, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(row) + "\n" for row in self.rows())
+        os.replace(temporary, self.path)
+
+    async def flush(self) -> None:
+        if self._rows is not None:
+            await asyncio.to_thread(self._write)
+
+    def rows(self) -> list[dict[str, Any]]:
+        return sorted(
+            self._load().values(), key=lambda row: (row["url"], row["chunk_number"])
+        )
@@ -0,0 +1,3 @@
+from .app import RunLimiter, app, limiter, use_test_models
+
+__all__ = ["RunLimiter", "app", "limiter", "use_test_models"]
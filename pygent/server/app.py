@@ -0,0 +1,259 @@
+import asyncio
+import json
+import uuid
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from functools import cache
+
+from pydantic_ai.exceptions import AgentRunError
+from pydantic_ai.models.test import TestModel
+from pydantic_graph.exceptions import GraphRuntimeError
+from starlette.applications import Starlette
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+from pygent import agents
+from pygent.agents.model_cache import model_cache
+from pygent.core import config
+from pygent.core.clients import client_errors, close_clients
+from pygent.core.logs import flush_logs
+from pygent.core.metrics import LabeledCounter, metrics
+from pygent.core.telemetry import configure_telemetry
+from pygent.graph import (
+    GraphDeps,
+    GraphOutput,
+    NodeEvent,
+    TextDelta,
+    run_graph,
+    stream_graph,
+)
+from pygent.graph.iterator import run_directory
+from pygent.tools.answer_cache import answer_cache
+
+
+class RunLimiter:
+    """Caps the graph steps a worker runs at once.
+
+    Requests beyond the limit wait up to `timeout` seconds for a slot and are
+    then rejected with 503, so a saturated worker sheds load instead of
+    queueing without bound behind the load balancer.
+    """
+
+    def __init__(
+        self,
+        limit: int = config.SERVER_MAX_CONCURRENT_RUNS,
+        timeout: float = config.SERVER_QUEUE_TIMEOUT,
+    ):
+        self.limit = limit
+        self.timeout = timeout
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._semaphore = asyncio.Semaphore(limit)
+
+    async def acquire(self) -> None:
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.timeout)
+        except TimeoutError:
+            self.rejected += 1
+            raise HTTPException(
+                503, "Server is at capacity", headers={"Retry-After": "1"}
+            )
+        finally:
+            self.waiting -= 1
+        self.active += 1
+
+    def release(self) -> None:
+        self.active -= 1
+        self._semaphore.release()
+
+
+limiter = RunLimiter()
+
+
+def use_test_models() -> None:
+    """Swap every agent's model for a `TestModel` and disable lookups that
+    need OpenAI or Supabase, so the server runs fully offline."""
+    for name in agents.__all__:
+        agent = getattr(agents, name)
+        if hasattr(agent, "override"):
+            agent.model = TestModel(call_tools=[])
+    agents.next_step_router.mode = "llm"
+    agents.refine_router.mode = "llm"
+    answer_cache.max_entries = 0
+
+
+@cache
+def stub_deps() -> tuple:
+    """In-memory documentation store and embeddings client for stub mode."""
+    from pygent.testing import FakeDocStore, FakeEmbeddingClient, synthetic_corpus
+
+    return FakeDocStore(synthetic_corpus()), FakeEmbeddingClient()
+
+
+def graph_deps() -> GraphDeps:
+    """Dependencies of one graph step, offline stand-ins in stub mode."""
+    if config.SERVER_STUB_MODELS:
+        supabase, embedding_client = stub_deps()
+        return GraphDeps(supabase=supabase, embedding_client=embedding_client)
+    return GraphDeps()
+
+
+def get_run_id(request: Request) -> str:
+    run_id = request.path_params["run_id"]
+    try:
+        directory = run_directory(run_id)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    if not directory.is_dir():
+        raise HTTPException(404, f"Run {run_id} not found")
+    return run_id
+
+
+async def get_message(request: Request) -> str:
+    try:
+        body = await request.json()
+    except json.JSONDecodeError:
+        raise HTTPException(400, "Body must be JSON")
+    message = body.get("message") if isinstance(body, dict) else None
+    if not isinstance(message, str) or not message.strip():
+        raise HTTPException(400, "Body must contain a non-empty 'message'")
+    return message
+
+
+async def health(request: Request) -> JSONResponse:
+    return JSONResponse({"status": "ok"})
+
+
+def server_metrics() -> str:
+    """Worker load and cache hit counts, in the Prometheus text format."""
+    lines = [
+        "# HELP pygent_server_active_runs Graph steps running on this worker.",
+        "# TYPE pygent_server_active_runs gauge",
+        f"pygent_server_active_runs {limiter.active}",
+        "# HELP pygent_server_waiting_runs Graph steps waiting for a slot.",
+        "# TYPE pygent_server_waiting_runs gauge",
+        f"pygent_server_waiting_runs {limiter.waiting}",
+    ]
+    rejected = LabeledCounter(
+        "pygent_server_rejected_runs_total", "Graph steps rejected at capacity."
+    )
+    rejected.inc(amount=limiter.rejected)
+    lookups = LabeledCounter(
+        "pygent_answer_cache_lookups_total", "Answer cache lookups.", "result"
+    )
+    lookups.inc("hit", answer_cache.stats.hits)
+    lookups.inc("miss", answer_cache.stats.misses)
+    model_lookups = LabeledCounter(
+        "pygent_model_cache_lookups_total", "Model response cache lookups.", "result"
+    )
+    model_lookups.inc("hit", model_cache.stats.hits)
+    model_lookups.inc("miss", model_cache.stats.misses)
+    lines += rejected.render() + lookups.render() + model_lookups.render()
+    return "\n".join(lines) + "\n"
+
+
+async def prometheus_metrics(request: Request) -> PlainTextResponse:
+    return PlainTextResponse(
+        metrics.render() + server_metrics(), media_type="text/plain; version=0.0.4"
+    )
+
+
+async def create_run(request: Request) -> JSONResponse:
+    run_id = str(uuid.uuid4())
+    await asyncio.to_thread(run_directory(run_id).mkdir, parents=True)
+    return JSONResponse({"run_id": run_id}, status_code=201)
+
+
+def run_errors() -> tuple[type[Exception], ...]:
+    """Failures of a graph step that are answered with an error, not a traceback."""
+    return (AgentRunError, GraphRuntimeError, OSError, *client_errors())
+
+
+async def post_message(request: Request) -> JSONResponse:
+    run_id = get_run_id(request)
+    message = await get_message(request)
+
+    await limiter.acquire()
+    try:
+        output = await run_graph(run_id, message, graph_deps())
+    except run_errors() as e:
+        print(f"Error running graph for run {run_id}: {e}")
+        raise HTTPException(500, "The agent failed to process the message")
+    finally:
+        limiter.release()
+    return JSONResponse({"run_id": run_id, "output": output})
+
+
+def server_sent_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def stream_message(request: Request) -> StreamingResponse:
+    run_id = get_run_id(request)
+    message = await get_message(request)
+
+    async def events() -> AsyncIterator[str]:
+        # The slot is taken once the body starts streaming, so it is always
+        # released, even when the client disconnects before that.
+        try:
+            await limiter.acquire()
+        except HTTPException as e:
+            yield server_sent_event("error", {"detail": e.detail})
+            return
+        try:
+            async for event in stream_graph(run_id, message, graph_deps()):
+                if isinstance(event, NodeEvent):
+                    yield server_sent_event("node", {"node": event.node})
+                elif isinstance(event, TextDelta):
+                    yield server_sent_event("delta", {"text": event.text})
+                elif isinstance(event, GraphOutput):
+                    yield server_sent_event("output", {"text": event.text})
+        except run_errors() as e:
+            print(f"Error streaming graph for run {run_id}: {e}")
+            yield server_sent_event(
+                "error", {"detail": "The agent failed to process the message"}
+            )
+        finally:
+            limiter.release()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def http_exception(request: Request, exc: HTTPException) -> JSONResponse:
+    return JSONResponse(
+        {"detail": exc.detail}, status_code=exc.status_code, headers=exc.headers
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: Starlette) -> AsyncIterator[None]:
+    configure_telemetry()
+    if config.SERVER_STUB_MODELS:
+        use_test_models()
+        stub_deps()
+    agents.next_step_router.start_training()
+    agents.refine_router.start_training()
+    yield
+    await close_clients()
+    await asyncio.to_thread(flush_logs)
+
+
+app = Starlette(
+    routes=[
+        Route("/healthz", health),
+        Route("/metrics", prometheus_metrics),
+        Route("/runs", create_run, methods=["POST"]),
+        Route("/runs/{run_id}/messages", post_message, methods=["POST"]),
+        Route("/runs/{run_id}/messages/stream", stream_message, methods=["POST"]),
+    ],
+    exception_handlers={HTTPException: http_exception},
+    lifespan=lifespan,
+)
@@ -0,0 +1,28 @@
+import os
+from typing import Annotated
+
+import typer
+import uvicorn
+
+from pygent.core import config
+
+app = typer.Typer(help="Serve the agent graph over HTTP.")
+
+
+@app.command()
+def serve(
+    host: Annotated[str, typer.Option(help="Interface to bind.")] = config.SERVER_HOST,
+    port: Annotated[int, typer.Option(help="Port to bind.")] = config.SERVER_PORT,
+    workers: Annotated[
+        int, typer.Option(help="Worker processes, each with its own event loop.")
+    ] = 1,
+    stub_models: Annotated[
+        bool, typer.Option(help="Answer with TestModel stubs, fully offline.")
+    ] = config.SERVER_STUB_MODELS,
+):
+    """Run the ASGI app with uvicorn."""
+    if stub_models:
+        # Workers re-import the config, so pass the flag through the environment.
+        os.environ["SERVER_STUB_MODELS"] = "true"
+        config.SERVER_STUB_MODELS = True
+    uvicorn.run("pygent.server.app:app", host=host, port=port, workers=workers)
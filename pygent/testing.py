@@ -0,0 +1,204 @@
+"""In-process stand-ins for Supabase and the OpenAI embeddings API.
+
+Both answer like the real services, including the `match_site_pages` family of
+RPCs and the `site_pages` queries, after an optional simulated latency, so the
+graph and its tools run unmodified and offline. The benchmarks and the server's
+stub mode run on them.
+"""
+
+import asyncio
+import hashlib
+from collections import Counter
+from types import SimpleNamespace
+from typing import Any
+
+from pygent.core.config import DOCS_SOURCE
+from pygent.ingest.enrich import HashEmbedder
+from pygent.tools.retrievers import ROW_FIELDS, LocalRetriever
+
+BASE_URL = "https://ai.pydantic.dev"
+TOPICS = [
+    "agents",
+    "tools",
+    "dependencies",
+    "results",
+    "message-history",
+    "models",
+    "streaming",
+    "testing",
+    "graphs",
+    "logfire",
+]
+WORDS = [
+    "agent",
+    "tool",
+    "model",
+    "result",
+    "stream",
+    "message",
+    "history",
+    "dependency",
+    "context",
+    "run",
+    "output",
+    "validation",
+    "retry",
+    "prompt",
+    "system",
+    "user",
+    "response",
+    "schema",
+    "function",
+    "async",
+    "await",
+    "client",
+    "request",
+    "graph",
+    "node",
+    "state",
+    "persistence",
+    "test",
+]
+
+
+def synthetic_corpus(
+    pages: int = 40, chunks_per_page: int = 5, chunk_chars: int = 1500
+) -> list[dict[str, Any]]:
+    """Deterministic `site_pages` rows with hashing-trick embeddings."""
+    embedder = HashEmbedder()
+    rows = []
+    for page in range(pages):
+        topic = TOPICS[page % len(TOPICS)]
+        url = f"{BASE_URL}/{topic}/{page}/"
+        for chunk in range(chunks_per_page):
+            seed = hashlib.sha256(f"{page}:{chunk}".encode()).digest()
+            words = [WORDS[seed[i % len(seed)] % len(WORDS)] for i in range(400)]
+            content = f"## {topic} {chunk}\n\n" + " ".join(words)
+            content = content[:chunk_chars]
+            rows.append(
+                {
+                    "id": len(rows),
+                    "url": url,
+                    "chunk_number": chunk,
+                    "title": f"{topic.title()} {page} - Pydantic AI",
+                    "summary": content[:120],
+                    "content": content,
+                    "metadata": {"source": DOCS_SOURCE},
+                    "embedding": embedder._embed(content),
+                }
+            )
+    return rows
+
+
+class _Query:
+    def __init__(self, store: "FakeDocStore", handler):
+        self.store = store
+        self.handler = handler
+
+    async def execute(self):
+        await asyncio.sleep(self.store.latency)
+        return SimpleNamespace(data=self.handler())
+
+
+class _TableQuery:
+    def __init__(self, store: "FakeDocStore"):
+        self.store = store
+        self.columns: list[str] = []
+        self.filters: dict[str, Any] = {}
+
+    def select(self, columns: str) -> "_TableQuery":
+        self.columns = [column.strip() for column in columns.split(",")]
+        return self
+
+    def eq(self, column: str, value: Any) -> "_TableQuery":
+        self.filters[column] = value
+        return self
+
+    def in_(self, column: str, values: list[Any]) -> "_TableQuery":
+        self.filters[column] = list(values)
+        return self
+
+    def order(self, *args, **kwargs) -> "_TableQuery":
+        return self
+
+    def _matches(self, row: dict[str, Any]) -> bool:
+        for column, value in self.filters.items():
+            actual = (
+                row["metadata"].get("source")
+                if column == "metadata->>source"
+                else row.get(column)
+            )
+            if actual not in value if isinstance(value, list) else actual != value:
+                return False
+        return True
+
+    async def execute(self):
+        self.store.calls["site_pages"] += 1
+        await asyncio.sleep(self.store.latency)
+        rows = sorted(
+            (row for row in self.store.rows if self._matches(row)),
+            key=lambda row: (row["url"], row["chunk_number"]),
+        )
+        return SimpleNamespace(
+            data=[{column: row[column] for column in self.columns} for row in rows]
+        )
+
+
+class FakeDocStore:
+    """Duck-typed `supabase.AsyncClient` over an in-memory `site_pages` table."""
+
+    def __init__(self, rows: list[dict[str, Any]], latency: float = 0.0):
+        self.rows = rows
+        self.latency = latency
+        self.calls: Counter[str] = Counter()
+        self.retriever = LocalRetriever.from_rows(rows)
+
+    def rpc(self, name: str, params: dict[str, Any]) -> _Query:
+        self.calls[name] += 1
+        handlers = {
+            "match_site_pages": lambda: self._match(params),
+            "match_site_pages_hybrid": lambda: self._match(params),
+            "list_site_page_urls": lambda: [
+                {"url": url} for url in sorted({row["url"] for row in self.rows})
+            ],
+            "site_pages_version": lambda: [
+                {"chunk_count": len(self.rows), "last_modified": "2025-01-01"}
+            ],
+        }
+        return _Query(self, handlers[name])
+
+    def _match(self, params: dict[str, Any]) -> list[dict[str, Any]]:
+        hits = self.retriever.search(
+            params["query_embedding"], params["match_count"], params["filter"]
+        )
+        return [
+            {
+                **{key: self.rows[index][key] for key in ROW_FIELDS},
+                "similarity": score,
+            }
+            for index, score in hits
+        ]
+
+    def from_(self, table: str) -> _TableQuery:
+        return _TableQuery(self)
+
+
+class FakeEmbeddingClient:
+    """Duck-typed `AsyncOpenAI` whose `embeddings.create` hashes the input."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.requests = 0
+        self.embeddings = self
+        self._embedder = HashEmbedder()
+
+    async def create(self, model: str, input: list[str]):
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        vectors = await self._embedder.embed(list(input))
+        return SimpleNamespace(
+            data=[
+                SimpleNamespace(index=i, embedding=vector)
+                for i, vector in enumerate(vectors)
+            ]
+        )
@@ -0,0 +1,152 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+import numpy as np
+from pydantic_ai.messages import SystemPromptPart
+
+from pygent.core import config
+
+from .embedding_cache import CacheStats
+
+
+@dataclass
+class CachedAnswer:
+    question: str
+    answer: str
+    created_at: float
+    hits: int = 0
+    # The system prompt the answer was generated under, so a conversation that
+    # continues from a cache hit keeps its instructions.
+    system_prompts: list[SystemPromptPart] = field(default_factory=list)
+
+
+@dataclass
+class AnswerCacheStats(CacheStats):
+    invalidations: int = 0
+
+
+class AnswerCache:
+    """Semantic cache of Q&A answers, scoped to one documentation corpus version.
+
+    A lookup returns the stored answer whose question embedding has the highest
+    cosine similarity with the new question, if it reaches `threshold`. Every
+    lookup and store carries the current corpus version; when it changes (the
+    docs were re-ingested) all entries are dropped. Entries expire after
+    `ttl_seconds` and the least recently used are evicted past `max_entries`.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = config.ANSWER_CACHE_SIZE,
+        threshold: float = config.ANSWER_CACHE_THRESHOLD,
+        ttl_seconds: float | None = config.ANSWER_CACHE_TTL,
+    ):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.version: str | None = None
+        self.stats = AnswerCacheStats()
+        self._entries: OrderedDict[int, tuple[np.ndarray, CachedAnswer]] = OrderedDict()
+        self._next_id = 0
+        self._matrix: tuple[list[int], np.ndarray] | None = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _sync_version(self, version: str) -> None:
+        if version != self.version:
+            if self._entries:
+                self.stats.invalidations += 1
+            self.clear()
+            self.version = version
+
+    def _expired(self, entry: CachedAnswer) -> bool:
+        return bool(self.ttl_seconds) and entry.created_at + self.ttl_seconds < (
+            time.time()
+        )
+
+    def _drop_expired(self) -> None:
+        expired = [
+            entry_id
+            for entry_id, (_, entry) in self._entries.items()
+            if self._expired(entry)
+        ]
+        for entry_id in expired:
+            self._remove(entry_id)
+        self.stats.evictions += len(expired)
+
+    def _search_matrix(self) -> tuple[list[int], np.ndarray]:
+        if self._matrix is None:
+            ids = list(self._entries)
+            vectors = [self._entries[entry_id][0] for entry_id in ids]
+            self._matrix = (ids, np.stack(vectors) if vectors else np.empty((0, 0)))
+        return self._matrix
+
+    @staticmethod
+    def _normalize(embedding: list[float]) -> np.ndarray | None:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def lookup(self, embedding: list[float], version: str) -> CachedAnswer | None:
+        self._sync_version(version)
+        self._drop_expired()
+        query = self._normalize(embedding)
+        if query is None or not self._entries:
+            self.stats.misses += 1
+            return None
+
+        ids, matrix = self._search_matrix()
+        similarities = matrix @ query
+        best = int(np.argmax(similarities))
+        entry_id = ids[best]
+        _, entry = self._entries[entry_id]
+        if similarities[best] < self.threshold:
+            self.stats.misses += 1
+            return None
+
+        self._entries.move_to_end(entry_id)
+        entry.hits += 1
+        self.stats.hits += 1
+        return entry
+
+    def store(
+        self,
+        question: str,
+        embedding: list[float],
+        answer: str,
+        version: str,
+        system_prompts: list[SystemPromptPart] | None = None,
+    ) -> None:
+        self._sync_version(version)
+        vector = self._normalize(embedding)
+        if vector is None or not self.enabled:
+            return
+
+        self._entries[self._next_id] = (
+            vector,
+            CachedAnswer(
+                question, answer, time.time(), system_prompts=system_prompts or []
+            ),
+        )
+        self._next_id += 1
+        self._matrix = None
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def _remove(self, entry_id: int) -> None:
+        del self._entries[entry_id]
+        self._matrix = None
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._matrix = None
+
+
+answer_cache = AnswerCache()
@@ -1,27 +1,95 @@
-from openai import AsyncOpenAI
-from supabase import Client
+from __future__ import annotations
 
-from pygent.core.clients import openai_client, supabase_client
-from pygent.core.config import EMBEDDING_MODEL
+from typing import TYPE_CHECKING
+
+from pygent.core.clients import (
+    client_errors,
+    get_async_supabase_client,
+    get_openai_client,
+)
+from pygent.core.config import DOCS_SOURCE, EMBEDDING_MODEL, PAGE_CONTENT_MAX_CHARS
+from pygent.core.metrics import record_retrieval
+
+from .embedding_batcher import get_embedding_batcher
+from .embedding_cache import EmbeddingCache, build_embedding_cache, embedding_cache_key
+from .page_cache import (
+    SEPARATOR,
+    CachedPage,
+    PageCache,
+    PageChunk,
+    parse_embedding,
+    select_leading_chunks,
+    select_relevant_chunks,
+)
+from .page_index import page_index
+from .retrievers import Retriever, get_retriever
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+    from supabase import AsyncClient
+
+embedding_cache = build_embedding_cache()
+page_cache = PageCache()
 
 
 async def get_embedding(
-    text: str, openai_client: AsyncOpenAI = openai_client
+    text: str,
+    openai_client: AsyncOpenAI | None = None,
+    cache: EmbeddingCache | None = embedding_cache,
 ) -> list[float]:
-    try:
-        response = await openai_client.embeddings.create(
-            model=EMBEDDING_MODEL, input=text
-        )
-        return response.data[0].embedding
-    except Exception as e:
-        print(f"Error getting embedding: {e}")
-    return [0] * 1536
+    """
+    Embed the text, from the cache when it has been embedded before.
+
+    Raises:
+        One of `client_errors()` when the embeddings request fails; there is no
+        fallback vector to search or cache with.
+    """
+    key = embedding_cache_key(EMBEDDING_MODEL, text)
+    if cache is not None and (cached := await cache.get(key)) is not None:
+        return cached
+
+    client = openai_client or get_openai_client()
+    embedding = await get_embedding_batcher(client).embed(text)
+    if cache is not None:
+        await cache.set(key, embedding)
+    return embedding
+
+
+async def _search_documentation(
+    user_query: str,
+    supabase: AsyncClient | None,
+    embedding_client: AsyncOpenAI | None,
+    retriever: Retriever | None,
+) -> list[dict]:
+    query_embedding = await get_embedding(user_query, embedding_client)
+    retriever = retriever or get_retriever(supabase or get_async_supabase_client())
+    docs = await retriever.match(
+        query_embedding,
+        match_count=5,
+        filter={"source": DOCS_SOURCE},
+        query_text=user_query,
+    )
+    record_retrieval(len(docs))
+    return docs
+
+
+def _format_documentation(docs: list[dict]) -> str:
+    formatted_chunks = []
+    for doc in docs:
+        chunk_text = f"""
+# {doc["title"]}
+
+{doc["content"]}
+"""
+        formatted_chunks.append(chunk_text)
+    return "\n\n---\n\n".join(formatted_chunks)
 
 
 async def retrieve_relevant_documentation_helper(
     user_query: str,
-    supabase: Client = supabase_client,
-    embedding_client: AsyncOpenAI = openai_client,
+    supabase: AsyncClient | None = None,
+    embedding_client: AsyncOpenAI | None = None,
+    retriever: Retriever | None = None,
 ) -> str:
     """
     Retrieve relevant documentation chunks based on the query with RAG.
@@ -33,87 +101,166 @@ async def retrieve_relevant_documentation_helper(
         A formatted string containing the top 5 most relevant documentation chunks
     """
     try:
-        query_embedding = await get_embedding(user_query, embedding_client)
-        result = supabase.rpc(
-            "match_site_pages",
-            {
-                "query_embedding": query_embedding,
-                "match_count": 5,
-                "filter": {"source": "pydantic_ai_docs"},
-            },
-        ).execute()
-
-        if not result.data:
+        docs = await _search_documentation(
+            user_query, supabase, embedding_client, retriever
+        )
+        if not docs:
             return "No relevant documentation found."
-
-        formatted_chunks = []
-        for doc in result.data:
-            chunk_text = f"""
-# {doc["title"]}
-
-{doc["content"]}
-"""
-            formatted_chunks.append(chunk_text)
-        return "\n\n---\n\n".join(formatted_chunks)
+        return _format_documentation(docs)
 
     except Exception as e:
         print(f"Error retrieving relevant documentation: {e}")
         return "Error: Could not retrieve relevant documentation."
 
 
-async def list_documentation_pages_helper(
-    supabase: Client = supabase_client,
-) -> list[str]:
+async def prefetch_relevant_documentation(
+    user_query: str,
+    supabase: AsyncClient | None = None,
+    embedding_client: AsyncOpenAI | None = None,
+    retriever: Retriever | None = None,
+) -> str | None:
+    """
+    Retrieve documentation chunks for the query ahead of the expert.
+
+    Args:
+        user_query: The user's question or query
+
+    Returns:
+        The formatted top 5 chunks, or None when the search failed or found
+        nothing, so only real documentation is put in the expert's prompt
+    """
     try:
-        result = (
-            supabase.from_("site_pages")
-            .select("url")
-            .eq("metadata->>source", "pydantic_ai_docs")
-            .execute()
+        docs = await _search_documentation(
+            user_query, supabase, embedding_client, retriever
         )
+    except (*client_errors(), OSError) as e:
+        print(f"Error prefetching relevant documentation: {e}")
+        return None
+    return _format_documentation(docs) if docs else None
 
-        if not result.data:
-            return []
 
-        urls = sorted(set([doc["url"] for doc in result.data]))
-        return urls
+async def list_documentation_pages_helper(
+    supabase: AsyncClient | None = None,
+) -> list[str]:
+    try:
+        return await page_index.get_urls(supabase or get_async_supabase_client())
 
     except Exception as e:
         print(f"Error retrieving documentation pages: {e}")
         return []
 
 
-async def get_page_content_helper(url: str, supabase: Client = supabase_client) -> str:
+async def _fetch_page(
+    url: str, supabase: AsyncClient, version: str | None
+) -> CachedPage | None:
+    result = await (
+        supabase.from_("site_pages")
+        .select("title, content, chunk_number")
+        .eq("url", url)
+        .eq("metadata->>source", DOCS_SOURCE)
+        .order("chunk_number")
+        .execute()
+    )
+    if not result.data:
+        return None
+
+    return CachedPage(
+        url=url,
+        title=result.data[0]["title"].split(" - ")[0],
+        chunks=[
+            PageChunk(chunk["chunk_number"], chunk["content"]) for chunk in result.data
+        ],
+        version=version,
+    )
+
+
+async def _load_chunk_embeddings(page: CachedPage, supabase: AsyncClient) -> None:
+    result = await (
+        supabase.from_("site_pages")
+        .select("chunk_number, embedding")
+        .eq("url", page.url)
+        .eq("metadata->>source", DOCS_SOURCE)
+        .execute()
+    )
+    embeddings = {
+        row["chunk_number"]: parse_embedding(row["embedding"]) for row in result.data
+    }
+    for chunk in page.chunks:
+        chunk.embedding = embeddings.get(chunk.chunk_number)
+    page.has_embeddings = True
+
+
+async def get_page_content_helper(
+    url: str,
+    supabase: AsyncClient | None = None,
+    query: str | None = None,
+    embedding_client: AsyncOpenAI | None = None,
+    max_chars: int = PAGE_CONTENT_MAX_CHARS,
+) -> str:
     """
     Retrieve the full content of a specific documentation page by combining all its chunks.
 
+    Assembled pages are served from an in-process cache, scoped to the corpus
+    version so pages are refetched after a re-ingest. When a page exceeds
+    `max_chars` and a query is given, only the chunks most relevant to the query
+    are returned; without a query the page is cut at a chunk boundary.
+
     Args:
         url: The URL of the page to retrieve
+        query: Optional query used to pick the relevant sections of long pages
 
     Returns:
-        str: The complete page content with all chunks combined in order
+        str: The page content with its chunks combined in order
     """
     try:
-        result = (
-            supabase.from_("site_pages")
-            .select("title, content, chunk_number")
-            .eq("url", url)
-            .eq("metadata->>source", "pydantic_ai_docs")
-            .order("chunk_number")
-            .execute()
-        )
+        supabase = supabase or get_async_supabase_client()
+        version = await page_index.current_version(supabase)
+        page = page_cache.get(url, version)
+        if page is None:
+            page = await _fetch_page(url, supabase, version)
+            if page is None:
+                return f"No content found for URL: {url}"
+            page_cache.set(page)
 
-        if not result.data:
-            return f"No content found for URL: {url}"
+        header = f"# {page.title}\n"
+        content = SEPARATOR.join([header, *(chunk.content for chunk in page.chunks)])
+        if len(content) <= max_chars:
+            return content
 
-        page_title = result.data[0]["title"].split(" - ")[0]
-        formatted_content = [f"# {page_title}\n"]
+        budget = max_chars - len(header)
+        selected = []
+        if query:
+            if not page.has_embeddings:
+                await _load_chunk_embeddings(page, supabase)
+                page_cache.set(page)
+            try:
+                query_embedding = await get_embedding(query, embedding_client)
+            except client_errors() as e:
+                print(f"Error getting embedding: {e}")
+            else:
+                selected = select_relevant_chunks(page.chunks, query_embedding, budget)
+        if not selected:
+            selected = select_leading_chunks(page.chunks, budget)
 
-        for chunk in result.data:
-            formatted_content.append(chunk["content"])
+        sections = [header]
+        previous = None
+        for chunk in selected:
+            if previous is not None and chunk.chunk_number != previous + 1:
+                sections.append("[...]")
+            sections.append(chunk.content)
+            previous = chunk.chunk_number
 
-        # TODO: if too big, rag the page itself
-        return "\n\n".join(formatted_content)[:20000]
+        omitted = len(page.chunks) - len(selected)
+        if omitted:
+            note = (
+                "showing the sections most relevant to the query"
+                if query
+                else "pass a query to get the sections most relevant to it"
+            )
+            sections.append(
+                f"[{omitted} of {len(page.chunks)} sections omitted; {note}.]"
+            )
+        return SEPARATOR.join(sections)
 
     except Exception as e:
         print(f"Error retrieving page content: {str(e)}")
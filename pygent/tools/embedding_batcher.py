@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import asyncio
+import weakref
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from pygent.core import config
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+
+@dataclass
+class BatchStats:
+    max_batch_size: int
+    batches: int = 0
+    items: int = 0
+    requests: int = 0
+
+    @property
+    def fill_ratio(self) -> float:
+        """Average share of `max_batch_size` used by each embeddings request."""
+        return (
+            self.items / (self.batches * self.max_batch_size) if self.batches else 0.0
+        )
+
+    @property
+    def coalesced(self) -> int:
+        """Caller requests served without their own embeddings request."""
+        return self.requests - self.batches
+
+
+class EmbeddingBatcher:
+    """Coalesce concurrent embedding requests into list-input API calls.
+
+    Callers awaiting `embed` within the same `window_ms` are sent together as a
+    single `embeddings.create` request; a batch is flushed early once it holds
+    `max_batch_size` distinct texts. Each caller gets its own embedding back, or
+    the request's exception if the call fails.
+
+    A batcher belongs to the event loop it is first used on; use
+    `get_embedding_batcher` to get the one for the running loop.
+    """
+
+    def __init__(
+        self,
+        client: AsyncOpenAI,
+        model: str = config.EMBEDDING_MODEL,
+        window_ms: float = config.EMBEDDING_BATCH_WINDOW_MS,
+        max_batch_size: int = config.EMBEDDING_BATCH_SIZE,
+    ):
+        self.client = client
+        self.model = model
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.stats = BatchStats(max_batch_size=max_batch_size)
+        self._pending: dict[str, list[asyncio.Future[list[float]]]] = {}
+        self._timer: asyncio.TimerHandle | None = None
+        self._inflight: set[asyncio.Task[None]] = set()
+
+    async def embed(self, text: str) -> list[float]:
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[list[float]] = loop.create_future()
+        self._pending.setdefault(text, []).append(future)
+        self.stats.requests += 1
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, {}
+        task = asyncio.create_task(self._send(batch))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _send(self, batch: dict[str, list[asyncio.Future[list[float]]]]) -> None:
+        texts = list(batch)
+        self.stats.batches += 1
+        self.stats.items += len(texts)
+        try:
+            response = await self.client.embeddings.create(
+                model=self.model, input=texts
+            )
+        except Exception as e:  # noqa: BLE001
+            # Whatever the request raised, every waiter must get it or it
+            # would wait forever.
+            for futures in batch.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+
+        for item in response.data:
+            for future in batch[texts[item.index]]:
+                if not future.done():
+                    future.set_result(item.embedding)
+        for text, futures in batch.items():
+            for future in futures:
+                if not future.done():
+                    future.set_exception(
+                        ValueError(f"No embedding returned for {text[:50]!r}")
+                    )
+
+
+_batchers: weakref.WeakKeyDictionary[
+    AsyncOpenAI,
+    weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, EmbeddingBatcher],
+] = weakref.WeakKeyDictionary()
+
+
+def get_embedding_batcher(client: AsyncOpenAI) -> EmbeddingBatcher:
+    """Return the shared batcher for `client` on the running event loop.
+
+    Streamlit runs every session on its own thread and event loop, and a
+    batcher's futures and timer only work on the loop that created them, so
+    each loop gets its own batcher.
+    """
+    per_loop = _batchers.setdefault(client, weakref.WeakKeyDictionary())
+    loop = asyncio.get_running_loop()
+    batcher = per_loop.get(loop)
+    if batcher is None:
+        batcher = per_loop[loop] = EmbeddingBatcher(client)
+    return batcher
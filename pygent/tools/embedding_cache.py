@@ -0,0 +1,221 @@
+import array
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Protocol
+
+from pygent.core import config
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so trivially different queries share a cache entry."""
+    return " ".join(text.split())
+
+
+def embedding_cache_key(model: str, text: str) -> str:
+    """Content-addressed key for an embedding: model name + normalized text hash."""
+    digest = hashlib.sha256(f"{model}\x00{normalize_text(text)}".encode())
+    return digest.hexdigest()
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class EmbeddingCache(Protocol):
+    stats: CacheStats
+
+    async def get(self, key: str) -> list[float] | None: ...
+
+    async def set(self, key: str, embedding: list[float]) -> None: ...
+
+
+class MemoryEmbeddingCache:
+    """In-process LRU cache with a per-entry TTL."""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float | None = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stats = CacheStats()
+        self._entries: OrderedDict[str, tuple[float, list[float]]] = OrderedDict()
+
+    def get(self, key: str) -> list[float] | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+
+        expires_at, embedding = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.stats.evictions += 1
+            self.stats.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return embedding
+
+    def set(self, key: str, embedding: list[float]) -> None:
+        expires_at = (
+            time.monotonic() + self.ttl_seconds if self.ttl_seconds else float("inf")
+        )
+        self._entries[key] = (expires_at, embedding)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SqliteEmbeddingCache:
+    """On-disk cache storing embeddings as float32 blobs in a SQLite database.
+
+    The connection is opened lazily so importing the module never touches the
+    filesystem. Entries older than `ttl_seconds` are treated as misses, and the
+    oldest entries are dropped once the table grows past `max_entries`.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = 100_000,
+        ttl_seconds: float | None = None,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.stats = CacheStats()
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("pragma journal_mode=wal")
+            conn.execute(
+                """
+                create table if not exists embeddings (
+                    key text primary key,
+                    vector blob not null,
+                    created_at real not null
+                )
+                """
+            )
+            conn.execute(
+                "create index if not exists idx_embeddings_created_at on embeddings (created_at)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> list[float] | None:
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "select vector, created_at from embeddings where key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.stats.misses += 1
+                return None
+
+            vector, created_at = row
+            if self.ttl_seconds and created_at + self.ttl_seconds < time.time():
+                conn.execute("delete from embeddings where key = ?", (key,))
+                conn.commit()
+                self.stats.evictions += 1
+                self.stats.misses += 1
+                return None
+
+        self.stats.hits += 1
+        return array.array("f", vector).tolist()
+
+    def set(self, key: str, embedding: list[float]) -> None:
+        vector = array.array("f", embedding).tobytes()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "insert or replace into embeddings (key, vector, created_at) values (?, ?, ?)",
+                (key, vector, time.time()),
+            )
+            (count,) = conn.execute("select count(*) from embeddings").fetchone()
+            if count > self.max_entries:
+                overflow = count - self.max_entries
+                conn.execute(
+                    "delete from embeddings where key in "
+                    "(select key from embeddings order by created_at limit ?)",
+                    (overflow,),
+                )
+                self.stats.evictions += overflow
+            conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class TieredEmbeddingCache:
+    """Memory LRU in front of an optional persistent tier.
+
+    Disk hits are promoted into memory so repeated lookups within a process
+    never leave the LRU. Disk reads and writes run in a worker thread, so the
+    event loop never waits on SQLite.
+    """
+
+    def __init__(
+        self, memory: MemoryEmbeddingCache, disk: SqliteEmbeddingCache | None = None
+    ):
+        self.memory = memory
+        self.disk = disk
+        self.stats = CacheStats()
+
+    async def get(self, key: str) -> list[float] | None:
+        embedding = self.memory.get(key)
+        if embedding is None and self.disk is not None:
+            embedding = await asyncio.to_thread(self.disk.get, key)
+            if embedding is not None:
+                self.memory.set(key, embedding)
+
+        if embedding is None:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+        return embedding
+
+    async def set(self, key: str, embedding: list[float]) -> None:
+        self.memory.set(key, embedding)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set, key, embedding)
+
+
+def build_embedding_cache() -> TieredEmbeddingCache:
+    """Build the default cache from the `EMBEDDING_CACHE_*` settings."""
+    ttl = config.EMBEDDING_CACHE_TTL or None
+    memory = MemoryEmbeddingCache(config.EMBEDDING_CACHE_SIZE, ttl)
+    disk = (
+        SqliteEmbeddingCache(
+            config.EMBEDDING_CACHE_PATH, config.EMBEDDING_CACHE_DISK_SIZE, ttl
+        )
+        if config.EMBEDDING_CACHE_PATH
+        else None
+    )
+    return TieredEmbeddingCache(memory, disk)
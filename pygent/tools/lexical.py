@@ -0,0 +1,126 @@
+import math
+import re
+from collections import Counter, defaultdict
+
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[A-Za-z0-9_]+")
+CAMEL_CASE_PATTERN = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+")
+STOPWORDS = frozenset(
+    [
+        "a",
+        "an",
+        "and",
+        "are",
+        "as",
+        "at",
+        "be",
+        "by",
+        "can",
+        "do",
+        "does",
+        "for",
+        "from",
+        "how",
+        "i",
+        "if",
+        "in",
+        "is",
+        "it",
+        "of",
+        "on",
+        "or",
+        "the",
+        "this",
+        "to",
+        "use",
+        "using",
+        "what",
+        "when",
+        "where",
+        "which",
+        "with",
+        "you",
+        "your",
+    ]
+)
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercased terms that keep API symbols intact.
+
+    `ModelMessagesTypeAdapter` and `output_type` are emitted both whole and as
+    their parts, so exact symbol queries and natural-language queries both match.
+    """
+    tokens = []
+    for word in TOKEN_PATTERN.findall(text):
+        lowered = word.lower()
+        parts = [
+            part.lower()
+            for piece in word.split("_")
+            for part in CAMEL_CASE_PATTERN.findall(piece)
+        ]
+        if len(parts) > 1:
+            tokens.append(lowered)
+            tokens.extend(part for part in parts if part not in STOPWORDS)
+        elif lowered not in STOPWORDS:
+            tokens.append(lowered)
+    return tokens
+
+
+class BM25Index:
+    """Okapi BM25 over an in-memory inverted index."""
+
+    def __init__(self, documents: list[str], k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.size = len(documents)
+
+        postings: dict[str, list[tuple[int, int]]] = defaultdict(list)
+        lengths = np.zeros(self.size, dtype=np.float32)
+        for doc_id, document in enumerate(documents):
+            terms = Counter(tokenize(document))
+            lengths[doc_id] = sum(terms.values())
+            for term, frequency in terms.items():
+                postings[term].append((doc_id, frequency))
+
+        self.average_length = float(lengths.mean()) if self.size else 0.0
+        self._length_norm = (
+            1 - b + b * lengths / self.average_length
+            if self.average_length
+            else np.ones(self.size, dtype=np.float32)
+        )
+        self._postings = {
+            term: (
+                np.array([doc_id for doc_id, _ in entries], dtype=np.int64),
+                np.array([tf for _, tf in entries], dtype=np.float32),
+            )
+            for term, entries in postings.items()
+        }
+
+    def idf(self, term: str) -> float:
+        frequency = len(self._postings[term][0]) if term in self._postings else 0
+        return math.log(1 + (self.size - frequency + 0.5) / (frequency + 0.5))
+
+    def scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(self.size, dtype=np.float32)
+        for term in set(tokenize(query)):
+            if term not in self._postings:
+                continue
+            doc_ids, tf = self._postings[term]
+            norm = self._length_norm[doc_ids]
+            scores[doc_ids] += (
+                self.idf(term) * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+            )
+        return scores
+
+
+def reciprocal_rank_fusion(
+    rankings: list[list[int]], k: int = 60
+) -> list[tuple[int, float]]:
+    """Fuse ranked id lists: each id scores sum(1 / (k + rank)), rank from 1."""
+    fused: dict[int, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            fused[item] += 1 / (k + rank)
+    return sorted(fused.items(), key=lambda entry: entry[1], reverse=True)
@@ -0,0 +1,142 @@
+import json
+import math
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from pygent.core import config
+
+from .embedding_cache import CacheStats
+
+SEPARATOR = "\n\n"
+
+
+@dataclass
+class PageChunk:
+    chunk_number: int
+    content: str
+    embedding: list[float] | None = None
+
+
+@dataclass
+class CachedPage:
+    url: str
+    title: str
+    chunks: list[PageChunk]
+    version: str | None = None
+    has_embeddings: bool = False
+
+    @property
+    def size(self) -> int:
+        """Approximate memory footprint in bytes, used for the cache budget."""
+        size = len(self.url) + len(self.title)
+        for chunk in self.chunks:
+            size += len(chunk.content.encode("utf-8"))
+            if chunk.embedding is not None:
+                size += 8 * len(chunk.embedding)
+        return size
+
+
+class PageCache:
+    """LRU cache of assembled documentation pages bounded by a byte budget.
+
+    Entries tagged with a corpus version are dropped once the caller sees a
+    different version, so re-ingested pages are refetched.
+    """
+
+    def __init__(self, max_bytes: int = config.PAGE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self._pages: OrderedDict[str, tuple[CachedPage, int]] = OrderedDict()
+        self._size = 0
+
+    def get(self, url: str, version: str | None = None) -> CachedPage | None:
+        entry = self._pages.get(url)
+        page = entry[0] if entry is not None else None
+        if page is not None and version is not None and page.version != version:
+            self._discard(url)
+            page = None
+
+        if page is None:
+            self.stats.misses += 1
+            return None
+
+        self._pages.move_to_end(url)
+        self.stats.hits += 1
+        return page
+
+    def set(self, page: CachedPage) -> None:
+        self._discard(page.url)
+        size = page.size
+        if size > self.max_bytes:
+            return
+
+        self._pages[page.url] = (page, size)
+        self._size += size
+        while self._size > self.max_bytes:
+            url = next(iter(self._pages))
+            self._discard(url)
+            self.stats.evictions += 1
+
+    def _discard(self, url: str) -> None:
+        entry = self._pages.pop(url, None)
+        if entry is not None:
+            self._size -= entry[1]
+
+    def clear(self) -> None:
+        self._pages.clear()
+        self._size = 0
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+
+def parse_embedding(value: str | list[float] | None) -> list[float] | None:
+    """PostgREST returns pgvector columns as a JSON array string."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return json.loads(value)
+    return list(value)
+
+
+def cosine_similarity(a: list[float], b: list[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+def select_relevant_chunks(
+    chunks: list[PageChunk], query_embedding: list[float], max_chars: int
+) -> list[PageChunk]:
+    """Pick the chunks most similar to the query that fit in `max_chars`.
+
+    The selection is returned in page order so the assembled text still reads
+    top to bottom.
+    """
+    ranked = sorted(
+        (chunk for chunk in chunks if chunk.embedding is not None),
+        key=lambda chunk: cosine_similarity(query_embedding, chunk.embedding),
+        reverse=True,
+    )
+    selected: list[PageChunk] = []
+    budget = max_chars
+    for chunk in ranked:
+        if len(chunk.content) + len(SEPARATOR) <= budget:
+            selected.append(chunk)
+            budget -= len(chunk.content) + len(SEPARATOR)
+    return sorted(selected, key=lambda chunk: chunk.chunk_number)
+
+
+def select_leading_chunks(chunks: list[PageChunk], max_chars: int) -> list[PageChunk]:
+    """Keep whole chunks from the top of the page until `max_chars` is reached."""
+    selected: list[PageChunk] = []
+    budget = max_chars
+    for chunk in chunks:
+        if len(chunk.content) + len(SEPARATOR) > budget:
+            break
+        selected.append(chunk)
+        budget -= len(chunk.content) + len(SEPARATOR)
+    return selected or [
+        PageChunk(chunks[0].chunk_number, chunks[0].content[:max_chars])
+    ]
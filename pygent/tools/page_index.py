@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import TYPE_CHECKING
+
+from pygent.core import config
+
+if TYPE_CHECKING:
+    from supabase import AsyncClient
+
+
+async def fetch_corpus_version(
+    supabase: AsyncClient, source: str = config.DOCS_SOURCE
+) -> str:
+    """Return an opaque version string that changes whenever the corpus does.
+
+    Backed by the `site_pages_version` RPC (chunk count + latest `created_at`),
+    so the check costs a single-row response.
+    """
+    result = await supabase.rpc(
+        "site_pages_version", {"filter": {"source": source}}
+    ).execute()
+    row = result.data[0] if result.data else {}
+    return f"{row.get('chunk_count', 0)}:{row.get('last_modified')}"
+
+
+class PageIndex:
+    """In-process cache of the distinct documentation page URLs.
+
+    The corpus version is re-checked at most every `refresh_interval` seconds,
+    and the URL list is only refetched when that version has changed.
+    """
+
+    def __init__(
+        self,
+        source: str = config.DOCS_SOURCE,
+        refresh_interval: float = config.DOCS_INDEX_REFRESH_SECONDS,
+    ):
+        self.source = source
+        self.refresh_interval = refresh_interval
+        self.version: str | None = None
+        self.refreshes = 0
+        self._urls: list[str] = []
+        self._checked_at = float("-inf")
+        self._lock = asyncio.Lock()
+
+    def _is_fresh(self) -> bool:
+        return (
+            self.version is not None
+            and time.monotonic() - self._checked_at < self.refresh_interval
+        )
+
+    async def current_version(self, supabase: AsyncClient) -> str | None:
+        await self._refresh(supabase)
+        return self.version
+
+    async def get_urls(self, supabase: AsyncClient) -> list[str]:
+        await self._refresh(supabase)
+        return list(self._urls)
+
+    async def _refresh(self, supabase: AsyncClient) -> None:
+        if self._is_fresh():
+            return
+
+        async with self._lock:
+            if not self._is_fresh():
+                version = await fetch_corpus_version(supabase, self.source)
+                if version != self.version:
+                    result = await supabase.rpc(
+                        "list_site_page_urls", {"filter": {"source": self.source}}
+                    ).execute()
+                    self._urls = [row["url"] for row in result.data or []]
+                    self.version = version
+                    self.refreshes += 1
+                self._checked_at = time.monotonic()
+
+    def invalidate(self) -> None:
+        self.version = None
+        self._checked_at = float("-inf")
+
+
+page_index = PageIndex()
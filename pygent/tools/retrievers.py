@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Protocol
+
+import numpy as np
+
+from pygent.core import config
+
+from .lexical import BM25Index, reciprocal_rank_fusion
+from .page_cache import parse_embedding
+
+if TYPE_CHECKING:
+    from supabase import AsyncClient
+
+ROW_FIELDS = ("id", "url", "chunk_number", "title", "summary", "content", "metadata")
+
+
+class Retriever(Protocol):
+    """Search over `site_pages`, returning `match_site_pages`-shaped rows.
+
+    Backends in hybrid mode also rank `query_text` lexically and fuse both
+    rankings; otherwise `query_text` is ignored.
+    """
+
+    async def match(
+        self,
+        query_embedding: list[float],
+        match_count: int = 10,
+        filter: dict[str, Any] | None = None,
+        query_text: str | None = None,
+    ) -> list[dict[str, Any]]: ...
+
+
+class SupabaseRetriever:
+    """Calls the `match_site_pages` RPCs defined in `site_pages.sql`."""
+
+    def __init__(
+        self,
+        supabase: AsyncClient,
+        hybrid: bool = config.RETRIEVAL_MODE == "hybrid",
+    ):
+        self.supabase = supabase
+        self.hybrid = hybrid
+
+    async def match(
+        self,
+        query_embedding: list[float],
+        match_count: int = 10,
+        filter: dict[str, Any] | None = None,
+        query_text: str | None = None,
+    ) -> list[dict[str, Any]]:
+        if self.hybrid and query_text:
+            result = await self.supabase.rpc(
+                "match_site_pages_hybrid",
+                {
+                    "query_text": query_text,
+                    "query_embedding": query_embedding,
+                    "match_count": match_count,
+                    "filter": filter or {},
+                    "rrf_k": config.RRF_K,
+                },
+            ).execute()
+            return result.data or []
+
+        result = await self.supabase.rpc(
+            "match_site_pages",
+            {
+                "query_embedding": query_embedding,
+                "match_count": match_count,
+                "filter": filter or {},
+            },
+        ).execute()
+        return result.data or []
+
+
+def json_contains(document: Any, pattern: Any) -> bool:
+    """Python equivalent of Postgres' jsonb containment operator (`@>`)."""
+    if isinstance(pattern, dict):
+        return isinstance(document, dict) and all(
+            key in document and json_contains(document[key], value)
+            for key, value in pattern.items()
+        )
+    if isinstance(pattern, list):
+        if not isinstance(document, list):
+            return False
+        return all(
+            any(json_contains(item, expected) for item in document)
+            for expected in pattern
+        )
+    return document == pattern
+
+
+class LocalRetriever:
+    """In-process cosine search over an exported copy of `site_pages`.
+
+    Embeddings live in a float32 `.npy` matrix, L2-normalized at build time and
+    memory-mapped on load, so cosine similarity is a single matrix-vector
+    product. Row metadata is kept in a JSONL file aligned with the matrix.
+
+    In hybrid mode a BM25 index over title, summary and content is built on
+    first use and fused with the vector ranking via reciprocal rank fusion.
+    """
+
+    EMBEDDINGS_FILE = "embeddings.npy"
+    ROWS_FILE = "rows.jsonl"
+
+    def __init__(
+        self,
+        embeddings: np.ndarray,
+        rows: list[dict[str, Any]],
+        hybrid: bool = config.RETRIEVAL_MODE == "hybrid",
+    ):
+        if len(embeddings) != len(rows):
+            raise ValueError(
+                f"Index has {len(embeddings)} embeddings but {len(rows)} rows."
+            )
+        self.embeddings = embeddings
+        self.rows = rows
+        self.hybrid = hybrid
+        self._masks: dict[str, np.ndarray] = {}
+        self._lexical: BM25Index | None = None
+
+    @classmethod
+    def from_rows(cls, rows: list[dict[str, Any]]) -> LocalRetriever:
+        """Build an index from `site_pages` rows that include their `embedding`."""
+        rows = [row for row in rows if row.get("embedding") is not None]
+        if not rows:
+            return cls(np.empty((0, 0), dtype=np.float32), [])
+        embeddings = np.array(
+            [parse_embedding(row["embedding"]) for row in rows], dtype=np.float32
+        ).reshape(len(rows), -1)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        embeddings /= np.where(norms == 0, 1, norms)
+        return cls(
+            embeddings, [{key: row.get(key) for key in ROW_FIELDS} for row in rows]
+        )
+
+    @classmethod
+    def from_export(cls, path: str | Path) -> LocalRetriever:
+        """Build an index from a JSON array or JSONL export of `site_pages`."""
+        text = Path(path).read_text(encoding="utf-8")
+        if text.lstrip().startswith("["):
+            rows = json.loads(text)
+        else:
+            rows = [json.loads(line) for line in text.splitlines() if line.strip()]
+        return cls.from_rows(rows)
+
+    @classmethod
+    def load(cls, directory: str | Path) -> LocalRetriever:
+        directory = Path(directory)
+        embeddings = np.load(directory / cls.EMBEDDINGS_FILE, mmap_mode="r")
+        with open(directory / cls.ROWS_FILE, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f]
+        return cls(embeddings, rows)
+
+    def save(self, directory: str | Path) -> None:
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        np.save(directory / self.EMBEDDINGS_FILE, np.asarray(self.embeddings))
+        with open(directory / self.ROWS_FILE, "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(row) + "\n" for row in self.rows)
+
+    def _mask(self, filter: dict[str, Any]) -> np.ndarray:
+        key = json.dumps(filter, sort_keys=True)
+        mask = self._masks.get(key)
+        if mask is None:
+            mask = np.fromiter(
+                (json_contains(row["metadata"] or {}, filter) for row in self.rows),
+                dtype=bool,
+                count=len(self.rows),
+            )
+            self._masks[key] = mask
+        return mask
+
+    def search(
+        self,
+        query_embedding: list[float],
+        match_count: int = 10,
+        filter: dict[str, Any] | None = None,
+    ) -> list[tuple[int, float]]:
+        """Return `(row index, cosine similarity)` pairs, best first."""
+        if not self.rows:
+            return []
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+
+        scores = self.embeddings @ query
+        if filter:
+            scores = np.where(self._mask(filter), scores, -np.inf)
+        return _top_k(scores, match_count)
+
+    def lexical_search(
+        self,
+        query_text: str,
+        match_count: int = 10,
+        filter: dict[str, Any] | None = None,
+    ) -> list[tuple[int, float]]:
+        """Return `(row index, BM25 score)` pairs for rows matching any term."""
+        if not self.rows:
+            return []
+        if self._lexical is None:
+            self._lexical = BM25Index(
+                [
+                    f"{row['title']} {row['summary']} {row['content']}"
+                    for row in self.rows
+                ]
+            )
+
+        scores = self._lexical.scores(query_text)
+        scores = np.where(scores > 0, scores, -np.inf)
+        if filter:
+            scores = np.where(self._mask(filter), scores, -np.inf)
+        return _top_k(scores, match_count)
+
+    async def match(
+        self,
+        query_embedding: list[float],
+        match_count: int = 10,
+        filter: dict[str, Any] | None = None,
+        query_text: str | None = None,
+    ) -> list[dict[str, Any]]:
+        if not (self.hybrid and query_text):
+            return [
+                {**self.rows[index], "similarity": similarity}
+                for index, similarity in self.search(
+                    query_embedding, match_count, filter
+                )
+            ]
+
+        candidates = match_count * config.HYBRID_CANDIDATE_MULTIPLIER
+        vector = self.search(query_embedding, candidates, filter)
+        lexical = self.lexical_search(query_text, candidates, filter)
+        fused = reciprocal_rank_fusion(
+            [[index for index, _ in vector], [index for index, _ in lexical]],
+            k=config.RRF_K,
+        )
+        return [
+            {**self.rows[index], "similarity": score}
+            for index, score in fused[:match_count]
+        ]
+
+
+def _top_k(scores: np.ndarray, count: int) -> list[tuple[int, float]]:
+    count = min(count, len(scores))
+    if count == 0:
+        return []
+    top = np.argpartition(-scores, count - 1)[:count]
+    top = top[np.argsort(-scores[top])]
+    return [(int(i), float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+
+def _write_rows(path: str | Path, rows: list[dict[str, Any]], mode: str) -> None:
+    with open(path, mode, encoding="utf-8") as f:
+        f.writelines(json.dumps(row) + "\n" for row in rows)
+
+
+async def export_site_pages(
+    supabase: AsyncClient, path: str | Path, page_size: int = 500
+) -> int:
+    """Write every `site_pages` row, embedding included, to a JSONL file."""
+    count = 0
+    while True:
+        result = await (
+            supabase.from_("site_pages")
+            .select(", ".join([*ROW_FIELDS, "embedding"]))
+            .order("id")
+            .range(count, count + page_size - 1)
+            .execute()
+        )
+        await asyncio.to_thread(_write_rows, path, result.data, "a" if count else "w")
+        count += len(result.data)
+        if len(result.data) < page_size:
+            return count
+
+
+_local_retriever: LocalRetriever | None = None
+
+
+def get_retriever(supabase: AsyncClient) -> Retriever:
+    """Return the backend selected by `RETRIEVER_BACKEND` (`supabase` or `local`)."""
+    global _local_retriever
+    if config.RETRIEVER_BACKEND == "local":
+        if _local_retriever is None:
+            _local_retriever = LocalRetriever.load(config.LOCAL_INDEX_PATH)
+        return _local_retriever
+    return SupabaseRetriever(supabase)
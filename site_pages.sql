@@ -12,6 +12,10 @@ create table site_pages (
     metadata jsonb not null default '{}'::jsonb,  -- Added metadata column
     embedding vector(1536),  -- OpenAI embeddings are 1536 dimensions
     created_at timestamp with time zone default timezone('utc'::text, now()) not null,
+    -- Full-text search vector for hybrid (lexical + vector) retrieval
+    fts tsvector generated always as (
+        to_tsvector('english', title || ' ' || summary || ' ' || content)
+    ) stored,
     
     -- Add a unique constraint to prevent duplicate chunks for the same URL
     unique(url, chunk_number)
@@ -23,6 +27,14 @@ create index on site_pages using ivfflat (embedding vector_cosine_ops);
 -- Create an index on metadata for faster filtering
 create index idx_site_pages_metadata on site_pages using gin (metadata);
 
+-- Add the full-text search vector and its index to tables created before hybrid
+-- retrieval. Both statements are no-ops when they already exist, so this block can
+-- be run on its own against an existing database.
+alter table site_pages add column if not exists fts tsvector generated always as (
+    to_tsvector('english', title || ' ' || summary || ' ' || content)
+) stored;
+create index if not exists idx_site_pages_fts on site_pages using gin (fts);
+
 -- Create a function to search for documentation chunks
 create function match_site_pages (
   query_embedding vector(1536),
@@ -59,6 +71,89 @@ begin
 end;
 $$;
 
+-- Hybrid search: fuse the vector and full-text rankings with reciprocal rank fusion.
+-- Query terms are OR-ed so exact API symbols match without requiring every word.
+create or replace function match_site_pages_hybrid (
+  query_text text,
+  query_embedding vector(1536),
+  match_count int default 10,
+  filter jsonb default '{}'::jsonb,
+  rrf_k int default 60
+) returns table (
+  id bigint,
+  url varchar,
+  chunk_number integer,
+  title varchar,
+  summary varchar,
+  content text,
+  metadata jsonb,
+  similarity float
+)
+language sql stable
+as $$
+  with vector_matches as (
+    select
+      site_pages.id,
+      row_number() over (order by site_pages.embedding <=> query_embedding) as rank
+    from site_pages
+    where site_pages.metadata @> filter
+    order by site_pages.embedding <=> query_embedding
+    limit match_count * 4
+  ),
+  lexical_query as (
+    select replace(plainto_tsquery('english', query_text)::text, '&', '|')::tsquery as q
+  ),
+  lexical_matches as (
+    select
+      site_pages.id,
+      row_number() over (order by ts_rank_cd(site_pages.fts, lexical_query.q) desc) as rank
+    from site_pages, lexical_query
+    where site_pages.metadata @> filter and site_pages.fts @@ lexical_query.q
+    order by ts_rank_cd(site_pages.fts, lexical_query.q) desc
+    limit match_count * 4
+  )
+  select
+    site_pages.id,
+    site_pages.url,
+    site_pages.chunk_number,
+    site_pages.title,
+    site_pages.summary,
+    site_pages.content,
+    site_pages.metadata,
+    (
+      coalesce(1.0 / (rrf_k + vector_matches.rank), 0.0)
+      + coalesce(1.0 / (rrf_k + lexical_matches.rank), 0.0)
+    )::float as similarity
+  from vector_matches
+  full outer join lexical_matches on vector_matches.id = lexical_matches.id
+  join site_pages on site_pages.id = coalesce(vector_matches.id, lexical_matches.id)
+  order by similarity desc
+  limit match_count;
+$$;
+
+-- List the distinct documentation pages without transferring every chunk row
+create or replace function list_site_page_urls (
+  filter jsonb default '{}'::jsonb
+) returns table (url varchar)
+language sql stable
+as $$
+  select distinct site_pages.url
+  from site_pages
+  where metadata @> filter
+  order by site_pages.url;
+$$;
+
+-- Cheap corpus version used by clients to invalidate their cached page index
+create or replace function site_pages_version (
+  filter jsonb default '{}'::jsonb
+) returns table (chunk_count bigint, last_modified timestamp with time zone)
+language sql stable
+as $$
+  select count(*), max(created_at)
+  from site_pages
+  where metadata @> filter;
+$$;
+
 -- Everything above will work for any PostgreSQL database. The below commands are for Supabase security
 
 -- Enable RLS on the table
@@ -1,33 +1,24 @@
 from __future__ import annotations
 
 import asyncio
-import os
 import uuid
 
-import logfire
 import streamlit as st
 from dotenv import load_dotenv
-from openai import AsyncOpenAI
-from supabase import Client
 
-from pygent.graph import run_graph
+from pygent.core.telemetry import configure_telemetry
+from pygent.graph import GraphOutput, NodeEvent, TextDelta, stream_graph
 
 load_dotenv()
+configure_telemetry()
 
-openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY", ""))
-supabase: Client = Client(
-    os.getenv("SUPABASE_URL", ""), os.getenv("SUPABASE_SERVICE_KEY", "")
-)
-logfire.configure(scrubbing=False)
-logfire.instrument_pydantic_ai()
 
-
-@st.cache_resource
 def get_thread_id():
-    return str(uuid.uuid4())
-
-
-thread_id = get_thread_id()
+    # Stored per browser session: `st.cache_resource` would share one run
+    # between every user of the server.
+    if "thread_id" not in st.session_state:
+        st.session_state.thread_id = str(uuid.uuid4())
+    return st.session_state.thread_id
 
 
 async def main():
@@ -39,6 +30,8 @@ async def main():
         "Example: Build me an AI agent that can search the web with the Brave API."
     )
 
+    thread_id = get_thread_id()
+
     # Initialize chat history in session state if not present
     if "messages" not in st.session_state:
         st.session_state.messages = []
@@ -61,11 +54,23 @@ async def main():
         with st.chat_message("user"):
             st.markdown(user_input)
 
-        # Run the graph and display the result
-        result = await run_graph(thread_id, user_input)
-        st.session_state.messages.append({"type": "ai", "content": result})
+        # Run the graph, rendering the response as it streams in
         with st.chat_message("assistant"):
-            st.markdown(result)
+            status = st.empty()
+            placeholder = st.empty()
+            streamed = ""
+            result = None
+            async for event in stream_graph(thread_id, user_input):
+                if isinstance(event, NodeEvent):
+                    status.caption(f"Running {event.node}...")
+                elif isinstance(event, TextDelta):
+                    streamed += event.text
+                    placeholder.markdown(streamed + "▌")
+                elif isinstance(event, GraphOutput):
+                    result = event.text
+            status.empty()
+            placeholder.markdown(result)
+        st.session_state.messages.append({"type": "ai", "content": result})
 
 
 if __name__ == "__main__":